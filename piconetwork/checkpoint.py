@@ -0,0 +1,92 @@
+import gzip, os, pickle, random
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .main import Simulator, DEFAULT_CONTEXT
+from .logger import _REGISTERED_LOGGERS, LogSink
+from .lpwan_jitter import NodeLP, NodeLP_Jitter_Configuration
+
+"""
+OUERTANI Mohamed Hachem <omhx21@gmail.com>
+
+Checkpointing of a running simulation : the simulator (clock, pending events), everything the events refer to
+(nodes with their jitter configurations, parameters and context, channel) and its trace, the random module's state, the process-wide
+defaults (class-level parameters, default context's counters) and the loggers. Restoring a checkpoint and running it gives exactly the same results as the uninterrupted simulation.
+
+Every callback of a pending event must be picklable : bound methods and module-level functions are, lambdas are not.
+
+Restoring the same checkpoint several times yields independent copies of the network : a warmed up network
+can be forked into as many experiments as needed.
+"""
+
+# Process-wide attributes that may be part of the simulation's state : those of nodes created without context nor parameters.
+CLASS_LEVEL_STATE = [
+    (DEFAULT_CONTEXT, 'next_node_id'),
+    (DEFAULT_CONTEXT, 'next_packet_id'),
+    (NodeLP_Jitter_Configuration, 'JITTER_INTERVALS'),
+    (NodeLP_Jitter_Configuration, 'JITTER_MIN_VALUE'),
+    (NodeLP_Jitter_Configuration, 'JITTER_MAX_VALUE'),
+    (NodeLP_Jitter_Configuration, 'ADAPTATION_FACTOR'),
+    (NodeLP, 'NODE_RECEPTION_OF_PACKET_DURATION'),
+]
+
+def _get_key(owner, name: str) -> str:
+    return f"{getattr(owner, '__name__', type(owner).__name__)}.{name}"
+
+@dataclass
+class SimulationCheckpoint:
+    simulator: Simulator
+    payload: Any = None # Whatever should be saved along : typically the Simulatable_MetadataAugmented_Dumpable_Network_Object.
+    random_state: Optional[tuple] = None
+    class_level_state: Dict[str, Any] = field(default_factory=dict)
+    loggers_state: Dict[str, tuple] = field(default_factory=dict)
+    log_sinks_state: List[tuple] = field(default_factory=list) # (path, size written, buffer size, compression level, names of the loggers) per LogSink.
+
+def save_checkpoint(path: str, simulator: Simulator, payload: Any = None) -> None:
+    """
+    Saves the state of the simulation in path (gzip compressed pickle).
+    Must be called in-between events : after a run_until, run_for, step, or at every iteration of run_by_chunks.
+    The file is first written next to its destination then moved, so a crash while saving never corrupts the previous checkpoint.
+    """
+    sinks = {}
+    for name, logger in _REGISTERED_LOGGERS.items():
+        if logger.sink is not None:
+            sinks.setdefault(id(logger.sink), (logger.sink, []))[1].append(name)
+    checkpoint = SimulationCheckpoint(
+        simulator=simulator, payload=payload, random_state=random.getstate(),
+        class_level_state={_get_key(owner, name): getattr(owner, name) for (owner, name) in CLASS_LEVEL_STATE},
+        loggers_state={name: logger.get_state() for name, logger in _REGISTERED_LOGGERS.items()},
+        log_sinks_state=[(sink.path, sink.checkpoint(), sink.buffer_size, sink.compresslevel, names) for sink, names in sinks.values()]
+    )
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with gzip.open(path + ".tmp", 'wb', compresslevel=3) as file:
+        pickle.dump(checkpoint, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + ".tmp", path)
+
+def load_checkpoint(path: str) -> SimulationCheckpoint:
+    """
+    Loads a checkpoint, and restores the global state it recorded (random generator, class-level state, loggers).
+    Continue the simulation with any of the run methods of checkpoint.simulator.
+    """
+    with gzip.open(path, 'rb') as file:
+        checkpoint: SimulationCheckpoint = pickle.load(file)
+
+    if checkpoint.random_state is not None:
+        random.setstate(checkpoint.random_state)
+    for (owner, name) in CLASS_LEVEL_STATE:
+        key = _get_key(owner, name)
+        if key in checkpoint.class_level_state:
+            setattr(owner, name, checkpoint.class_level_state[key])
+    for name, state in checkpoint.loggers_state.items():
+        if name in _REGISTERED_LOGGERS:
+            _REGISTERED_LOGGERS[name].set_state(state)
+    for (path, size, buffer_size, compresslevel, names) in checkpoint.log_sinks_state: # Streamed logs continue from the checkpoint, dropping what was written after it.
+        sink = LogSink(path, buffer_size, compresslevel, resume_at=size)
+        for name in names:
+            if name in _REGISTERED_LOGGERS:
+                _REGISTERED_LOGGERS[name].set_sink(sink)
+
+    return checkpoint
@@ -0,0 +1,277 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .main import Channel, CHANNEL_LOGGER
+
+"""
+OUERTANI Mohamed Hachem <omhx21@gmail.com>
+
+Channel storing its links in compressed sparse row (CSR) arrays, for networks of tens of thousands of nodes.
+
+The topology is built as with any Channel (create_metric_mesh, create_bidirectional_link, ...), then frozen :
+- offsets[row] : position in the arrays below of the first link of the node of that row. Rows are sorted by node id.
+- neighbour_ids[offsets[row]:offsets[row+1]] : ids of its neighbours, sorted.
+- distances[...], reliabilities[...] : the matching link records.
+- attached[...] : False for links towards disabled nodes, detached_links of Channel (see Channel.set_node_enabled).
+The per-link Python tuples are then dropped. Broadcasting draws the losses of all of the sender's links in a single call (select_receivers),
+for senders of VECTORIZED_DRAW_MIN_LINKS links or more : below, NumPy calls cost more than drawing link by link, as Channel does.
+Enabling and disabling nodes (set_node_enabled) only flags their incoming links, in O(their number of links) : the channel stays frozen.
+Other modifications of the topology (assign_node, add_node_at, create_*_link, remove_*) thaw it back, in O(number of links), and it is
+frozen again at its next broadcast (select_receivers) : modifications made in a row, between two broadcasts, only thaw and freeze it once.
+Modifications alternating with broadcasts cost O(number of links) each : Channel is then the better choice.
+
+What ChannelCSR saves is memory : links take about 2.5 times less than in Channel (bench_channel_csr.py), not time.
+Reading a sender's links out of the arrays costs about 2 us more per broadcast than Channel at the usual degree of about 10
+(bench_reliability_sampling.py) ; simulations run about as fast, as scheduling and packets dominate.
+
+Senders drawing link by link use the random stream of Channel, the others a NumPy generator seeded from it :
+simulations are statistically equivalent to those of Channel, not identical.
+"""
+
+class ChannelCSR(Channel):
+    """ Channel whose links are frozen into CSR arrays. See above for the cost of modifying its topology : only set_node_enabled keeps it frozen. """
+
+    VECTORIZED_DRAW_MIN_LINKS = 40 # Senders with fewer links draw their losses one by one (see bench_reliability_sampling.py) : NumPy calls cost more than they save.
+
+    def __init__(self, packet_delay_per_unit=0.1):
+        super().__init__(packet_delay_per_unit)
+        self.frozen = False
+        self.offsets: Optional[np.ndarray] = None
+        self.neighbour_ids: Optional[np.ndarray] = None
+        self.distances: Optional[np.ndarray] = None
+        self.reliabilities: Optional[np.ndarray] = None
+        self.attached: Optional[np.ndarray] = None
+        self._bounds: Dict[int, Tuple[int, int]] = {} # Node id to (offsets[row], offsets[row+1]), as Python integers : indexing NumPy arrays one element at a time is slow.
+        self._all_reliable = True # Whether every link has a reliability of 1 : no loss to draw then.
+        self._incoming: Optional[Tuple[np.ndarray, np.ndarray]] = None # Link indices sorted by receiver, and their receivers : see _get_incoming_link_indices.
+        self._freeze_on_broadcast = False # Whether the channel was thawed by a modification of the topology, and is to be frozen again.
+
+    @staticmethod
+    def from_channel(channel: Channel) -> 'ChannelCSR':
+        """ Frozen copy of the links of channel, and of their reliability settings (see Channel.get_reliability). Its nodes are moved to the new channel. """
+        csr_channel = ChannelCSR(channel.packet_delay_per_distance_unit)
+        for node in channel.assigned_nodes.values():
+            csr_channel.assign_node(node)
+        for node_id, links in channel.adjacencies_per_node.items():
+            csr_channel.adjacencies_per_node[node_id] = dict(links)
+        csr_channel.mesh_grid = channel.mesh_grid; csr_channel.mesh_positions = dict(channel.mesh_positions)
+        csr_channel.mesh_distance_threshold = channel.mesh_distance_threshold; csr_channel.mesh_reliability = channel.mesh_reliability
+        csr_channel.detached_links = {node_id: dict(links) for node_id, links in channel.detached_links.items()}
+        csr_channel.disabled_node_ids = set(channel.disabled_node_ids)
+        csr_channel.removed_links = {node_id: dict(links) for node_id, links in channel.removed_links.items()}
+        csr_channel.reliability_all = channel.reliability_all; csr_channel.reliability_overrides = dict(channel.reliability_overrides)
+        csr_channel.reliability_multiplier = channel.reliability_multiplier; csr_channel.reliability_schedule = list(channel.reliability_schedule)
+        csr_channel._next_scheduled_reliability = channel._next_scheduled_reliability; csr_channel._next_reliability_change_time = channel._next_reliability_change_time
+        csr_channel.freeze()
+        return csr_channel
+
+    def freeze(self):
+        """
+        Converts the links to CSR arrays. adjacencies_per_node and detached_links are emptied : while frozen, links are only accessed
+        through the Channel methods. Adding nodes or links thaws the channel back, see thaw.
+        """
+        if self.frozen:
+            return
+        node_ids = sorted(self.adjacencies_per_node)
+        offsets = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        neighbour_ids: List[int] = []; distances: List[float] = []; reliabilities: List[float] = []; attached: List[bool] = []
+        disabled_node_ids = self.disabled_node_ids
+        for row, node_id in enumerate(node_ids):
+            links = list(self.adjacencies_per_node[node_id].values()) + list(self.detached_links.get(node_id, {}).values())
+            for (neighbour_id, distance, reliability) in sorted(links):
+                neighbour_ids.append(neighbour_id); distances.append(distance); reliabilities.append(reliability)
+                attached.append(neighbour_id not in disabled_node_ids)
+            offsets[row + 1] = len(neighbour_ids)
+
+        bounds = offsets.tolist()
+        self._bounds = {node_id: (bounds[row], bounds[row + 1]) for row, node_id in enumerate(node_ids)}
+        self.offsets = offsets
+        self.neighbour_ids = np.array(neighbour_ids, dtype=np.int64)
+        self.distances = np.array(distances, dtype=np.float64)
+        self.reliabilities = np.array(reliabilities, dtype=np.float64)
+        self.attached = np.array(attached, dtype=bool)
+        self._all_reliable = bool(np.all(self.reliabilities >= 1.0))
+        self.adjacencies_per_node = {}
+        self.detached_links = {}
+        self.senders_per_node = None # Built again from adjacencies_per_node once thawed, if needed.
+        self._incoming = None
+        self._freeze_on_broadcast = False
+        self.frozen = True
+
+    def thaw(self):
+        """ Converts the CSR arrays back to adjacencies_per_node and detached_links. Links of a node are then ordered by neighbour id. """
+        if not self.frozen:
+            return
+        for node_id, (start, end) in self._bounds.items():
+            links = self.adjacencies_per_node[node_id] = {}
+            for (neighbour_id, distance, reliability, attached) in zip(self.neighbour_ids[start:end].tolist(), self.distances[start:end].tolist(),
+                self.reliabilities[start:end].tolist(), self.attached[start:end].tolist()):
+                if attached:
+                    links[neighbour_id] = (neighbour_id, distance, reliability)
+                else:
+                    self.detached_links.setdefault(node_id, {})[neighbour_id] = (neighbour_id, distance, reliability)
+        self.offsets = self.neighbour_ids = self.distances = self.reliabilities = self.attached = None
+        self._bounds = {}
+        self._incoming = None
+        self._freeze_on_broadcast = False
+        self.frozen = False
+
+    def _thaw_to_modify(self):
+        """ Thaws the channel before a modification of its topology, to be frozen again at the next broadcast. """
+        if self.frozen:
+            self.thaw()
+            self._freeze_on_broadcast = True
+
+    def _get_link_index(self, node_id_1: int, node_id_2: int, detached: bool = False) -> int:
+        """ Position of the link node_id_1 -> node_id_2 in the CSR arrays, -1 if there is none. Detached links count as none, unless detached. """
+        bounds = self._bounds.get(node_id_1)
+        if bounds is None: # Removed node.
+            return -1
+        start, end = bounds
+        index = start + int(np.searchsorted(self.neighbour_ids[start:end], node_id_2))
+        if index < end and self.neighbour_ids[index] == node_id_2 and (detached or node_id_2 not in self.disabled_node_ids):
+            return index
+        return -1
+
+    def _get_incoming_link_indices(self, node_id: int) -> np.ndarray:
+        """ Positions in the CSR arrays of the links towards node_id. The index is built on first need, in O(number of links * log). """
+        if self._incoming is None:
+            order = np.argsort(self.neighbour_ids, kind='stable')
+            self._incoming = (order, self.neighbour_ids[order])
+        order, receiver_ids = self._incoming
+        return order[np.searchsorted(receiver_ids, node_id, side='left'):np.searchsorted(receiver_ids, node_id, side='right')]
+
+    # Topology modifications thaw the channel, but for set_node_enabled.
+    def assign_node(self, node):
+        self._thaw_to_modify()
+        super().assign_node(node)
+
+    def create_unidirectional_link(self, node_id_1: int, node_id_2: int, delay: float, reliability: float = 1.0):
+        self._thaw_to_modify()
+        super().create_unidirectional_link(node_id_1, node_id_2, delay, reliability)
+
+    def remove_link_unidirectional(self, node_id_1: int, node_id_2: int):
+        self._thaw_to_modify()
+        super().remove_link_unidirectional(node_id_1, node_id_2)
+
+    def remove_node(self, node_id: int):
+        self._thaw_to_modify()
+        return super().remove_node(node_id)
+
+    def set_node_enabled(self, node_id: int, enabled: bool):
+        """ Same as Channel's. While frozen, flags the links towards the node as (de)tached in place. """
+        if not self.frozen:
+            return super().set_node_enabled(node_id, enabled)
+        if enabled != (node_id in self.disabled_node_ids):
+            return
+        self.attached[self._get_incoming_link_indices(node_id)] = enabled
+        if enabled:
+            self.disabled_node_ids.discard(node_id)
+        else:
+            self.disabled_node_ids.add(node_id)
+        CHANNEL_LOGGER.log(f"{'Enabled' if enabled else 'Disabled'} node {node_id}")
+
+    # Link accessors.
+    def check_link(self, node_id_1: int, node_id_2: int, unidirectional: bool = False) -> bool:
+        if not self.frozen:
+            return super().check_link(node_id_1, node_id_2, unidirectional)
+        if self._get_link_index(node_id_1, node_id_2) != -1:
+            return True
+        return not unidirectional and self._get_link_index(node_id_2, node_id_1) != -1
+
+    def get_neighbour_ids(self, node_id) -> List[int]:
+        if not self.frozen:
+            return super().get_neighbour_ids(node_id)
+        start, end = self._bounds[node_id]
+        if self.disabled_node_ids:
+            return self.neighbour_ids[start:end][self.attached[start:end]].tolist()
+        return self.neighbour_ids[start:end].tolist()
+
+    def get_distance(self, node_id_1: int, node_id_2: int):
+        if not self.frozen:
+            return super().get_distance(node_id_1, node_id_2)
+        index = self._get_link_index(node_id_1, node_id_2)
+        assert(index != -1) # Assert the link exists.
+        return float(self.distances[index])
+
+    def get_time_delay(self, node_id_1: int, node_id_2: int):
+        if self.frozen:
+            index = self._get_link_index(node_id_1, node_id_2, detached=True)
+            if index != -1:
+                return self.packet_delay_per_distance_unit * float(self.distances[index])
+        return super().get_time_delay(node_id_1, node_id_2) # Removed links, see Channel.get_time_delay.
+
+    def set_reliability_unidirectional(self, node_id_1: int, node_id_2: int, reliability: float):
+        if not self.frozen:
+            return super().set_reliability_unidirectional(node_id_1, node_id_2, reliability)
+        index = self._get_link_index(node_id_1, node_id_2)
+        assert(index != -1) # Assert the link exists.
+        assert(reliability <= 1.0 and reliability >= 0.0)
+        if self.reliability_all is None:
+            self.reliabilities[index] = reliability
+            self._all_reliable = self._all_reliable and reliability >= 1.0
+        else:
+            self.reliability_overrides[(node_id_1, node_id_2)] = reliability
+        CHANNEL_LOGGER.log(f"Set reliability from {node_id_1} to {node_id_2} to {reliability}")
+
+    def _get_link_reliability(self, node_id_1: int, node_id_2: int) -> float:
+        if not self.frozen:
+            return super()._get_link_reliability(node_id_1, node_id_2)
+        index = self._get_link_index(node_id_1, node_id_2)
+        assert(index != -1) # Assert the link exists.
+        return float(self.reliabilities[index])
+
+    def select_receivers(self, sender_id: int) -> List[Tuple[int, float]]:
+        """
+        Same as Channel's, the losses of all of the sender's links being drawn at once if it has VECTORIZED_DRAW_MIN_LINKS or more.
+        Freezes the channel back if a modification thawed it.
+        """
+        if not self.frozen:
+            if not self._freeze_on_broadcast:
+                return super().select_receivers(sender_id)
+            self.freeze()
+
+        bounds = self._bounds.get(sender_id)
+        if bounds is None: # Removed node, transmitting what was scheduled before.
+            return []
+        start, end = bounds
+        if self.disabled_node_ids or end - start < self.VECTORIZED_DRAW_MIN_LINKS:
+            return self._select_receivers_per_link(sender_id, start, end)
+        multiplier = self.reliability_multiplier
+        if self.reliability_overrides:
+            reliabilities = np.array([self.get_reliability(sender_id, node_id) for node_id in self.neighbour_ids[start:end].tolist()])
+        elif self.reliability_all is not None:
+            reliabilities = self.reliability_all * multiplier
+            if reliabilities >= 1.0:
+                return list(zip(self.neighbour_ids[start:end].tolist(), self.distances[start:end].tolist()))
+        elif self._all_reliable and multiplier >= 1.0:
+            return list(zip(self.neighbour_ids[start:end].tolist(), self.distances[start:end].tolist()))
+        else:
+            reliabilities = self.reliabilities[start:end] if multiplier == 1.0 else self.reliabilities[start:end] * multiplier
+        delivered = start + np.flatnonzero(self._get_generator().random(end - start) < reliabilities)
+        return list(zip(self.neighbour_ids[delivered].tolist(), self.distances[delivered].tolist()))
+
+    def _select_receivers_per_link(self, sender_id: int, start: int, end: int) -> List[Tuple[int, float]]:
+        """ select_receivers drawing the loss of every link on its own, as Channel does. Skips detached links. """
+        draw = self.get_rng().random
+        multiplier = self.reliability_multiplier
+        own_reliabilities = self.reliability_all is None and not self.reliability_overrides and not (self._all_reliable and multiplier >= 1.0)
+        columns = [self.neighbour_ids[start:end].tolist(), self.distances[start:end].tolist()]
+        if own_reliabilities:
+            columns.append(self.reliabilities[start:end].tolist())
+        links = zip(*columns)
+        if self.disabled_node_ids:
+            disabled_node_ids = self.disabled_node_ids
+            links = [link for link in links if link[0] not in disabled_node_ids]
+        if self.reliability_overrides:
+            get_reliability = self.get_reliability
+            return [(node_id, distance) for (node_id, distance) in links
+                if (reliability := get_reliability(sender_id, node_id)) >= 1.0 or draw() < reliability]
+        if own_reliabilities:
+            return [(node_id, distance) for (node_id, distance, reliability) in links
+                if reliability * multiplier >= 1.0 or draw() < reliability * multiplier]
+        reliability = self.reliability_all * multiplier if self.reliability_all is not None else 1.0
+        if reliability >= 1.0:
+            return list(links)
+        return [(node_id, distance) for (node_id, distance) in links if draw() < reliability]
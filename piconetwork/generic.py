@@ -5,7 +5,7 @@ class ChannelGeneric(Channel):
                             packet: 'Packet', sender_id: int):
         """ As the name implies. It creates the appropriate events. """
         # Send packet to all adjacent points
-        for (node_id, distance) in self.adjacencies_per_node[sender_id]:
+        for (node_id, distance, _) in self.adjacencies_per_node[sender_id].values():
             new_packet = packet.forward(sender_id)
             new_packet.add_to_path(node_id)  # Add ID of receiver to its path.
             delay = distance * self.packet_delay_per_distance_unit
@@ -22,19 +22,19 @@ class NodeGeneric(Node):
         Registers receiving a packet, then processing it. Call back used
         by channels.
         """
-        self._log(f"received packet: {packet}")
+        self._log("received packet:", packet)
         super().receive_packet(simulator, packet)
 
     def broadcast_packet(self, simulator: Simulator, packet: Packet):
         """
         Broadcast packet through channel. 
         """
-        self._log(f"broadcast packet: {packet}")
+        self._log("broadcast packet:", packet)
         super().broadcast_packet(simulator, packet)
 
 class GatewayGeneric(Gateway):
     def process_packet(self, simulator: Simulator, packet: Packet):
-        self._log(f"captured packet: {packet}")
+        self._log("captured packet:", packet)
         # Gateways can also process packets like regular nodes if needed
         # self.process_packet(simulator, packet)
 
@@ -46,5 +46,5 @@ class SourceGeneric(Source):
 
     def send_packet(self, simulator: Simulator):
         packet = Packet(data="Hello", source_id=self.node_id, first_emission_time=simulator.get_current_time())
-        self._log(f"sending packet: {packet}")
+        self._log("sending packet:", packet)
         self.broadcast_packet(simulator, packet)
@@ -151,13 +151,21 @@ def plot_nodes_lpwan_better(nodes_list: List['NodeLP'], channel: 'Channel', titl
 
     plt.show()
 
+def _get_jitter_intervals(nodes: List[NodeLP]) -> int:
+    """ Number of jitter intervals of the nodes' parameters (all the nodes of a simulation share them). """
+    for node in nodes:
+        if isinstance(node, NodeLP):
+            return node.parameters.jitter_intervals
+    return NodeLP_Jitter_Configuration.JITTER_INTERVALS
+
 def plot_lpwan_jitter_interval_distribution(nodes: List[NodeLP]):
-    count_per_jitter_interval = [0 for i in range(NodeLP_Jitter_Configuration.JITTER_INTERVALS)]
+    jitter_intervals = _get_jitter_intervals(nodes)
+    count_per_jitter_interval = [0 for i in range(jitter_intervals)]
     for node in nodes:
         if isinstance(node, NodeLP) and node.get_enabled():
             count_per_jitter_interval[node.last_packets_informations[0].min_jitter] += 1
 
-    plt.bar([i+1 for i in range(NodeLP_Jitter_Configuration.JITTER_INTERVALS)], count_per_jitter_interval, label='Number of Nodes (Exluding Disabled)')
+    plt.bar([i+1 for i in range(jitter_intervals)], count_per_jitter_interval, label='Number of Nodes (Exluding Disabled)')
     plt.legend()
     plt.xlabel('Jitter Interval')
     plt.show()
@@ -177,7 +185,7 @@ def plot_helper_lpwan_jitter_recurrent_metric(simulator: 'Simulator', nodes : Li
     :jitter_distributions: List!
     :jitter_distirbutions_timestamps : List as well
     """
-    count_per_jitter_interval = [0 for i in range(NodeLP_Jitter_Configuration.JITTER_INTERVALS)]
+    count_per_jitter_interval = [0 for i in range(_get_jitter_intervals(nodes))]
     for node in nodes:
         if isinstance(node, NodeLP) and node.get_enabled():
             count_per_jitter_interval[node.last_packets_informations[0].min_jitter] += 1
@@ -191,7 +199,8 @@ def plot_lpwan_jitter_metrics(jitter_distributions_timestamps, jitter_distributi
 
     plot_bars_drawn = []
     bottom = [0 for i in range(len(jitter_distributions_timestamps))]
-    for i in range(NodeLP_Jitter_Configuration.JITTER_INTERVALS):
+    jitter_intervals = len(jitter_distributions) > 0 and len(jitter_distributions[0]) or NodeLP_Jitter_Configuration.JITTER_INTERVALS
+    for i in range(jitter_intervals):
 
         to_be_filled = []
         for j in range(len(jitter_distributions_timestamps)):
@@ -203,8 +212,8 @@ def plot_lpwan_jitter_metrics(jitter_distributions_timestamps, jitter_distributi
             bottom[j] += jitter_distributions[j][i]
 
 
-    handles = [plot_bars_drawn[i][0] for i in range(NodeLP_Jitter_Configuration.JITTER_INTERVALS)]
-    labels = [i for i in range(NodeLP_Jitter_Configuration.JITTER_INTERVALS)]
+    handles = [plot_bars_drawn[i][0] for i in range(jitter_intervals)]
+    labels = [i for i in range(jitter_intervals)]
     ax.legend(handles, labels, loc='upper left', bbox_to_anchor=(1, 1))
 
     plt.xlabel('Time Stamp')
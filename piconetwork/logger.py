@@ -1,8 +1,98 @@
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from array import array
+from collections import deque
+from heapq import merge
+from itertools import islice
+from operator import gt, itemgetter
 import io
+import os
 import re
 import gzip
 
+_REGISTERED_LOGGERS: Dict[str, 'Logger'] = {}
+
+def get_logger(name: str) -> 'Logger':
+	""" Returns the logger registered under that name (the first one created with it). """
+	return _REGISTERED_LOGGERS[name]
+
+def format_message(time: Optional[float], preamble: str, template: Optional[str], args: tuple) -> str:
+	"""
+	Message as logged by Loggable._log.
+	:time: Simulated time prefixed to the message as |time|, if not None.
+	:template: str.format template of the message. If None, the message is args separated by spaces, as print would write them.
+	"""
+	message = ' '.join(map(str, args)) if template is None else template.format(*args)
+	if time is None:
+		return preamble + message
+	return f'|{time:0.2f}| ' + preamble + message
+
+def get_message_time(message: str) -> float:
+	""" Simulated time of a formatted message, read from its |time| : 0.0 if it has none. Only for messages whose time was not recorded. """
+	times = re.findall(r"\|(.+?)\|", message)
+	return float(times[0]) if len(times) > 0 else 0.0
+
+class LogRecord:
+	"""
+	Message logged but not formatted yet : formatting is deferred until the logs are read (see Logger.logs), usually once the simulation is over.
+	Its arguments must then not change in between : Loggable._log snapshots the packets it is given.
+	"""
+	__slots__ = ('time', 'preamble', 'template', 'args')
+
+	def __init__(self, time: Optional[float], preamble: str, template: Optional[str], args: tuple):
+		""" See format_message. """
+		self.time = time
+		self.preamble = preamble
+		self.template = template
+		self.args = args
+
+	def render(self) -> str:
+		return format_message(self.time, self.preamble, self.template, self.args)
+
+class LogSink:
+	"""
+	Writes the messages of loggers to a gzip file while they are logged, instead of them being kept in memory until aggregate_logs_and_save.
+	Messages go through a buffer of at most buffer_size messages (deferred ones are formatted then) : memory stays bounded, however long the simulation.
+	Lines are those aggregate_logs_and_save writes, in the order they were logged : by time already, so there is nothing to sort.
+	Several loggers may share a sink, see Logger.set_sink.
+	"""
+
+	def __init__(self, path: str, buffer_size: int = 4096, compresslevel: int = 6, resume_at: Optional[int] = None):
+		"""
+		:path: gzip file written, replaced if it exists.
+		:resume_at: If given, the file is continued from that size (see checkpoint) instead of being replaced.
+		"""
+		self.path = path
+		self.buffer_size = buffer_size
+		self.compresslevel = compresslevel
+		self.buffer: List[Tuple[str, Union[str, 'LogRecord']]] = []
+		if resume_at is not None:
+			with open(path, 'r+b') as file:
+				file.truncate(resume_at)
+		self.file = gzip.open(path, 'at' if resume_at is not None else 'wt', compresslevel=compresslevel)
+
+	def write(self, name: str, entry: Union[str, 'LogRecord']):
+		""" Message entry of the logger named name. """
+		buffer = self.buffer
+		buffer.append((name, entry))
+		if len(buffer) >= self.buffer_size:
+			self.flush()
+
+	def flush(self):
+		self.file.write(''.join([f"[{name}]: {entry if type(entry) is str else entry.render()}\n" for name, entry in self.buffer]))
+		self.buffer.clear()
+
+	def checkpoint(self) -> int:
+		""" Writes everything logged so far, and ends the gzip member : the file is complete up to the size returned, see resume_at. """
+		self.flush()
+		self.file.close()
+		size = os.path.getsize(self.path)
+		self.file = gzip.open(self.path, 'at', compresslevel=self.compresslevel)
+		return size
+
+	def close(self):
+		self.flush()
+		self.file.close()
+
 class Logger:
 	def __init__(self, name, verbose = False, effective = True):
 		"""
@@ -13,50 +103,184 @@ class Logger:
 		Non-effective verbose logs can exist.
 		"""
 		self.name = name
-		self.logs = []
+		self._logs: List[Union[str, LogRecord]] = []
+		self._rendered_up_to = 0 # Every entry of _logs before that index is a string.
+		self._times = array('d') # Simulated time of every entry of _logs, 0.0 for messages logged without one. See iter_timed_logs.
 		self.verbose = verbose
 		self.effective = True
+		self.deferred = False # Whether Loggable._log defers formatting messages until they are read. See log_record.
+		self.sink: Optional[LogSink] = None # If set, kept messages are written there rather than to logs.
+		self.flight_recorder: Optional[deque] = None # If set, (time, message) of the last messages only, until dumped. See set_flight_recorder.
+		self.flight_recorder_dumps = 0
+		_REGISTERED_LOGGERS.setdefault(name, self)
 
-	def log(self, message: str, message_verbose: bool = True):
-		""" Add message to logs. Only prints it on screen if both logger is verbose, and the message is supposed to appear """
+	@property
+	def logs(self) -> List[str]:
+		""" Logged messages. Deferred ones (LogRecords) are formatted on access, once. """
+		logs = self._logs
+		for index in range(self._rendered_up_to, len(logs)):
+			entry = logs[index]
+			if type(entry) is LogRecord:
+				logs[index] = entry.render()
+		self._rendered_up_to = len(logs)
+		return logs
+
+	@logs.setter
+	def logs(self, logs: List[str]):
+		self._logs = logs
+		self._rendered_up_to = 0
+		self._times = array('d', map(get_message_time, logs))
+
+	def __reduce_ex__(self, protocol):
+		"""
+		Registered loggers are pickled by reference : objects logging to them (nodes, ...) keep logging to the same
+		module-level logger once unpickled, instead of to a detached copy.
+		"""
+		if _REGISTERED_LOGGERS.get(self.name) is self:
+			return (get_logger, (self.name,))
+		return super().__reduce_ex__(protocol)
+
+	def get_state(self) -> tuple:
+		""" Settings and records of the logger, see set_state. """
+		flight_recorder = (self.flight_recorder.maxlen, list(self.flight_recorder), self.flight_recorder_dumps) if self.flight_recorder is not None else None
+		return (self.effective, self.verbose, list(self.logs), array('d', self._times), flight_recorder)
+
+	def set_state(self, state: tuple):
+		self.effective, self.verbose, logs = state[:3]
+		self.logs = list(logs)
+		if len(state) > 3: # Older states have no times : they are read from the messages.
+			self._times = array('d', state[3])
+		flight_recorder = state[4] if len(state) > 4 else None
+		self.flight_recorder = deque(flight_recorder[1], flight_recorder[0]) if flight_recorder is not None else None
+		self.flight_recorder_dumps = flight_recorder[2] if flight_recorder is not None else 0
+
+	def log(self, message: str, message_verbose: bool = True, time: Optional[float] = None):
+		"""
+		Add message to logs. Only prints it on screen if both logger is verbose, and the message is supposed to appear
+		:time: Simulated time the message was logged at, if any. Orders it in aggregate_logs_and_save.
+		"""
 		if self.effective:
-			self.logs.append(message)
+			if self.flight_recorder is not None:
+				self.flight_recorder.append((time, message))
+			elif self.sink is not None:
+				self.sink.write(self.name, message)
+			else:
+				self._logs.append(message)
+				self._times.append(time if time is not None else 0.0)
 
 		if self.verbose and message_verbose:
 			print(f"[{self.name}]: {message}")
 
+	def log_record(self, record: LogRecord):
+		"""
+		Keeps a message to be formatted once read. Not printed : verbose messages are formatted right away, with log.
+		Deferring takes formatting out of the simulation, but keeps the records and what they reference in memory until then :
+		worth it when the logs are read after a long simulation, or only partly. Formatting them all costs more than doing it right away.
+		"""
+		if self.effective:
+			if self.flight_recorder is not None:
+				self.flight_recorder.append((record.time, record))
+			elif self.sink is not None:
+				self.sink.write(self.name, record)
+			else:
+				self._logs.append(record)
+				self._times.append(record.time if record.time is not None else 0.0)
+
+	def is_enabled(self) -> bool:
+		""" Whether a logged message would end up anywhere : in memory, or on screen. """
+		return self.effective or self.verbose
+
 	def set_effective(self, effective: bool):
 		self.effective = effective
 
 	def set_verbose(self, verbose: bool):
 		self.verbose = verbose
 
+	def set_deferred(self, deferred: bool):
+		self.deferred = deferred
+
+	def set_sink(self, sink: Optional[LogSink]):
+		""" Messages kept from now on are written to sink, as well as those kept so far (logs is emptied). None keeps them in logs again. """
+		if sink is not None:
+			for entry in self._logs:
+				sink.write(self.name, entry)
+			self.logs = []
+		self.sink = sink
+
+	def set_flight_recorder(self, capacity: Optional[int]):
+		"""
+		Keeps only the last capacity messages, in a ring buffer, rather than all of them : they reach logs (or the sink) once dumped,
+		usually when an anomaly is detected (see dump_flight_recorders). Memory no longer depends on the number of messages.
+		Messages kept so far stay in logs. None keeps every message again, dropping those not dumped.
+		"""
+		self.flight_recorder = deque(maxlen=capacity) if capacity is not None else None
+		self.flight_recorder_dumps = 0
+
+	def dump_flight_recorder(self, reason: str, time: Optional[float] = None) -> int:
+		"""
+		Moves the messages of the flight recorder to logs (or the sink), followed by a message giving reason.
+		:time: Simulated time of the dump.
+		:returns: Number of messages dumped.
+		"""
+		recorder = self.flight_recorder
+		if not recorder:
+			return 0
+		entries = list(recorder)
+		recorder.clear()
+		entries.append((time, format_message(time, '', "flight recorder : last {} messages, dumped on {}", (len(entries), reason))))
+		for entry_time, entry in entries:
+			if self.sink is not None:
+				self.sink.write(self.name, entry)
+			else:
+				self._logs.append(entry)
+				self._times.append(entry_time if entry_time is not None else 0.0)
+		self.flight_recorder_dumps += 1
+		return len(entries) - 1
+
 	def get_logs(self):
 		return [f"[{self.name}]: {message}" for message in self.logs]
 
+	def iter_timed_logs(self) -> Iterator[Tuple[float, str]]:
+		"""
+		(time, line) for every message kept, lines as in get_logs, by time.
+		Messages are logged as the simulated time goes, hence already in that order : they are only sorted (stably) if they are not,
+		which happens when messages without time follow timed ones. Deferred messages are formatted, but not kept formatted.
+		"""
+		times = self._times
+		entries = self._logs
+		prefix = f"[{self.name}]: "
+		order = range(len(entries))
+		if any(map(gt, times, islice(times, 1, None))):
+			order = sorted(order, key=times.__getitem__)
+		for index in order:
+			entry = entries[index]
+			yield times[index], prefix + (entry if type(entry) is str else entry.render())
+
 	def reset_logs(self):
 	    self.logs = []
+	    if self.flight_recorder is not None:
+	        self.flight_recorder.clear()
+	        self.flight_recorder_dumps = 0
 
-def aggregate_logs_and_save(loggers: List['Logger'], path):
+def dump_flight_recorders(loggers: Iterable['Logger'], reason: str, time: Optional[float] = None):
+	""" Dumps the flight recorders of those of loggers having one, see Logger.dump_flight_recorder. """
+	for logger in loggers:
+		if logger.flight_recorder is not None:
+			logger.dump_flight_recorder(reason, time)
+
+def aggregate_logs_and_save(loggers: List['Logger'], path, chunk_size: int = 4096):
     """
-    Aggregates logs from multiple loggers and saves them in the given path
-    Note: the lines are NOT linear as per the event scheduler, YET. ( TODO )
+    Aggregates logs from multiple loggers and saves them in the given path, by simulated time.
+    The messages of every logger being in that order already (see Logger.iter_timed_logs), they are merged while written rather than
+    gathered and sorted. Messages logged at the same time keep the order of loggers, then the order they were logged in.
+    :chunk_size: Lines written at once.
     """
-    logs = []
-
-    for logger in loggers:
-        logs.extend(logger.get_logs())
-
-    def get_key_for_sort(log_message):
-        b = re.findall(r"\|(.+?)\|", log_message)
-        if len(b) > 0:
-            return float(b[0])
-        else:
-            return 0.0
-
-    logs = sorted(logs, key = get_key_for_sort)
-
-    file = gzip.open(path+".gz", 'wt')
-    for log in logs:
-        file.write(log+'\n')
-    file.close()
+    with gzip.open(path+".gz", 'wt') as file:
+        lines = []
+        for _, line in merge(*[logger.iter_timed_logs() for logger in loggers], key=itemgetter(0)):
+            lines.append(line)
+            if len(lines) >= chunk_size:
+                file.write('\n'.join(lines) + '\n')
+                lines.clear()
+        if lines:
+            file.write('\n'.join(lines) + '\n')
@@ -7,7 +7,9 @@ import io, re, gzip, os
 from typing import Optional, Tuple
 from .simulutils import VALID_MODES, Simulatable_MetadataAugmented_Dumpable_Network_Object,\
     SimulationParameters, GenerationParameters
+from .trace import TraceKind, load_trace
 import pickle
+import numpy as np
 
 def get_mode(log):
     b = re.findall(r"^\[(.+?)\]", log)
@@ -25,6 +27,12 @@ def get_packet_info(log):
     m = re.findall(r"\<(\d+),.+?\>",b[0])
     return int(m[0]) # id
 
+def get_jitter_update(log):
+    """ returns the new jitter of a "jitter updated to" log """
+    b = re.findall(r"jitter updated to (\S+)", log)
+    assert(len(b)>0)
+    return float(b[0])
+
 def get_number_of_hops(log):
     """ returns (id, num_of_hops) """
     # Example : packet 2354 is ... ... through 4 intermediate hops
@@ -36,10 +44,11 @@ def get_number_of_hops(log):
 class LogDisector_Single_Source:
     """ Adapted to the case where we have a single source, and we consider any gateway to be the same at the end bit. """
 
-    def __init__(self, path_logs, path_metadata_dump):
+    def __init__(self, path_logs, path_metadata_dump, path_trace = None):
         """
         :path_logs: Path to aggregated logs file
         :path_metadata_dump: Path to metadata aggregated dump
+        :path_trace: Path to the trace of the simulation (see trace.py), if recorded. Read instead of the logs : much faster.
         """
 
         self.path = path_logs
@@ -59,7 +68,9 @@ class LogDisector_Single_Source:
         if path_metadata_dump != None:
             self.process_metadata_dump(path_metadata_dump)
 
-        if path_logs != None:
+        if path_trace != None:
+            self.process_trace(path_trace)
+        elif path_logs != None:
             self.process_logs(path_logs)
 
     def treat_single_log(self, log):
@@ -96,6 +107,8 @@ class LogDisector_Single_Source:
                 self.node_stats['received_packets_times'].append(ts)
             elif "retransmitted" in log:
                 self.node_stats['transmitted_packets_times'].append(ts)
+            elif "jitter updated to" in log:
+                self.node_stats['jitter_updates'].append((ts, get_jitter_update(log)))
 
     def process_metadata_dump(self, path):
         """
@@ -110,6 +123,21 @@ class LogDisector_Single_Source:
         Name of file MUST be of the format nameprefix_MODE_count.
         """
 
+        dir, name = self.process_file_name(path)
+
+        file = gzip.open(path, "rt")
+        logs = []
+
+        for line in file.readlines():
+            logs.append(line)
+            self.treat_single_log(line) # Treat line
+
+        file.close()
+
+        return (dir, name)
+
+    def process_file_name(self, path) -> Tuple[str, str]:
+        """ Sets simname, mode and count from the name of the logs (or trace) file, of the format nameprefix_MODE_count_logs... """
         dir, name = os.path.split(os.path.abspath(path))
         simname, mode, count = re.findall(r"(.+)_(.+)_(.+)_logs", name)[0]
 
@@ -120,13 +148,34 @@ class LogDisector_Single_Source:
         self.simname = simname
         self.count = count
 
-        file = gzip.open(path, "rt")
-        logs = []
-
-        for line in file.readlines():
-            logs.append(line)
-            self.treat_single_log(line) # Treat line
+        return (dir, name)
 
-        file.close()
+    def process_trace(self, path) -> Tuple[str, str]:
+        """
+        Same as process_logs, from the trace of the simulation : the same statistics, without parsing any text.
+        Times are rounded to 2 decimals, as the logs write them.
+        Name of file MUST be of the format nameprefix_MODE_count_logs_trace.npz (see simulutils.get_trace_file_name).
+        """
+        dir, name = self.process_file_name(path)
+        trace = load_trace(path)
+        kind = trace['kind']; packet_id = trace['packet_id']; hops = trace['hops']
+        time = np.array([round(ts, 2) for ts in trace['time'].tolist()]) # round, as f'{ts:0.2f}' does : np.round may differ in the last digit.
+
+        sent = kind == TraceKind.SOURCE_SENT
+        for id, ts in zip(packet_id[sent].tolist(), time[sent].tolist()):
+            self.packet_lifetime_infos[id] = [ts, False, False] # Emission time, reception time, number of hops
+
+        captured = np.flatnonzero(kind == TraceKind.GATEWAY_CAPTURED)
+        for id, ts, num_of_hops in zip(packet_id[captured].tolist(), time[captured].tolist(), hops[captured].tolist()):
+            assert(id in self.packet_lifetime_infos.keys())
+            infos = self.packet_lifetime_infos[id]
+            infos[1] = ts if infos[1] == False else min(ts, infos[1])
+            infos[2] = num_of_hops if infos[2] == False else min(num_of_hops, infos[2])
+
+        # As process_logs, counts both the "received packet" and "state when received:" logs of nodes.
+        self.node_stats['received_packets_times'].extend(time[np.isin(kind, [TraceKind.NODE_RECEIVED, TraceKind.NODE_PROCESSED])].tolist())
+        self.node_stats['transmitted_packets_times'].extend(time[kind == TraceKind.NODE_RETRANSMITTED].tolist())
+        jitter_updated = kind == TraceKind.NODE_JITTER_UPDATED
+        self.node_stats['jitter_updates'].extend(zip(time[jitter_updated].tolist(), trace['jitter'][jitter_updated].tolist()))
 
         return (dir, name)
@@ -2,9 +2,11 @@ import heapq
 
 from .main import *
 from .packet import Packet
-from .logger import Logger
+from .logger import Logger, dump_flight_recorders
+from .trace import TraceKind
 
-from typing import Any, Tuple, ClassVar, Type, Optional
+from typing import Any, Tuple, ClassVar, Type, Optional, FrozenSet, Set
+from dataclasses import dataclass
 from enum import Enum, auto
 
 import random
@@ -52,9 +54,11 @@ class PacketLP(Packet):
     - whether it is an ACK or not (and which packet_id it acks if so.)
     The last_in_path
     """
-    packet_id_counter = 1  # Static variable to the class
+    __slots__ = ()
 
     class DataLP:
+        __slots__ = ('packet_id', 'source_id', 'last_in_path', 'before_last_in_path', 'ack')
+
         def __init__(self, source_id: int, packet_id : int, ack : tuple[bool, int]= (False, -1), before_last_in_path = -1):
             self.packet_id = packet_id
             self.source_id = source_id
@@ -62,17 +66,29 @@ class PacketLP(Packet):
             self.before_last_in_path = before_last_in_path # TODO : TEMPORARY FIX FOR "FORWARDED PACKET" DETERMINISTIC DETECTION. TO BE FIXED LATER
             self.ack = ack
 
+        def relayed_by(self, node_id: int) -> 'PacketLP.DataLP':
+            """ Copy of the data as retransmitted by node_id. The data of a packet is shared by all its copies, so it is never modified in place. """
+            relayed = PacketLP.DataLP.__new__(PacketLP.DataLP)
+            relayed.packet_id = self.packet_id
+            relayed.source_id = self.source_id
+            relayed.last_in_path = node_id
+            relayed.before_last_in_path = self.last_in_path
+            relayed.ack = self.ack
+            return relayed
+
         def __repr__(self) -> str:
             return f'<{self.packet_id},{self.source_id},{self.last_in_path},{self.before_last_in_path},{self.ack}>'
 
-    def __init__(self, source_id: int, first_emission_time:float = -1, ack : Tuple[bool, int]= (False, -1), before_last_in_path = -1):
+    def __init__(self, source_id: int, first_emission_time:float = -1, ack : Tuple[bool, int]= (False, -1), before_last_in_path = -1, packet_id: Optional[int] = None):
         """
         Re-insisting : "source_id" would be the gateway's ID if the
         gateway is sending a message back to a source.
+        :packet_id: Given by the context of the emitting node (node.context.new_packet_id()). Taken from DEFAULT_CONTEXT if None.
         """
-        data : self.DataLP = self.DataLP(source_id, PacketLP.packet_id_counter, ack, before_last_in_path)
+        if packet_id is None:
+            packet_id = DEFAULT_CONTEXT.new_packet_id()
+        data : self.DataLP = self.DataLP(source_id, packet_id, ack, before_last_in_path)
         super().__init__(data, source_id, first_emission_time=first_emission_time)
-        PacketLP.packet_id_counter += 1
 
     def get_id(self):
         return self.data.packet_id
@@ -144,7 +160,7 @@ class NodeLP_Retxpending_Handler(NodeLP_BaseState_Handler):
         if packet_jitter_info.get_internal_state() != NodeLP_Packet_State.RETX_PENDING:
             raise AssertionError("State not expected in scheduled transmission. Event of retransmission should be _canceled_ in the case packet treatment halted")
 
-        random_decisive_variable = random.random()
+        random_decisive_variable = node.get_rng().random()
         if random_decisive_variable < packet_jitter_info.get_transmission_probability():
             # Forward packet, and go to followup state.
             packet_jitter_info.retransmission_time = simulator.get_current_time()
@@ -159,7 +175,9 @@ class NodeLP_Retxpending_Handler(NodeLP_BaseState_Handler):
             packet_jitter_info.event_handle = None
             packet_jitter_info.handle_possible_suppression_set_or_unset()
             node.packet_window_free(packet_jitter_info.packet_id_index)
-            node._log(f"dropped packet {packet} on suppression state")
+            node._log_format("dropped packet {} on suppression state", packet)
+            if simulator.trace.enabled:
+                simulator.trace.record(TraceKind.NODE_DROPPED, simulator.current_time, node.get_id(), packet.get_id(), suppression=packet_jitter_info.suppression_mode.value)
 
 class NodeLP_Followuppending_Handler(NodeLP_BaseState_Handler):
     @staticmethod
@@ -216,8 +234,11 @@ class NodeLP_Followuppending_Handler(NodeLP_BaseState_Handler):
             # Depending on suppression mode, some value reset is due here. Changed in the future
             packet_jitter_info.handle_possible_suppression_set_or_unset(direct_ack_from_gateway_unset=direct_ack_from_gateway)
         else:
+            max_jitter_before, suppression_mode_before = packet_jitter_info.max_jitter, packet_jitter_info.suppression_mode
             packet_jitter_info.step_increase_jitter()
             packet_jitter_info.handle_possible_suppression_set_or_unset(no_followup_heard_set=True)
+            if node.parameters.flight_recorder_triggers: # Followups received are treated within node.process_packet, which checks the triggers itself.
+                node.check_flight_recorder_triggers(simulator, packet, packet_jitter_info, max_jitter_before, suppression_mode_before)
 
         packet_jitter_info.set_internal_state(NodeLP_Packet_State.IDLE)
         packet_jitter_info.event_handle = None
@@ -244,7 +265,7 @@ class NodeLP_Fastflooding_Handler(NodeLP_BaseState_Handler):
     def process_packet(simulator: 'Simulator', node: 'NodeLP', packet: 'PacketLP', packet_jitter_info: 'NodeLP_Jitter_Configuration'):
         # Add fast delay
         if not packet.data.ack:
-            event = simulator.schedule_event(random.random() * packet_jitter_info._JITTER_INTERVAL_DURATION(), NodeLP_Packet_State.FASTFLOODING.value.transmit_packet_lp_schedulable,  node, packet, packet_jitter_info)
+            event = simulator.schedule_event(node.get_rng().random() * packet_jitter_info._JITTER_INTERVAL_DURATION(), NodeLP_Packet_State.FASTFLOODING.value.transmit_packet_lp_schedulable,  node, packet, packet_jitter_info)
             packet_jitter_info.event_handle = event
 
     @staticmethod
@@ -257,7 +278,7 @@ class NodeLP_Slowflooding_Handler(NodeLP_BaseState_Handler):
     def process_packet(simulator: 'Simulator', node: 'NodeLP', packet: 'PacketLP', packet_jitter_info: 'NodeLP_Jitter_Configuration'):
     # Schedule retransmission.
         if not packet.data.ack:
-            event = simulator.schedule_event(random.random() * packet_jitter_info.JITTER_MAX_VALUE, NodeLP_Packet_State.SLOWFLOODING.value.transmit_packet_lp_schedulable, node, packet, packet_jitter_info)
+            event = simulator.schedule_event(node.get_rng().random() * packet_jitter_info.parameters.jitter_max_value, NodeLP_Packet_State.SLOWFLOODING.value.transmit_packet_lp_schedulable, node, packet, packet_jitter_info)
             packet_jitter_info.event_handle = event
 
     @staticmethod
@@ -297,6 +318,41 @@ class NodeLP_Suppression_Mode(Enum):
     DEFAULT_SUPPRESSION = AGGRESSIVE # DEFINE DEFAULT SUPPRESSION MODE HERE!
     PROBABILISTIC_SUPPRESSIONS = [CONSERVATIVE, AGGRESSIVE] # List all probabilistic suppressions
 
+class FlightRecorderTrigger(Enum):
+    """
+    Anomalies on which the flight recorders of the loggers are dumped (see Logger.set_flight_recorder), once armed in NodeLP_Parameters.flight_recorder_triggers.
+    """
+    PACKET_LOST = auto() # A packet of a source was captured by no gateway before the source sent its next one.
+    JITTER_MAX = auto() # The jitter of a node for a packet reached its last interval (jitter_intervals).
+    SUPPRESSION_SWITCH = auto() # A node switched to its suppression mode.
+
+@dataclass
+class NodeLP_Parameters:
+    """
+    Parameters of the jitter adaptation and of the reception of packets, of all the nodes of one simulation.
+    Nodes and their jitter configurations reference it rather than copying it : the nodes sharing it all see its changes.
+    Networks referencing different NodeLP_Parameters can be simulated side by side in the same process.
+    """
+    jitter_intervals: int # Number of intervals to divide the jitter to.
+    jitter_min_value: float
+    jitter_max_value: float
+    adaptation_factor: float # Value in interval (0,1]
+    node_reception_of_packet_duration: float # Time a node takes to receive a packet, during which other receptions collide.
+    flight_recorder_triggers: FrozenSet[FlightRecorderTrigger] = frozenset() # Anomalies checked for, dumping the flight recorders of flight_recorder_loggers.
+    flight_recorder_loggers: Tuple[Logger, ...] = () # Loggers of the simulation : those of other simulations of the process are left alone.
+
+    def get_jitter_interval_duration(self) -> float:
+        return (self.jitter_max_value - self.jitter_min_value)/self.jitter_intervals
+
+    @staticmethod
+    def from_class_defaults() -> 'NodeLP_Parameters':
+        """
+        Parameters as currently set in the class attributes NodeLP_Jitter_Configuration.JITTER_*, ADAPTATION_FACTOR and NodeLP.NODE_RECEPTION_OF_PACKET_DURATION.
+        Used by the nodes created without parameters : scripts setting these class attributes before creating their nodes keep working.
+        """
+        return NodeLP_Parameters(NodeLP_Jitter_Configuration.JITTER_INTERVALS, NodeLP_Jitter_Configuration.JITTER_MIN_VALUE, NodeLP_Jitter_Configuration.JITTER_MAX_VALUE,
+            NodeLP_Jitter_Configuration.ADAPTATION_FACTOR, NodeLP.NODE_RECEPTION_OF_PACKET_DURATION)
+
 class NodeLP_Jitter_Configuration:
     """
     This would be valid for every packet in the node's capacity.
@@ -309,6 +365,7 @@ class NodeLP_Jitter_Configuration:
     # Nonetheless, it would require some number of bytes of storage in all cases.
     # Also: this doesn't treat the case of where neighbours can get lost due to weather situation/etc ...
 
+    # Defaults of NodeLP_Parameters.from_class_defaults. Configurations use their own parameters, never these.
     ADAPTATION_FACTOR: float = 0.5 # Value in interval (0,1]
     JITTER_MIN_VALUE: float = 0.2
     JITTER_MAX_VALUE: float = 1.2
@@ -319,18 +376,23 @@ class NodeLP_Jitter_Configuration:
     SUPPRESSION_AGGRESSIVE_PROBABILITY = 0.2 # p_min as described in the paper
     SUPPRESSION_MODE_SWITCH : ClassVar[NodeLP_Suppression_Mode] = NodeLP_Suppression_Mode.DEFAULT_SUPPRESSION
 
-    def _JITTER_INTERVAL_DURATION(self): return (self.JITTER_MAX_VALUE - self.JITTER_MIN_VALUE)/self.JITTER_INTERVALS
+    def _JITTER_INTERVAL_DURATION(self): return self.parameters.get_jitter_interval_duration()
 
-    def _FOLLOWUP_PENDING_DONE_TIMEOUT(self): return 2 * self.JITTER_MAX_VALUE
+    def _FOLLOWUP_PENDING_DONE_TIMEOUT(self): return 2 * self.parameters.jitter_max_value
 
-    def __init__(self, packet_message_id = -1, source_id = -1, antecessor_id = -1, packet_id = -1, packet_id_index = -1, mode : NodeLP_Suppression_Mode = NodeLP_Suppression_Mode.DEFAULT_SUPPRESSION, handler:Type[NodeLP_BaseState_Handler] = NodeLP_Idle_Handler ):
+    def __init__(self, packet_message_id = -1, source_id = -1, antecessor_id = -1, packet_id = -1, packet_id_index = -1, mode : NodeLP_Suppression_Mode = NodeLP_Suppression_Mode.DEFAULT_SUPPRESSION, handler:Type[NodeLP_BaseState_Handler] = NodeLP_Idle_Handler, rng: Optional[random.Random] = None, parameters: Optional[NodeLP_Parameters] = None):
         """
         :packet_message_id: Packet Message ID (same one for M or ack of M).
         :packet_id: Packet ID (M and ack of M don't have same ID).
         :source_id: 0 for "any gateway", > 0 for a specific source
         :packet_id_index: position in the node's internal table. Must be set by the node!
         :mode: Suppression mode that we switch to when we reach maximum jitter.
+        :rng: Random generator drawing the jitters, shared with the node. The random module's generator if None.
+        :parameters: Jitter parameters, shared with the node. NodeLP_Parameters.from_class_defaults() if None.
         """
+        self.rng = rng
+        self.parameters = parameters if parameters is not None else NodeLP_Parameters.from_class_defaults()
+
         # Redundant id tracking for easier coding - not truly an internal state variable, code can be rewritten to omit it.
         self.packet_id_index = packet_id_index
         self.internal_state_for_packet_handler: Type[NodeLP_BaseState_Handler] = handler
@@ -418,6 +480,9 @@ class NodeLP_Jitter_Configuration:
     def get_neighbours_count(self) -> int:
         return len(self.neighbours_noted)
 
+    def get_rng(self):
+        return self.rng if self.rng is not None else random
+
     def get_transmission_probability(self):
         if self.suppression_mode == NodeLP_Suppression_Mode.CONSERVATIVE:
             self.probability_of_forwarding = 1.0 / (1 + self.get_neighbours_count())
@@ -438,11 +503,11 @@ class NodeLP_Jitter_Configuration:
 
     def get_max_jitter(self) -> float:
         """ Get the maximum jitter of the state. """
-        return self.max_jitter * self._JITTER_INTERVAL_DURATION() + self.JITTER_MIN_VALUE
+        return self.max_jitter * self._JITTER_INTERVAL_DURATION() + self.parameters.jitter_min_value
 
     def get_min_jitter(self) -> float:
         """ Get the minimum jitter of the state. """
-        return self.min_jitter * self._JITTER_INTERVAL_DURATION() + self.JITTER_MIN_VALUE
+        return self.min_jitter * self._JITTER_INTERVAL_DURATION() + self.parameters.jitter_min_value
 
     def get_jitter_random(self) -> float:
         """
@@ -451,7 +516,7 @@ class NodeLP_Jitter_Configuration:
         Reason : avoid collisions of packets IRL - for packets collide and cause jumble when well synchronized.
         """
         min_j = self.get_min_jitter()
-        jitter = random.random() * (self.get_max_jitter() - min_j) + min_j
+        jitter = self.get_rng().random() * (self.get_max_jitter() - min_j) + min_j
         return jitter
 
     def get_jitter_average(self) -> float:
@@ -462,15 +527,15 @@ class NodeLP_Jitter_Configuration:
     def set_jitter_interval_around(self, jitter):
         """ Sets jitter to a narrow interval around the given value. """
         # TODO : clip jitter instead
-        assert jitter >= self.JITTER_MIN_VALUE and jitter <= self.JITTER_MAX_VALUE, "Jitter set outside of allowed values"
-        jitter_min_index = min(int(math.floor((jitter-self.JITTER_MIN_VALUE)/self._JITTER_INTERVAL_DURATION())), self.JITTER_INTERVALS-1)
-        jitter_max_index = max(int(math.ceil((jitter-self.JITTER_MIN_VALUE)/self._JITTER_INTERVAL_DURATION())), 1)
+        assert jitter >= self.parameters.jitter_min_value and jitter <= self.parameters.jitter_max_value, "Jitter set outside of allowed values"
+        jitter_min_index = min(int(math.floor((jitter-self.parameters.jitter_min_value)/self._JITTER_INTERVAL_DURATION())), self.parameters.jitter_intervals-1)
+        jitter_max_index = max(int(math.ceil((jitter-self.parameters.jitter_min_value)/self._JITTER_INTERVAL_DURATION())), 1)
         self.min_jitter = jitter_min_index
         self.max_jitter = jitter_max_index
 
     def clip_jitter(self, jitter):
         """ Returns a cliped jitter in the appropriate interval """
-        return max(self.JITTER_MIN_VALUE, min(self.JITTER_MAX_VALUE, jitter))
+        return max(self.parameters.jitter_min_value, min(self.parameters.jitter_max_value, jitter))
 
     def half_reduce_jitter_with_minimize(self):
         """ Sets jitter to minimal interval around half the average current value """
@@ -483,7 +548,7 @@ class NodeLP_Jitter_Configuration:
 
     def step_increase_jitter(self):
         """ Increases jitter interval indexes of both min and max by 1 """
-        self.max_jitter = min(self.max_jitter + 1, self.JITTER_INTERVALS) # The order is important
+        self.max_jitter = min(self.max_jitter + 1, self.parameters.jitter_intervals) # The order is important
         self.min_jitter = min(self.min_jitter + 1, self.max_jitter - 1)
 
     def double_increase_jitter_with_minimize(self):
@@ -495,7 +560,7 @@ class NodeLP_Jitter_Configuration:
         # NOTE : this differs from the Jiazi Yi's code, which itself isn't compatible with the paper's note.
         # To make the technique functional, we render the adaptation probabilistic : instead of adding the difference, we switch to the new value with a probability
         old_jitter_average = self.get_jitter_average()
-        new_jitter_average = (1 - self.ADAPTATION_FACTOR) * old_jitter_average + self.ADAPTATION_FACTOR * other_jitter
+        new_jitter_average = (1 - self.parameters.adaptation_factor) * old_jitter_average + self.parameters.adaptation_factor * other_jitter
         self.set_jitter_interval_around(self.clip_jitter(new_jitter_average))
 
     def minimize_jitter_interval(self):
@@ -507,7 +572,7 @@ class NodeLP_Jitter_Configuration:
         Makes jitter random over the full range.
         This is different from having an assigned jitter interval.
         """
-        self.min_jitter = random.randint(0, self.JITTER_INTERVALS - 1) # MUST BE A NUMBER BETWEEN 0 and min(self.max_jitter,JITTER_INTERVALS)-1
+        self.min_jitter = self.get_rng().randint(0, self.parameters.jitter_intervals - 1) # MUST BE A NUMBER BETWEEN 0 and min(self.max_jitter,JITTER_INTERVALS)-1
         self.max_jitter = self.min_jitter + 1 # MUST BE A NUMBER max(self.min_jitter,0)+1 and JITTER_INTERVALS
 
     def set_suppression_mode(self, mode):
@@ -530,17 +595,13 @@ class NodeLP_Jitter_Configuration:
         For simplicity, suppression is set or unset at the end of every packet cycle. This way, it is consistent (compared to the current way that it is dealt with)
         Also for simplicity, for now, setting or unsetting suppression mode has the same condition.
         """
-        if self.max_jitter != self.JITTER_INTERVALS or direct_ack_from_gateway_unset:
+        if self.max_jitter != self.parameters.jitter_intervals or direct_ack_from_gateway_unset:
             self.set_suppression_mode(NodeLP_Suppression_Mode.REGULAR)
-        elif self.max_jitter == self.JITTER_INTERVALS or no_followup_heard_set:
+        elif self.max_jitter == self.parameters.jitter_intervals or no_followup_heard_set:
             self.set_suppression_mode(self.suppression_switch)
         else:
             pass # Do nothing I guess! Keep it as it is. Although this is impossible to reach, self.max_jitter can't not be == or != at the same time
 
-class NodeLP_Receiver_State(Enum):
-    READY_TO_RECEIVE = auto()
-    NOT_READY_TO_RECEIVING = auto() # If a NodeLP receives a packet while it's receiving another, it considers that there is a collision and both packets get dropped.
-
 class NodeLP(Node):
     """
     Implementation following paper.
@@ -559,7 +620,8 @@ class NodeLP(Node):
 
     DISSALLOW_MULTIPLE_RETRANSMISSIONS = True # If the same packet_id can be reassigned to the same window as before. can happen in some "ping pong" situations
 
-    NODE_RECEPTION_OF_PACKET_DURATION = NodeLP_Jitter_Configuration._JITTER_INTERVAL_DURATION(NodeLP_Jitter_Configuration) / 6.0 # Here we hard-code it per-packet. Normally, this would depend on the packet length among other things.
+    # Default of NodeLP_Parameters.from_class_defaults.
+    NODE_RECEPTION_OF_PACKET_DURATION = (NodeLP_Jitter_Configuration.JITTER_MAX_VALUE - NodeLP_Jitter_Configuration.JITTER_MIN_VALUE) / NodeLP_Jitter_Configuration.JITTER_INTERVALS / 6.0 # Here we hard-code it per-packet. Normally, this would depend on the packet length among other things.
     # Here we set it to be the minimal jitter value divided by 4 (ARBITRARY CHOICE)
 
     # Default entry points depending on the mode of the node
@@ -583,8 +645,16 @@ class NodeLP(Node):
         'FASTFLOODING': NodeLP_Packet_State.FASTFLOODING,
     }
 
-    def __init__(self, x: float, y: float, channel: 'Channel' = None, mode = "REGULAR"):
-        super().__init__(x, y, channel)
+    def __init__(self, x: float, y: float, channel: 'Channel' = None, mode = "REGULAR", rng: Optional[random.Random] = None,
+        context: Optional[SimulationContext] = None, parameters: Optional[NodeLP_Parameters] = None):
+        """
+        :rng: Random generator of the node, drawing its initial jitters among others. See Node.set_rng.
+        :context: Numbering of nodes and packets, see Node.
+        :parameters: Jitter and reception parameters, typically shared by all the nodes of the network. NodeLP_Parameters.from_class_defaults() if None.
+        """
+        super().__init__(x, y, channel, context=context)
+        self.rng = rng
+        self.parameters = parameters if parameters is not None else NodeLP_Parameters.from_class_defaults()
         # Stores list of last heard packet ids, with respect to the capacity
         # A packet_id is removed (set to -1) from the list when the node hears back its echo
         # This way, a packet never gets retransmitted twice by the same node (w/r to capacity)
@@ -595,15 +665,13 @@ class NodeLP(Node):
         self.mode = mode
 
         # Internal state variables for each packet in capacity of being treated.
-        self.last_packets_informations = [NodeLP_Jitter_Configuration(packet_id_index=i, mode=self.MODE_TO_SUPPRESSION_DICTIONARY[mode], handler=self.MODE_TO_STATE_DICTIONARY[mode].value) for i in range(NodeLP.PACKETS_STATE_CAPACITY)]
+        self.last_packets_informations = [NodeLP_Jitter_Configuration(packet_id_index=i, mode=self.MODE_TO_SUPPRESSION_DICTIONARY[mode], handler=self.MODE_TO_STATE_DICTIONARY[mode].value, rng=rng, parameters=self.parameters) for i in range(NodeLP.PACKETS_STATE_CAPACITY)]
 
         # Cycling stack or heap for last treated packets
         self.last_packets_remembered = [] # USED WITH heapq MODULE : retains just the packet IDs of the last
 
-        # A node cannot receive packets instantaneously : it takes time. So we define some variable to be the "packet reception duration"
-        # If we receive another packet whilst we're receiving another, we drop both!
-        self.ready_to_receive = NodeLP_Receiver_State.READY_TO_RECEIVE
-        self.reception_event = None # This is an event handler so we can cancel it in case.
+        # A node cannot receive packets instantaneously : it takes time, the "packet reception duration" of its parameters.
+        # If we receive another packet whilst we're receiving another, we drop both! Handled by the reception engine of the channel (see reception.py).
 
         # For logging purposes :
         self._jitter_interval_before = 0
@@ -620,17 +688,38 @@ class NodeLP(Node):
         self.enabled = True
 
     def reset_mode_to(self, mode):
-        """ Switches node's mode, useful for rerunning experiments over the same topology without regenerating the whole network """
+        """
+        Switches node's mode, useful for rerunning experiments over the same topology without regenerating the whole network
+        The packets treated and remembered are forgotten as well : packet ids restart from 1 in every simulation (see SimulationContext.reset_packet_ids).
+        """
         assert mode in self.MODE_TO_STATE_DICTIONARY.keys(), f"Unrecognized mode {mode}"
         self.mode = mode
         self.last_packets_informations[0].reset_mode_to(mode=self.MODE_TO_SUPPRESSION_DICTIONARY[mode], handler=self.MODE_TO_STATE_DICTIONARY[mode].value)
+        self.last_packets_treated = [-1 for i in range(NodeLP.PACKETS_STATE_CAPACITY)]
+        self.last_packets_remembered = []
+        self.remaining_capacity = NodeLP.PACKETS_STATE_CAPACITY
 
     def reset_node(self):
         """ Resets the node's parameters. """
         self.reset_mode_to(self.mode)
 
+    def set_rng(self, rng: Optional[random.Random]):
+        """ Sets the random generator of the node and of its jitter configurations. """
+        super().set_rng(rng)
+        for packet_information in self.last_packets_informations:
+            packet_information.rng = rng
+
+    def set_parameters(self, parameters: NodeLP_Parameters):
+        """ Sets the parameters of the node and of its jitter configurations. """
+        self.parameters = parameters
+        for packet_information in self.last_packets_informations:
+            packet_information.parameters = parameters
+
     def set_enabled(self, bl: bool):
+        """ Disabled nodes neither process nor send packets. The channel also stops delivering packets to them, see Channel.set_node_enabled. """
         self.enabled = bl
+        if self.channel is not None and self.get_id() in self.channel.assigned_nodes:
+            self.channel.set_node_enabled(self.get_id(), bl)
 
     def get_enabled(self) -> bool:
         return self.enabled
@@ -729,14 +818,9 @@ class NodeLP(Node):
             self.remaining_capacity += 1
             self.last_packets_treated[window_id_index] = -1
 
-    def set_receive_availability(self, simulator: 'Simulator', to_set: NodeLP_Receiver_State):
-        """
-
-        :param simulator: Not needed, but we keep it here so we can schedule this as an event.
-        :param to_set: State of reception availability to set.
-        :return: None.
-        """
-        self.ready_to_receive = to_set
+    def end_of_reception(self, simulator: 'Simulator', packet: 'PacketLP'):
+        """ Called by the reception engine once the packet is fully received, without collision. """
+        self.process_packet(simulator, packet, do_not_schedule_reception=True)
 
     def receive_packet(self, simulator: Simulator, packet: Packet):
         """
@@ -745,6 +829,8 @@ class NodeLP(Node):
         """
         assert(isinstance(packet, PacketLP))
         self._log("received packet",packet)
+        if simulator.trace.enabled:
+            simulator.trace.record(TraceKind.NODE_RECEIVED, simulator.current_time, self.get_id(), packet.get_id())
         self.process_packet(simulator, packet)
 
     def process_packet(self, simulator: 'Simulator', packet: 'PacketLP', do_not_schedule_reception : bool = False):
@@ -755,7 +841,7 @@ class NodeLP(Node):
 
         :do_not_schedule_reception: By default when processing a packet we "delay" it's actual processing to mimic the delay it takes to receive the packet
         This is to allow simulating collision between packets from the point of view of the node (not in air).
-        It is set to true when we actually effectively process the packet.
+        It is set to true when we actually effectively process the packet (see end_of_reception).
         """
 
         # If disabled node : do not process
@@ -763,19 +849,12 @@ class NodeLP(Node):
             return
 
         if not do_not_schedule_reception:
-            if self.ready_to_receive == NodeLP_Receiver_State.READY_TO_RECEIVE: # If ready to receive:
-                self.reception_event = simulator.schedule_event(self.NODE_RECEPTION_OF_PACKET_DURATION, self.process_packet, packet, do_not_schedule_reception=True)
-                self.ready_to_receive = NodeLP_Receiver_State.NOT_READY_TO_RECEIVING
-            else:
-                # Drop the current event, and schedule the setting of ready_to_receive to being ready (assume the packet keeps coming through
-                # This means consecutive collisions can happen
+            # Packets heard while receiving another collide with it : both are dropped, and the node stays busy until the end of the last one.
+            if not self.channel.reception_engine.start_reception(simulator, self.get_id(), packet, self.parameters.node_reception_of_packet_duration, self.end_of_reception):
                 self._log("packets collided.")
-                self.reception_event.cancel()
-                self.reception_event = simulator.schedule_event(self.NODE_RECEPTION_OF_PACKET_DURATION, self.set_receive_availability, NodeLP_Receiver_State.READY_TO_RECEIVE)
+                if simulator.trace.enabled:
+                    simulator.trace.record(TraceKind.NODE_COLLIDED, simulator.current_time, self.get_id(), packet.get_id())
             return
-        else:
-            # We waited long enough, and no other packet came through : we become able to receive again!
-            self.ready_to_receive = NodeLP_Receiver_State.READY_TO_RECEIVE
 
 
         # First : is packet in list of being_treated_packets ?
@@ -792,9 +871,12 @@ class NodeLP(Node):
         internal_state = self.last_packets_informations[packet_id_index]
         state_handler = internal_state.get_internal_state_handler()
         self._log("state when received:", internal_state.internal_state_for_packet)
+        if simulator.trace.enabled:
+            simulator.trace.record(TraceKind.NODE_PROCESSED, simulator.current_time, self.get_id(), packet.get_id())
 
         self._jitter_interval_before = internal_state.min_jitter
         self._suppression_mode_before = internal_state.suppression_mode
+        max_jitter_before = internal_state.max_jitter
 
         state_handler.process_packet(simulator, self, packet, internal_state) # IDLE, RETX, ...
 
@@ -802,9 +884,27 @@ class NodeLP(Node):
         self._jitter_interval_after = internal_state.min_jitter
 
         if self._jitter_interval_after != self._jitter_interval_before:
-            self._log(f"jitter updated to {self._jitter_interval_after}")
+            self._log("jitter updated to", self._jitter_interval_after)
         if self._jitter_interval_after != self._jitter_interval_before:
-            self._log(f"suppression set to {internal_state.suppression_mode}")
+            self._log("suppression set to", internal_state.suppression_mode)
+        if simulator.trace.enabled:
+            if self._jitter_interval_after != self._jitter_interval_before:
+                simulator.trace.record(TraceKind.NODE_JITTER_UPDATED, simulator.current_time, self.get_id(), packet.get_id(), jitter=self._jitter_interval_after)
+            if self._suppression_mode_after != self._suppression_mode_before:
+                simulator.trace.record(TraceKind.NODE_SUPPRESSION_SET, simulator.current_time, self.get_id(), packet.get_id(), suppression=self._suppression_mode_after.value)
+        if self.parameters.flight_recorder_triggers:
+            self.check_flight_recorder_triggers(simulator, packet, internal_state, max_jitter_before, self._suppression_mode_before)
+
+    def check_flight_recorder_triggers(self, simulator: 'Simulator', packet: 'PacketLP', internal_state: NodeLP_Jitter_Configuration,
+        max_jitter_before: int, suppression_mode_before: NodeLP_Suppression_Mode):
+        """ Dumps the flight recorders if internal_state, as it was before treating packet, just reached an armed trigger (see FlightRecorderTrigger). """
+        triggers = self.parameters.flight_recorder_triggers
+        loggers = self.parameters.flight_recorder_loggers
+        if FlightRecorderTrigger.JITTER_MAX in triggers and internal_state.max_jitter == self.parameters.jitter_intervals != max_jitter_before:
+            dump_flight_recorders(loggers, f"jitter of node {self.get_id()} reaching its maximum for packet {packet.get_id()}", simulator.current_time)
+        if FlightRecorderTrigger.SUPPRESSION_SWITCH in triggers and internal_state.suppression_mode != suppression_mode_before \
+            and internal_state.suppression_mode == internal_state.suppression_switch != NodeLP_Suppression_Mode.REGULAR:
+            dump_flight_recorders(loggers, f"node {self.get_id()} switching to suppression mode {internal_state.suppression_mode.name} for packet {packet.get_id()}", simulator.current_time)
 
     def transmit_packet_lp_effective(self, simulator: 'Simulator', packet: 'PacketLP'):
         """
@@ -815,17 +915,23 @@ class NodeLP(Node):
         ABOLUTE TODO : Estimate order of magnitude for EVERY impactful parameter.
         """
         self._log("retransmitted packet",packet)
-        packet.data.before_last_in_path = packet.data.last_in_path # Set the before-last-in-path.
-        packet.data.last_in_path = self.get_id()  # Set last-in-path
+        if simulator.trace.enabled:
+            simulator.trace.record(TraceKind.NODE_RETRANSMITTED, simulator.current_time, self.get_id(), packet.get_id(), hops=packet.get_path_length()-1)
+        packet.data = packet.data.relayed_by(self.get_id()) # Set the before-last-in-path and last-in-path, on a copy : the data is shared with the other receivers.
         self.broadcast_packet(simulator, packet) # Broadcast the packet.
 
 class GatewayLP(NodeLP):
 
-    def __init__(self, x: float, y: float, channel: 'Channel' = None ):
-        super().__init__(x, y, channel)
+    def __init__(self, x: float, y: float, channel: 'Channel' = None, rng: Optional[random.Random] = None,
+        context: Optional[SimulationContext] = None, parameters: Optional[NodeLP_Parameters] = None):
+        super().__init__(x, y, channel, rng=rng, context=context, parameters=parameters)
         super(Node, self).__init__(logger=GATEWAY_LOGGER, preamble=str(self.node_id)+" - ")
         self.acknowledged_packets = set()
 
+    def reset_mode_to(self, mode):
+        super().reset_mode_to(mode)
+        self.acknowledged_packets = set()
+
     def arrival_successful_callback(self, simulator: 'Simulator', packet: 'PacketLP'):
         # A function to be modified if in scripts should we want to log something specific at packet arrival.
         pass
@@ -849,8 +955,14 @@ class GatewayLP(NodeLP):
         # Log time it took the packet to
         if self.enabled and not packet.get_id() in self.acknowledged_packets:
             self.acknowledged_packets.add(packet.get_id()) # Only acknowledge packets once
-            self._log(f"captured packet: {packet}")
-            self._log(f"source-to-gateway time for packet {packet.data.packet_id} is {(simulator.get_current_time() - packet.first_emission_time):.2f}, passing through {len(packet.path)-1} intermediate hops.")
+            if FlightRecorderTrigger.PACKET_LOST in self.parameters.flight_recorder_triggers:
+                source = self.channel.assigned_nodes.get(packet.get_source_id())
+                if isinstance(source, SourceLP):
+                    source.packets_awaiting_capture.discard(packet.get_id())
+            self._log("captured packet:", packet)
+            if simulator.trace.enabled:
+                simulator.trace.record(TraceKind.GATEWAY_CAPTURED, simulator.current_time, self.get_id(), packet.get_id(), hops=packet.get_path_length()-1)
+            self._log_format("source-to-gateway time for packet {} is {:.2f}, passing through {} intermediate hops.", packet.data.packet_id, simulator.get_current_time() - packet.first_emission_time, packet.get_path_length()-1)
             self.arrival_successful_callback(simulator, packet) # User-defined callback, if ever
 
             if not packet.data.ack:
@@ -863,18 +975,24 @@ class GatewayLP(NodeLP):
         :in_packet: Packet received for which an ACK will be created
         """
         # Source ID set to 0 because gateway. TODO (not yet set)
-        ack_packet = PacketLP(self.get_id(), first_emission_time=simulator.get_current_time(), ack=(True, in_packet.get_id()), before_last_in_path=in_packet.data.last_in_path)
+        ack_packet = PacketLP(self.get_id(), first_emission_time=simulator.get_current_time(), ack=(True, in_packet.get_id()), before_last_in_path=in_packet.data.last_in_path, packet_id=self.context.new_packet_id())
         self.broadcast_packet(simulator, ack_packet)
 
 class SourceLP(NodeLP):
 
-    def __init__(self, x: float, y: float, interval: float, channel: 'Channel' = None ):
+    def __init__(self, x: float, y: float, interval: float, channel: 'Channel' = None, rng: Optional[random.Random] = None,
+        context: Optional[SimulationContext] = None, parameters: Optional[NodeLP_Parameters] = None):
         """
         :interval: Interval between each message retransmission
         """
-        super().__init__(x, y, channel)
+        super().__init__(x, y, channel, rng=rng, context=context, parameters=parameters)
         super(Node, self).__init__(logger=SOURCE_LOGGER, preamble=str(self.node_id)+" - ")
         self.interval = interval
+        self.packets_awaiting_capture: Set[int] = set() # Packets sent and not captured by a gateway yet, while FlightRecorderTrigger.PACKET_LOST is armed.
+
+    def reset_mode_to(self, mode):
+        super().reset_mode_to(mode)
+        self.packets_awaiting_capture = set()
 
     def start_sending(self, simulator: Simulator):
         self.send_packet(simulator)
@@ -894,11 +1012,19 @@ class SourceLP(NodeLP):
         if self.enabled:
             # Drop packets.
             if packet.data.ack:
-                self._log(f"received ack for packet_id: {packet.data.ack[1]}, packet: {packet}")
+                self._log_format("received ack for packet_id: {}, packet: {}", packet.data.ack[1], packet)
+                if simulator.trace.enabled:
+                    simulator.trace.record(TraceKind.SOURCE_ACK_RECEIVED, simulator.current_time, self.get_id(), packet.data.ack[1])
             return
 
     def send_packet(self, simulator: Simulator):
         if self.enabled:
-            packet = PacketLP(self.get_id(), first_emission_time=simulator.get_current_time(), ack = False)
-            self._log(f"sending packet: {packet}")
+            packet = PacketLP(self.get_id(), first_emission_time=simulator.get_current_time(), ack = False, packet_id=self.context.new_packet_id())
+            if FlightRecorderTrigger.PACKET_LOST in self.parameters.flight_recorder_triggers:
+                for packet_id in self.packets_awaiting_capture:
+                    dump_flight_recorders(self.parameters.flight_recorder_loggers, f"packet {packet_id} of source {self.get_id()} not captured by any gateway", simulator.current_time)
+                self.packets_awaiting_capture = {packet.get_id()}
+            self._log("sending packet:", packet)
+            if simulator.trace.enabled:
+                simulator.trace.record(TraceKind.SOURCE_SENT, simulator.current_time, self.get_id(), packet.get_id())
             self.broadcast_packet(simulator, packet)
@@ -1,9 +1,10 @@
-import heapq
 import time
 from io import StringIO
 from math import sqrt
-from typing import Callable, Any, Dict, List, Optional
+from typing import Callable, Any, Dict, List, Optional, Sequence, Set, Tuple
 import random
+
+import numpy as np
 """
 OUERTANI Mohamed Hachem <omhx21@gmail.com>
 
@@ -18,7 +19,11 @@ This is naturally not representative of the real world
 
 # User made imports
 from .packet import Packet
-from .logger import Logger
+from .logger import Logger, LogRecord, format_message
+from .scheduler import EventQueue, HeapEventQueue
+from .spatial import UniformGrid
+from .reception import ReceptionEngine
+from .trace import TraceRecorder
 
 NONE_LOGGER = Logger("none", verbose=False)
 EVENT_LOGGER = Logger("event", verbose=False)
@@ -28,6 +33,43 @@ SIMULATOR_LOGGER = Logger("simulator", verbose=False)
 SOURCE_LOGGER = Logger("source", verbose=False)
 CHANNEL_LOGGER = Logger("channel", verbose=True)
 
+class SimulationContext:
+    """
+    Numbering of the nodes and packets of one simulated network.
+    Nodes created with the same context share it : node ids and packet ids are unique within it, and start from 1 in every new context.
+    Networks built with different contexts can therefore be created and simulated side by side.
+    """
+
+    def __init__(self):
+        self.next_node_id = 1
+        self.next_packet_id = 1
+
+    def new_node_id(self) -> int:
+        node_id = self.next_node_id
+        self.next_node_id += 1
+        return node_id
+
+    def new_packet_id(self) -> int:
+        packet_id = self.next_packet_id
+        self.next_packet_id += 1
+        return packet_id
+
+    def reset_packet_ids(self):
+        """ Restarts packet numbering from 1, typically before every simulation of the same network. """
+        self.next_packet_id = 1
+
+    def __reduce_ex__(self, protocol):
+        """ As registered loggers, the default context is pickled by reference. """
+        if self is DEFAULT_CONTEXT:
+            return (get_default_context, ())
+        return super().__reduce_ex__(protocol)
+
+# Context of the nodes created without one : one numbering for the whole process, as in scripts building a single network.
+DEFAULT_CONTEXT = SimulationContext()
+
+def get_default_context() -> SimulationContext:
+    return DEFAULT_CONTEXT
+
 class Loggable:
     """ An object that ships with a logging unit. Useful for logging what is happening (event callbacks etc ...) """
 
@@ -49,12 +91,40 @@ class Loggable:
         self._logger_simulator = None
 
     def _log(self, *args, end='', verbose_overwrite = True, **kwargs):
-        """ Adds message to log. """
-        if self._logger_active:
+        """
+        Adds message to log : args, as print would write them.
+        Nothing is done if the logger would neither keep nor show the message. If the logger is deferred (see Logger.log_record),
+        formatting is left for when the logs are read : the packets among args are then snapshotted, as they may change in between.
+        """
+        logger = self._logger
+        verbose = verbose_overwrite and self._logger_verbose_overwrite
+        if not self._logger_active or not (logger.effective or logger.verbose and verbose):
+            return
+        if end or kwargs: # Not deferrable.
             output = StringIO()
             print(*args, file=output, end=end, **kwargs)
-            extra_prependor = self._logger_simulator != None and f'|{self._logger_simulator.get_current_time():0.2f}| ' or ''
-            self._logger.log(f"{extra_prependor}{self._logger_preamble}"+output.getvalue(), verbose_overwrite and self._logger_verbose_overwrite)
+            time = self._logger_simulator.get_current_time() if self._logger_simulator is not None else None
+            extra_prependor = time is not None and f'|{time:0.2f}| ' or ''
+            logger.log(f"{extra_prependor}{self._logger_preamble}"+output.getvalue(), verbose, time)
+            return
+        self._log_record(None, args, verbose)
+
+    def _log_format(self, template: str, *args, verbose_overwrite = True):
+        """ As _log, the message being template.format(*args). """
+        logger = self._logger
+        verbose = verbose_overwrite and self._logger_verbose_overwrite
+        if not self._logger_active or not (logger.effective or logger.verbose and verbose):
+            return
+        self._log_record(template, args, verbose)
+
+    def _log_record(self, template: Optional[str], args: tuple, verbose: bool):
+        logger = self._logger
+        time = self._logger_simulator.get_current_time() if self._logger_simulator is not None else None
+        if logger.deferred and not (logger.verbose and verbose):
+            args = tuple(arg.snapshot() if isinstance(arg, Packet) else arg for arg in args)
+            logger.log_record(LogRecord(time, self._logger_preamble, template, args))
+        else:
+            logger.log(format_message(time, self._logger_preamble, template, args), verbose, time)
 
     def set_logger_active(self, active:bool):
         """ Whether logs are saved (in memory) or not """
@@ -72,6 +142,8 @@ class Loggable:
         self._logger_simulator = simulator
 
 class Event:
+    __slots__ = ('time', 'seq', 'callback', 'args', 'kwargs', 'effective', 'batchable', '_queue')
+
     def __init__(self, time: float, callback: Callable[['Simulator'], Any], *args, **kwargs):
         """
         An event to be executed. No re-scheduling possible, however cancellation IS possible.
@@ -81,42 +153,71 @@ class Event:
         :param kwargs: Keyword arguments of callback
         """
         self.time = time
+        self.seq = -1 # Scheduling order, set by the queue. Breaks ties between events of equal time (first scheduled, first executed).
         self.callback = callback
         self.args = args
         self.kwargs = kwargs
         self.effective = True # Parameter allowing the cancellation of events.
+        self.batchable = False # Batch-aware callback : see Simulator.schedule_batchable_event
+        self._queue: Optional[EventQueue] = None # Queue holding the event, notified on cancellation.
 
     def __lt__(self, other: 'Event'):
-        return self.time < other.time
+        return (self.time, self.seq) < (other.time, other.seq)
 
     def execute(self, simulator: 'Simulator'):
         if self.effective:
             self.callback(simulator, *self.args, **self.kwargs)
 
     def cancel(self):
-        self.effective = False
+        if self.effective:
+            self.effective = False
+            if self._queue is not None:
+                self._queue.notify_cancelled(self)
 
 class Simulator:
-    def __init__(self, simulation_length: float = 10.0, simulations_real_inertia: float = 0.01):
+    def __init__(self, simulation_length: float = 10.0, simulations_real_inertia: float = 0.01, fast_path: bool = True, event_queue: Optional[EventQueue] = None, batch_epsilon: Optional[float] = None, seed: Optional[int] = None):
         """
         Simulator, to which pertains events.
         Holds an internal clock, and events get executed linearly in it.
         :simulation_length: How many time units corresponding to events will be treated.
         :simulations_real_inertia: How long (float) 1 simulation second corresponds to real execution time
+        :fast_path: Whether run() may use the stripped-down loop (no logging, no sleeping) when neither is needed.
+        :event_queue: Scheduler backend (see scheduler.py). Defaults to a binary heap.
+        :batch_epsilon: If set, the fast path executes all events falling within batch_epsilon of the earliest one as a single batch,
+            all of them at the time of the earliest one. Events of such a batch are then considered simultaneous.
+            None (default) disables batching. 0.0 only batches events of exactly the same time, which changes nothing to the results.
+        :seed: Seed of the simulator's random generator, and of every stream derived from it (see get_rng_stream).
+            If None, one is drawn from the system's entropy. Either way it is kept in self.seed, so any run can be reproduced.
         """
         assert (simulations_real_inertia >= 0.0)
+        assert batch_epsilon is None or batch_epsilon >= 0.0
         self.current_time = 0.0
         self.simulation_length = simulation_length
-        self.event_queue = []
+        self.event_queue: EventQueue = event_queue if event_queue is not None else HeapEventQueue()
         self.running = False
         self.nodes: Dict[int, Node] = {}
         # How long to sleep before every event execution.
         self.simulations_real_inertia = simulations_real_inertia
+        self.fast_path = fast_path
+        self.batch_epsilon = batch_epsilon
+        self.executed_events = 0 # Number of events executed so far, useful for benchmarking.
+        self.seed: int = seed if seed is not None else random.SystemRandom().getrandbits(64)
+        self.rng = random.Random(self.seed)
+        self.trace = TraceRecorder() # Structured trace of this simulation (see trace.py), disabled by default.
 
     def get_current_time(self) -> float:
         """ Returns current time. Similar to NS3's Simulator::NOW()  """
         return self.current_time
 
+    def get_rng_stream(self, name: str) -> random.Random:
+        """
+        Returns a new random generator, seeded from both the simulator's seed and name.
+        Streams of different names are independent, and a stream only depends on the seed and its name :
+        neither on the order in which streams are created, nor on what the other streams draw.
+        Typically one stream per node ("node-<id>") and one for the channel ("channel").
+        """
+        return random.Random(f"{self.seed}:{name}")
+
     def schedule_event(self, delay: float, callback: Callable[['Simulator'], Any], *args, **kwargs) -> Event:
         """
         Schedules an event for execution.
@@ -124,36 +225,222 @@ class Simulator:
         """
         event_time = self.current_time + delay
         event = Event(event_time, callback, *args, **kwargs)
-        heapq.heappush(self.event_queue, event)
-        self.log(f"Event scheduled for time {event_time}")
+        self.event_queue.push(event)
+        if SIMULATOR_LOGGER.is_enabled():
+            self.log(f"Event scheduled for time {event_time}")
         return event
 
+    def schedule_event_at(self, time: float, callback: Callable[['Simulator'], Any], *args, **kwargs) -> Event:
+        """
+        Same as schedule_event, at a given time rather than after a delay : no rounding from adding a delay to the current time.
+        :returns: event object, allowing to cancel the event if needed
+        """
+        assert time >= self.current_time, "Can not schedule an event in the past"
+        event = Event(time, callback, *args, **kwargs)
+        self.event_queue.push(event)
+        if SIMULATOR_LOGGER.is_enabled():
+            self.log(f"Event scheduled for time {time}")
+        return event
+
+    def schedule_batchable_event(self, delay: float, callback: Callable[['Simulator', List[tuple]], Any], *args) -> Event:
+        """
+        Schedules an event whose callback is batch-aware : it is called as callback(simulator, [args_1, args_2, ...]).
+        When batching is enabled, consecutive events of a batch with the same callback are merged in one call,
+        receiving the arguments of all of them. Otherwise, every event calls it with the list of its own arguments.
+        :returns: event object, allowing to cancel the event if needed
+        """
+        event = self.schedule_event(delay, callback, [args])
+        event.batchable = True
+        return event
+
+    def is_batching_enabled(self) -> bool:
+        """ Batching only happens within the fast path. """
+        return self.batch_epsilon is not None and self.is_fast_path_possible()
+
+    def is_fast_path_possible(self) -> bool:
+        """ The fast path is used when nothing is logged by the simulator, and no real-time slowness is asked for. """
+        return self.fast_path and self.simulations_real_inertia == 0.0 and not SIMULATOR_LOGGER.is_enabled()
+
     def run(self):
+        """
+        Executes events until simulation_length is reached (if positive), or until no event is left.
+        Can be called again after a stop() to resume where the simulation was.
+        """
+        self._run(self.simulation_length > 0.0 and self.simulation_length or None)
+
+    def run_until(self, until: float):
+        """
+        Executes every event of time lower or equal to until (capped to simulation_length if positive), then sets the clock to it.
+        Events beyond stay scheduled : the simulation can be resumed with any other run method.
+        """
+        assert until >= self.current_time, "Can not run until a time in the past"
+        if self.simulation_length > 0.0:
+            until = min(until, self.simulation_length)
+        self._run(until)
+
+    def run_for(self, duration: float):
+        """ Same as run_until, duration time units after the current time. """
+        assert duration >= 0.0
+        self.run_until(self.current_time + duration)
+
+    def run_by_chunks(self, chunk_duration: float):
+        """
+        Generator running the simulation chunk_duration at a time, yielding the current time after each chunk.
+        Allows sampling the network, reporting progress or checkpointing at fixed intervals, without scheduling any event :
+            for current_time in simulator.run_by_chunks(100.0): ...
+        Ends once simulation_length is reached, or when no event is left (or when stopped).
+        """
+        assert chunk_duration > 0.0
         self.running = True
-        while self.event_queue and self.running:
-            event = heapq.heappop(self.event_queue)
-            assert event.time >= self.current_time, "Event scheduled in the past, not possible"
-            time.sleep(self.simulations_real_inertia * ((self.simulation_length > 0.0 and min(event.time, self.simulation_length) or event.time) - self.current_time))
+        while self.running and self.event_queue and (self.simulation_length <= 0.0 or self.current_time < self.simulation_length):
+            self.run_for(chunk_duration)
+            yield self.current_time
+
+    def step(self, n_events: int = 1) -> int:
+        """
+        Executes the next n_events events (at most, stopping at simulation_length if positive). Never batches.
+        :returns: Number of events effectively executed.
+        """
+        assert n_events >= 0
+        executed_events_before = self.executed_events
+        until = self.simulation_length > 0.0 and self.simulation_length or None
+        if self.is_fast_path_possible():
+            self._run_fast(until, n_events)
+        else:
+            self._run_instrumented(until, n_events)
+        return self.executed_events - executed_events_before
+
+    def _run(self, until: Optional[float]):
+        if self.is_batching_enabled():
+            self._run_batched(until)
+        elif self.is_fast_path_possible():
+            self._run_fast(until)
+        else:
+            self._run_instrumented(until)
+
+    def _reached_horizon(self, event: Event, until: float):
+        """ Called when event lies beyond the horizon until : puts it back in the queue, and moves the clock to the horizon. """
+        self.event_queue.requeue(event)
+        self.current_time = until
+
+    def _run_batched(self, until: Optional[float] = None):
+        """ Fast path, draining all events within batch_epsilon of the earliest one at each iteration. """
+        self.running = True
+        queue = self.event_queue
+        batch_epsilon = self.batch_epsilon
+        while self.running:
+            event = queue.pop()
+            if event is None:
+                break
+
+            if until is not None and event.time > until:
+                self._reached_horizon(event, until)
+                return
+
             self.current_time = event.time # MUST SET BEFORE EXECUTING THE EVENT
+            horizon = event.time + batch_epsilon
+            if until is not None:
+                horizon = min(horizon, until)
+            batch = [event]
+            next_time = queue.peek_time()
+            while next_time is not None and next_time <= horizon:
+                batch.append(queue.pop())
+                next_time = queue.peek_time()
+
+            self._execute_batch(batch)
+
+        if self.running and until is not None:
+            self.current_time = until # Nothing left to execute before the horizon.
+
+    def _execute_batch(self, batch: List[Event]):
+        """
+        Executes the events of the batch in order. Consecutive batchable events sharing the same callback are merged in one call.
+        Events are checked for cancellation up to the last moment, as earlier events of the batch may cancel later ones.
+        """
+        index = 0
+        batch_length = len(batch)
+        while index < batch_length:
+            event = batch[index]
+            index += 1
+            if not event.effective:
+                continue
+
+            if event.batchable:
+                callback = event.callback
+                arguments = list(event.args[0])
+                while index < batch_length and batch[index].batchable and batch[index].callback == callback:
+                    if batch[index].effective:
+                        arguments.extend(batch[index].args[0])
+                        self.executed_events += 1
+                    index += 1
+                self.executed_events += 1
+                callback(self, arguments)
+            else:
+                self.executed_events += 1
+                event.callback(self, *event.args, **event.kwargs)
+
+    def _run_fast(self, until: Optional[float] = None, max_events: Optional[int] = None):
+        """ Same as _run_instrumented, minus the sleeping and the logging. """
+        self.running = True
+        pop = self.event_queue.pop
+        executed_events = self.executed_events
+        last_event = executed_events + max_events if max_events is not None else -1
+        try:
+            while self.running and executed_events != last_event:
+                event = pop()
+                if event is None:
+                    break
+
+                if until is not None and event.time > until:
+                    self._reached_horizon(event, until)
+                    return
+
+                self.current_time = event.time # MUST SET BEFORE EXECUTING THE EVENT
+                executed_events += 1
+                event.callback(self, *event.args, **event.kwargs) # Popped events are always effective.
+            else:
+                return # Stopped, or done with the number of events asked for : the clock stays where it is.
+        finally:
+            self.executed_events = executed_events
+
+        if until is not None:
+            self.current_time = until # Nothing left to execute before the horizon.
+
+    def _run_instrumented(self, until: Optional[float] = None, max_events: Optional[int] = None):
+        self.running = True
+        last_event = self.executed_events + max_events if max_events is not None else -1
+        while self.event_queue and self.running and self.executed_events != last_event:
+            event = self.event_queue.pop()
+            assert event.time >= self.current_time, "Event scheduled in the past, not possible"
+            time.sleep(self.simulations_real_inertia * ((min(event.time, until) if until is not None else event.time) - self.current_time))
 
-            if self.simulation_length > 0.0 and \
-                    self.current_time > self.simulation_length:
-                self.running = False
-                break
+            if until is not None and event.time > until:
+                self._reached_horizon(event, until)
+                return
 
-            self.log(f"Executing event at time {self.current_time}")
+            self.current_time = event.time # MUST SET BEFORE EXECUTING THE EVENT
+            if SIMULATOR_LOGGER.is_enabled():
+                self.log(f"Executing event at time {self.current_time}")
+            self.executed_events += 1
             event.execute(self)
             # ^ Simulate some delay for each event execution
 
+        if self.running and self.executed_events != last_event and until is not None:
+            self.current_time = until # Nothing left to execute before the horizon.
+
     def stop(self):
         """
-        Generally this function is useless unless the simulation of queues is running batches by batches.
-        Do not use this function after a non-ending .run(), use when you know what you're doing.
+        Stops the current run after the event being executed. Pending events are kept :
+        any of run, run_until, run_for or step resumes the simulation from there.
         :return: None
         """
         self.running = False
         self.log("Simulator stopped")
 
+    def get_event_queue_statistics(self) -> dict:
+        """ Live and dead (cancelled) event counts of the queue, among other things. """
+        return self.event_queue.get_statistics()
+
     def log(self, message):
         if SIMULATOR_LOGGER:
             SIMULATOR_LOGGER.log(message)
@@ -175,7 +462,8 @@ class Channel:
         Would be in self.assigned_nodes (dict of node_id to Node)
 
         Each node would have his adjacency-list : nodes adjacent
-        to it, in a list. Each adjacency is a tuple : (id, delay)
+        to it, in a dict from the neighbour's id to the link's record, a tuple : (id, distance, reliability)
+        Iterating over its values gives the links in the order they were created. Looking up a given link is O(1).
 
         A matrix would have been nice, but this would do.
         It's a graph structure either way.
@@ -183,17 +471,59 @@ class Channel:
         """
 
         self.assigned_nodes = {}
-        self.adjacencies_per_node = {}
+        self.adjacencies_per_node: Dict[int, Dict[int, Tuple[int, float, float]]] = {}
         self.packet_delay_per_distance_unit = packet_delay_per_unit
+        self.rng: Optional[random.Random] = None # Draws the losses of links. The random module's generator if None.
+        self._generator: Optional[np.random.Generator] = None # For vectorized draws, see _get_generator.
+        self.reception_engine = ReceptionEngine() # Receptions and collisions at the receivers, for the nodes modelling them (NodeLP).
+
+        # Reliability of the links, evaluated at transmission time (see get_reliability) : changing it never rewrites the links.
+        self.reliability_all: Optional[float] = None # If set, reliability of every link, their own being ignored. See set_reliability_all.
+        self.reliability_overrides: Dict[Tuple[int, int], float] = {} # (sender, receiver) to reliability, set after reliability_all.
+        self.reliability_multiplier = 1.0 # Applied on top of every reliability.
+        self.reliability_schedule: List[Tuple[float, float]] = [] # (time, reliability_all from then on), sorted. See set_reliability_schedule.
+        self._next_scheduled_reliability = 0 # Index in reliability_schedule of the next change to apply.
+        self._next_reliability_change_time = float('inf')
+
+        # Topology modifications during the simulation (remove_node, add_node_at, remove_link, set_node_enabled).
+        self.senders_per_node: Optional[Dict[int, Set[int]]] = None # Node id to the ids of the nodes linked to it. Built on first need, see _get_senders_index.
+        self.disabled_node_ids: Set[int] = set() # Nodes whose incoming links are detached : broadcasts do not reach them.
+        self.detached_links: Dict[int, Dict[int, Tuple[int, float, float]]] = {} # Sender id to its links towards disabled nodes.
+        self.removed_links: Dict[int, Dict[Tuple[int, int], float]] = {} # Removed node id to the distances of its links, (sender, receiver) : see get_time_delay.
+        self.mesh_grid: Optional[UniformGrid] = None # Grid of the last create_metric_mesh, holding node ids : add_node_at links nodes with it.
+        self.mesh_positions: Dict[int, Tuple[float, float]] = {} # Position of the nodes in mesh_grid.
+        self.mesh_distance_threshold = 0.0
+        self.mesh_reliability = 1.0
 
     def set_delay_per_distance_unit(self, delay:float):
         """ Modifies delay per unit distance; or propagation slowness if you will """
         self.packet_delay_per_distance_unit = delay
 
+    def set_rng(self, rng: Optional[random.Random]):
+        """ Random generator of the channel, typically simulator.get_rng_stream("channel"). None reverts to the random module. """
+        self.rng = rng
+        self._generator = None
+
+    def get_rng(self):
+        return self.rng if self.rng is not None else random
+
+    def reset_receptions(self):
+        """ Forgets the receptions in progress, and their statistics : those of a previous simulation would keep their receivers busy. """
+        self.reception_engine = ReceptionEngine()
+
+    def _get_generator(self) -> np.random.Generator:
+        """ NumPy generator for vectorized draws, seeded from get_rng() on first use : seeded channels stay reproducible. """
+        if self._generator is None:
+            self._generator = np.random.default_rng(self.get_rng().getrandbits(64))
+        return self._generator
+
+
     def assign_node(self, node: 'Node'):
         self.assigned_nodes[node.get_id()] = node  # Reference.
         node.set_channel(self)
-        self.adjacencies_per_node[node.get_id()] = []
+        self.adjacencies_per_node[node.get_id()] = {}
+        if self.senders_per_node is not None:
+            self.senders_per_node[node.get_id()] = set()
 
     def get_assigned_node(self, node_id: int) -> 'Node':
         """ Returns a node handle for given node_id. This assumes it is assigned to the channel """
@@ -230,63 +560,146 @@ class Channel:
         assert (self.assigned_nodes[node_id_1] != None)
         assert (self.assigned_nodes[node_id_2] != None)
 
-        self.adjacencies_per_node[node_id_1].append((node_id_2, delay, reliability))
+        if node_id_2 in self.disabled_node_ids:
+            self.detached_links.setdefault(node_id_1, {})[node_id_2] = (node_id_2, delay, reliability)
+        else:
+            self.adjacencies_per_node[node_id_1][node_id_2] = (node_id_2, delay, reliability)
+        if self.senders_per_node is not None:
+            self.senders_per_node[node_id_2].add(node_id_1)
+
+    def _get_senders_index(self) -> Dict[int, Set[int]]:
+        """ senders_per_node, built in O(links) on first call, then kept up to date : simulations never changing their topology do not pay for it. """
+        if self.senders_per_node is None:
+            senders_per_node: Dict[int, Set[int]] = {node_id: set() for node_id in self.adjacencies_per_node}
+            for links_per_node in (self.adjacencies_per_node, self.detached_links):
+                for sender_id, links in links_per_node.items():
+                    for node_id in links:
+                        senders_per_node[node_id].add(sender_id)
+            self.senders_per_node = senders_per_node
+        return self.senders_per_node
+
+    def remove_link_unidirectional(self, node_id_1: int, node_id_2: int):
+        """ Removes the link node_id_1 -> node_id_2. O(1). """
+        senders_per_node = self._get_senders_index()
+        if node_id_2 in self.disabled_node_ids:
+            links = self.detached_links[node_id_1]
+            del links[node_id_2]
+            if not links:
+                del self.detached_links[node_id_1]
+        else:
+            del self.adjacencies_per_node[node_id_1][node_id_2]
+        senders_per_node[node_id_2].discard(node_id_1)
+        self.reliability_overrides.pop((node_id_1, node_id_2), None)
+
+    def remove_link(self, node_id_1: int, node_id_2: int, unidirectional: bool = False):
+        """ Removes the link node_id_1 <---> node_id_2, or only node_id_1 -> node_id_2 if unidirectional. """
+        self.remove_link_unidirectional(node_id_1, node_id_2)
+        if not unidirectional:
+            self.remove_link_unidirectional(node_id_2, node_id_1)
+
+    def remove_node(self, node_id: int) -> 'Node':
+        """
+        Removes the node and all its links, in O(its number of links). Returns the node.
+        The node keeps its reference to the channel, and the events already scheduled by or for it still run :
+        - Packets on their way to it are dropped when they arrive. Receptions it had started complete, and it processes them.
+        - Its pending transmissions reach nobody. Packets it sent before still reach their receivers.
+        The distances of its links are kept (see get_time_delay) until it is added back with add_node_at.
+        """
+        senders_per_node = self._get_senders_index()
+        removed_links = {(node_id, receiver_id): self._get_link(node_id, receiver_id)[1]
+            for receiver_id in list(self.adjacencies_per_node[node_id]) + list(self.detached_links.get(node_id, ()))}
+        removed_links.update({(sender_id, node_id): self._get_link(sender_id, node_id)[1] for sender_id in senders_per_node[node_id]})
+        self.removed_links[node_id] = removed_links
+        for receiver_id in list(self.adjacencies_per_node[node_id]) + list(self.detached_links.get(node_id, ())):
+            self.remove_link_unidirectional(node_id, receiver_id)
+        for sender_id in list(senders_per_node[node_id]):
+            self.remove_link_unidirectional(sender_id, node_id)
+        del self.adjacencies_per_node[node_id]
+        del senders_per_node[node_id]
+        self.disabled_node_ids.discard(node_id)
+        position = self.mesh_positions.pop(node_id, None)
+        if position is not None:
+            self.mesh_grid.remove(node_id, *position)
+        CHANNEL_LOGGER.log(f"Removed node {node_id}")
+        return self.assigned_nodes.pop(node_id)
+
+    def add_node_at(self, node: 'Node', x: float, y: float):
+        """
+        Places node at (x, y), assigns it, and links it to the nodes within hearing distance as create_metric_mesh would have
+        (same distance threshold and reliability), in O(number of nodes around it). Moving a node is removing it, then adding it back.
+        create_metric_mesh must have been called beforehand : only the nodes of its last call, and those added since, are linked to.
+        """
+        assert self.mesh_grid is not None, "add_node_at links nodes as create_metric_mesh did : call it first"
+        node.x = x; node.y = y
+        node_id = node.get_id()
+        self.removed_links.pop(node_id, None)
+        self.assign_node(node)
+        log_links = CHANNEL_LOGGER.is_enabled()
+        for other_id in sorted(self.mesh_grid.get_candidates(x, y)):
+            other_node = self.assigned_nodes[other_id]
+            distance = node.distance_to(other_node)
+            if other_id != node_id and distance <= self.mesh_distance_threshold:
+                self.create_bidirectional_link(node_id, other_id, distance, self.mesh_reliability)
+                if log_links:
+                    CHANNEL_LOGGER.log(f"Created link ({node_id}, {x:.2f}, {y:.2f}), ({other_id}, {other_node.x:.2f}, {other_node.y:.2f}), {self.mesh_reliability}")
+        self.mesh_grid.insert(node_id, x, y)
+        self.mesh_positions[node_id] = (x, y)
+
+    def set_node_enabled(self, node_id: int, enabled: bool):
+        """
+        Disabling a node detaches the links towards it, in O(its number of links) : broadcasts then neither reach it nor draw its losses.
+        Enabling it attaches them back, last in the links of their senders. Its own links are left as they are.
+        While detached, links towards the node are ignored by the link accessors (check_link, get_neighbour_ids, ...).
+        """
+        if enabled != (node_id in self.disabled_node_ids):
+            return
+        senders = self._get_senders_index()[node_id]
+        if enabled:
+            self.disabled_node_ids.discard(node_id)
+            for sender_id in senders:
+                links = self.detached_links[sender_id]
+                self.adjacencies_per_node[sender_id][node_id] = links.pop(node_id)
+                if not links:
+                    del self.detached_links[sender_id]
+        else:
+            self.disabled_node_ids.add(node_id)
+            for sender_id in senders:
+                self.detached_links.setdefault(sender_id, {})[node_id] = self.adjacencies_per_node[sender_id].pop(node_id)
+        CHANNEL_LOGGER.log(f"{'Enabled' if enabled else 'Disabled'} node {node_id}")
 
     def check_link(self, node_id_1: int, node_id_2: int, unidirectional: bool = False) -> bool:
         """
         Check if node_id_1 is linked to node_id_2
         if unidirectional : only node_id_1 -> node_id_2
         """
-        return_value = False
-        for (id_, distance, _) in self.adjacencies_per_node[node_id_1]:
-            if id_ == node_id_2:
-                return_value = True
-
-        if unidirectional and not return_value:
-            return False
-
-        if not unidirectional:
-            for (id_, distance, _) in self.adjacencies_per_node[node_id_2]:
-                if id_ == node_id_1:
-                    return True
-
-        return return_value
-
-    def _get_link_list_index(self, node_id_1: int, node_id_2: int) -> int:
-        """
-        Internal function useful for returning the index in self.adjacencies_per_node of node_id_1 where we find node_id_2.
-        Returns -1 if it doesn't exist.
-        """
-        id_to_return = -1
-
-        for i in range(len(self.adjacencies_per_node[node_id_1])):
-            (id_, distance, _) = self.adjacencies_per_node[node_id_1][i]
-            if id_ == node_id_2:
-                id_to_return = i
-        return id_to_return
+        if node_id_2 in self.adjacencies_per_node[node_id_1]:
+            return True
+        return not unidirectional and node_id_1 in self.adjacencies_per_node[node_id_2]
 
     def get_neighbour_ids(self, node_id) -> List[int]:
         """
         Return list of indices of connected neighbours.
         """
-        result = set()
-        for _id, distance, reliability in self.adjacencies_per_node[node_id]:
-            result.add(_id)
-
-        return list(result)
+        return list(self.adjacencies_per_node[node_id])
 
     def get_distance(self, node_id_1: int, node_id_2: int):
         """ Returns the distance for node_id_1 -> node_id_2 if it exists. """
-        assert(self.check_link(node_id_1, node_id_2, unidirectional = True) == True) # Assert the link exists.
-        id_in_list_of_node_2 = self._get_link_list_index(node_id_1, node_id_2)
-        return self.adjacencies_per_node[node_id_1][id_in_list_of_node_2][1]
+        links = self.adjacencies_per_node[node_id_1]
+        assert(node_id_2 in links) # Assert the link exists.
+        return links[node_id_2][1]
 
     def set_reliability_unidirectional(self, node_id_1: int, node_id_2: int, reliability: float):
-        """ Sets the reliability of the transmission node_id_1 -> node_id_2. """
-        assert(self.check_link(node_id_1, node_id_2, unidirectional = True) == True) # Assert the link exists.
-        assert(reliability <= 1.0 and reliability >= 0.0) # Assert the link exists.
-        id_in_list_of_node_2 = self._get_link_list_index(node_id_1, node_id_2)
-        self.adjacencies_per_node[node_id_1][id_in_list_of_node_2] = (self.adjacencies_per_node[node_id_1][id_in_list_of_node_2][0], self.adjacencies_per_node[node_id_1][id_in_list_of_node_2][1], reliability)
+        """
+        Sets the reliability of the transmission node_id_1 -> node_id_2.
+        Once set_reliability_all was called, it is kept as an override of the reliability of all links, until the next call to it.
+        """
+        links = self.adjacencies_per_node[node_id_1]
+        assert(node_id_2 in links) # Assert the link exists.
+        assert(reliability <= 1.0 and reliability >= 0.0)
+        if self.reliability_all is None:
+            links[node_id_2] = (node_id_2, links[node_id_2][1], reliability)
+        else:
+            self.reliability_overrides[(node_id_1, node_id_2)] = reliability
         CHANNEL_LOGGER.log(f"Set reliability from {node_id_1} to {node_id_2} to {reliability}")
 
     def set_reliability(self, node_id_1: int, node_id_2: int, reliability: float, unidirectional:bool = False):
@@ -295,57 +708,183 @@ class Channel:
         if not unidirectional:
             self.set_reliability_unidirectional(node_id_2, node_id_1, reliability)
 
-    def set_reliability_all(self, reliability:float):
-        """ Sets the reliability of ALL links """
-        for sender_id in self.adjacencies_per_node.keys():
-            for (node_id, distance, _) in self.adjacencies_per_node[sender_id]:
-                self.set_reliability_unidirectional(sender_id, node_id, reliability)
+    def set_reliability_all(self, reliability: Optional[float]):
+        """
+        Sets the reliability of ALL links, in O(1) : links are not rewritten, the reliability is applied when transmitting.
+        Reliabilities set per link beforehand are discarded. None reverts to the reliabilities stored in the links.
+        """
+        assert(reliability is None or (reliability <= 1.0 and reliability >= 0.0))
+        self.reliability_all = reliability
+        self.reliability_overrides.clear() # Amortized O(1) : every override was set by one call to set_reliability_unidirectional.
+        CHANNEL_LOGGER.log(f"Set reliability of all links to {reliability}")
+
+    def set_reliability_multiplier(self, multiplier: float):
+        """ Multiplies the reliability of every link (overrides and set_reliability_all included) by multiplier. O(1). """
+        assert(multiplier >= 0.0)
+        self.reliability_multiplier = multiplier
+        CHANNEL_LOGGER.log(f"Set reliability multiplier to {multiplier}")
+
+    def set_reliability_schedule(self, schedule: Sequence[Tuple[float, float]]):
+        """
+        Reliability of all links over time : each (time, reliability) of schedule calls set_reliability_all(reliability) from time on.
+        Changes are applied lazily, by the first transmission at or after their time : nothing is scheduled in the simulator.
+        Replaces any previous schedule ; an empty one stops changing the reliability.
+        """
+        self.reliability_schedule = sorted(schedule, key=lambda change: change[0])
+        self._next_scheduled_reliability = 0
+        self._next_reliability_change_time = self.reliability_schedule[0][0] if self.reliability_schedule else float('inf')
+
+    def apply_reliability_schedule(self, time: float):
+        """ Applies the changes of the reliability schedule up to time. Done by handle_transmission. """
+        schedule = self.reliability_schedule
+        index = self._next_scheduled_reliability
+        while index < len(schedule) and schedule[index][0] <= time:
+            self.set_reliability_all(schedule[index][1])
+            index += 1
+        self._next_scheduled_reliability = index
+        self._next_reliability_change_time = schedule[index][0] if index < len(schedule) else float('inf')
+
+    def get_reliability(self, node_id_1: int, node_id_2: int) -> float:
+        """ Effective reliability of node_id_1 -> node_id_2 : override, else reliability of all links, else the link's own ; times the multiplier. """
+        reliability = self.reliability_overrides.get((node_id_1, node_id_2))
+        if reliability is None:
+            reliability = self.reliability_all if self.reliability_all is not None else self._get_link_reliability(node_id_1, node_id_2)
+        return reliability * self.reliability_multiplier
+
+    def _get_link_reliability(self, node_id_1: int, node_id_2: int) -> float:
+        """ Reliability stored in the link node_id_1 -> node_id_2. """
+        links = self.adjacencies_per_node[node_id_1]
+        assert(node_id_2 in links) # Assert the link exists.
+        return links[node_id_2][2]
 
     def get_time_delay(self, node_id_1: int, node_id_2: int):
-        """ Returns the time delay for node_id_1 -> node_id_2 if it exists. """
-        return self.packet_delay_per_distance_unit * self.get_distance(node_id_1, node_id_2)
+        """
+        Returns the time delay for node_id_1 -> node_id_2 if it exists.
+        Links detached (see set_node_enabled) or removed along one of their nodes (see remove_node) still have theirs :
+        packets sent before then are still on their way, and their receivers may ask.
+        """
+        link = self.adjacencies_per_node.get(node_id_1, {}).get(node_id_2) or self.detached_links.get(node_id_1, {}).get(node_id_2)
+        if link is not None:
+            return self.packet_delay_per_distance_unit * link[1]
+        for removed_node_id in (node_id_2, node_id_1):
+            distance = self.removed_links.get(removed_node_id, {}).get((node_id_1, node_id_2))
+            if distance is not None:
+                return self.packet_delay_per_distance_unit * distance
+        raise KeyError(f"No link from {node_id_1} to {node_id_2}")
+
+    def _get_link(self, node_id_1: int, node_id_2: int) -> Tuple[int, float, float]:
+        """ Link node_id_1 -> node_id_2, detached or not. """
+        if node_id_2 in self.disabled_node_ids:
+            return self.detached_links[node_id_1][node_id_2]
+        return self.adjacencies_per_node[node_id_1][node_id_2]
 
     def create_metric_mesh(self, distance_threshold: float, *args: 'Node', reliability:float = 1.0):
         """
         Assign the nodes, and creates the adjacenties using x,y distance
         between nodes.
+        Only nodes in neighbouring cells of a grid of distance_threshold-wide cells are compared (see spatial.py), making this near-linear.
+        Links are created in the same order as comparing every pair (i, j), i < j, of args would : every adjacency list is ordered as args.
         """
         for i, node in enumerate(args):
             self.assign_node(node)
 
+        # The grid holds node ids, and is kept for add_node_at.
+        grid = UniformGrid(distance_threshold)
+        self.mesh_grid = grid; self.mesh_distance_threshold = distance_threshold; self.mesh_reliability = reliability
+        self.mesh_positions = {}
+        index_of_node: Dict[int, int] = {}
         for i, node in enumerate(args):
-            for j, other_node in enumerate(args):
-                if node.get_id() != other_node.get_id() and \
-                        not self.check_link(node.get_id(), other_node.get_id()) and \
-                        node.distance_to(other_node) <= distance_threshold:
-                    self.create_bidirectional_link(node.get_id(),
-                                                   other_node.get_id(), node.distance_to(other_node), reliability)
-                    CHANNEL_LOGGER.log(f"Created link ({node.get_id()}, {node.x:.2f}, {node.y:.2f}), ({other_node.get_id()}, {other_node.x:.2f}, {other_node.y:.2f}), {reliability}")
+            grid.insert(node.get_id(), node.x, node.y)
+            self.mesh_positions[node.get_id()] = (node.x, node.y)
+            index_of_node[node.get_id()] = i
+
+        log_links = CHANNEL_LOGGER.is_enabled()
+        for i, node in enumerate(args):
+            for j in sorted(index_of_node[node_id] for node_id in grid.get_candidates(node.x, node.y)):
+                if j <= i: # Pair already considered from the other node.
+                    continue
+                other_node = args[j]
+                if node.get_id() != other_node.get_id():
+                    distance = node.distance_to(other_node)
+                    if distance <= distance_threshold:
+                        self.create_bidirectional_link(node.get_id(), other_node.get_id(), distance, reliability)
+                        if log_links:
+                            CHANNEL_LOGGER.log(f"Created link ({node.get_id()}, {node.x:.2f}, {node.y:.2f}), ({other_node.get_id()}, {other_node.x:.2f}, {other_node.y:.2f}), {reliability}")
+
+    def select_receivers(self, sender_id: int) -> List[Tuple[int, float]]:
+        """
+        Draws which links of sender_id deliver a transmission : returns the (receiver_id, distance) of those that do, in the order of the links.
+        Links of reliability 1 deliver without any draw. Channels storing their links differently (see csr.py) override this to draw all the losses at once.
+        """
+        draw = self.get_rng().random
+        links = self.adjacencies_per_node.get(sender_id)
+        if links is None: # Removed node, transmitting what was scheduled before.
+            return []
+        links = links.values()
+        multiplier = self.reliability_multiplier
+        if self.reliability_overrides:
+            get_reliability = self.get_reliability
+            return [(node_id, distance) for (node_id, distance, _) in links
+                if (reliability := get_reliability(sender_id, node_id)) >= 1.0 or draw() < reliability]
+        if self.reliability_all is not None:
+            reliability = self.reliability_all * multiplier
+            if reliability >= 1.0:
+                return [(node_id, distance) for (node_id, distance, _) in links]
+            return [(node_id, distance) for (node_id, distance, _) in links if draw() < reliability]
+        if multiplier != 1.0:
+            return [(node_id, distance) for (node_id, distance, reliability) in links
+                if reliability * multiplier >= 1.0 or draw() < reliability * multiplier]
+        return [(node_id, distance) for (node_id, distance, reliability) in links
+            if reliability >= 1.0 or draw() < reliability]
 
     def handle_transmission(self, simulator: 'Simulator',
                             packet: 'Packet', sender_id: int):
-        """ As the name implies. It creates the appropriate events. """
-        # Send packet to all adjacent points
-        for (node_id, distance, reliability) in self.adjacencies_per_node[sender_id]:
-            if random.random() < reliability:
-                new_packet = packet.forward(sender_id)
-                new_packet.add_to_path(node_id)  # Add ID of receiver to its path.
-                delay = distance * self.packet_delay_per_distance_unit
-                simulator.schedule_event(delay,
-                    self.assigned_nodes[node_id].receive_packet, new_packet)
+        """
+        As the name implies. It creates the appropriate events.
+        If the simulator batches events, receptions are scheduled as batch-aware deliveries : receptions of a same broadcast
+        falling in the same batch are then handled by a single call to deliver_packets.
+        """
+        if simulator.current_time >= self._next_reliability_change_time:
+            self.apply_reliability_schedule(simulator.current_time)
+        batching = simulator.batch_epsilon is not None
+        # Send packet to all adjacent points the transmission reaches
+        for (node_id, distance) in self.select_receivers(sender_id):
+            new_packet = packet.forward(sender_id)
+            new_packet.add_to_path(node_id)  # Add ID of receiver to its path.
+            delay = distance * self.packet_delay_per_distance_unit
+            if batching:
+                simulator.schedule_batchable_event(delay, self.deliver_packets, node_id, new_packet)
+            else:
+                simulator.schedule_event(delay, self.deliver_packet, node_id, new_packet)
             #CHANNEL_LOGGER.log(f"channel registered packet from {sender_id} to {node_id}")
 
-class Node(Loggable):
-    next_id = 1
+    def deliver_packets(self, simulator: 'Simulator', deliveries: List[Tuple[int, 'Packet']]):
+        """ Batch-aware reception callback : hands every (receiver_id, packet) of the batch to its receiver. """
+        assigned_nodes = self.assigned_nodes
+        for node_id, packet in deliveries:
+            node = assigned_nodes.get(node_id)
+            if node is not None: # Else removed while the packet was on its way.
+                node.receive_packet(simulator, packet)
 
-    def __init__(self, x: float, y: float, channel: 'Channel' = None, hearing_radius_capacity = -1):
-        super(Node, self).__init__(logger=NODE_LOGGER, preamble=str(Node.next_id)+" - ")
-        self.node_id = Node.next_id
-        Node.next_id += 1
+    def deliver_packet(self, simulator: 'Simulator', node_id: int, packet: 'Packet'):
+        """ Reception callback : hands packet to its receiver, unless it was removed while the packet was on its way. """
+        node = self.assigned_nodes.get(node_id)
+        if node is not None:
+            node.receive_packet(simulator, packet)
+
+class Node(Loggable):
+    def __init__(self, x: float, y: float, channel: 'Channel' = None, hearing_radius_capacity = -1, context: Optional[SimulationContext] = None):
+        """
+        :context: Numbering the node's id and the ids of the packets it creates. DEFAULT_CONTEXT if None.
+        """
+        self.context = context if context is not None else DEFAULT_CONTEXT
+        self.node_id = self.context.new_node_id()
+        super(Node, self).__init__(logger=NODE_LOGGER, preamble=str(self.node_id)+" - ")
         self.x = x
         self.y = y
         self.channel = channel
         self.hearing_radius_capacity = hearing_radius_capacity # if -1, channel takes care of it.
+        self.rng: Optional[random.Random] = None # The random module's generator if None.
 
     def set_channel(self, channel: 'Channel'):
         """ Assign said channel to node. Called by channel. """
@@ -354,6 +893,13 @@ class Node(Loggable):
     def get_id(self):
         return self.node_id
 
+    def set_rng(self, rng: Optional[random.Random]):
+        """ Random generator of the node, typically simulator.get_rng_stream(f"node-{node_id}"). None reverts to the random module. """
+        self.rng = rng
+
+    def get_rng(self):
+        return self.rng if self.rng is not None else random
+
     def receive_packet(self, simulator: Simulator, packet: Packet):
         """
         Registers receiving a packet, then processing it. Call back used
@@ -388,7 +934,7 @@ class Node(Loggable):
 class Gateway(Node):
     def __init__(self, x: float, y: float, channel: 'Channel' = None):
         super(Gateway, self).__init__(x, y, channel)
-        super(Node, self).__init__(logger=GATEWAY_LOGGER, preamble=str(Node.next_id)+" - ")
+        super(Node, self).__init__(logger=GATEWAY_LOGGER, preamble=str(self.node_id)+" - ")
 
     def process_packet(self, simulator: Simulator, packet: Packet):
         # Gateways can also process packets like regular nodes if needed
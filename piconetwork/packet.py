@@ -1,15 +1,38 @@
-from typing import Any, Dict, List
-from copy import deepcopy
+from typing import Any, List, Optional
 
 
+class PathHop:
+    """
+    One hop of the path of a packet : a persistent linked list, from the last node reached back to the source.
+    Hops are never modified : copies of a packet share their common hops, and extending a path only creates its new hop.
+    """
+    __slots__ = ('node_id', 'parent', 'length')
+
+    def __init__(self, node_id: int, parent: Optional['PathHop'] = None):
+        self.node_id = node_id
+        self.parent = parent
+        self.length = 1 if parent is None else parent.length + 1 # Number of nodes of the path up to this hop.
+
+    def to_list(self) -> List[int]:
+        """ Node ids of the path, from the source to this hop. O(length). """
+        node_ids = []
+        hop = self
+        while hop is not None:
+            node_ids.append(hop.node_id)
+            hop = hop.parent
+        node_ids.reverse()
+        return node_ids
+
 class Packet:
+    # Slotted : millions of packets are created by a long simulation. Subclasses should declare their own __slots__ as well.
+    __slots__ = ('data', 'source_id', 'last_hop', 'first_emission_time')
 
     def __init__(self, data: Any, source_id: int, first_emission_time:float = -1.0):
         self.data = data
         self.source_id = source_id
-        self.path = [source_id]  # This information remains internal.
+        self.last_hop = PathHop(source_id)  # This information remains internal. See path.
         self.first_emission_time = first_emission_time # This information is indeed internal, but should be set by source to allow for example tracking how long a packet took to get to its rightful destination.
-        
+
         # self.path shall be used for internal testing purposes only.
         # for LPWAN, only data and source_id are to be used
 
@@ -21,23 +44,39 @@ class Packet:
 
         This is mainly used in channel, so as ot keep the Packets
         seperate as if through deepcopy (think proper stack "Structs" as in C.)
+        The data is not copied : every copy of a packet shares it (copy-on-write). It must then never be modified in place,
+        but replaced by a modified copy (see PacketLP.DataLP.relayed_by). Neither is the path, whose hops are immutable (see PathHop).
 
         DONE : make this forward happen within channels instead of nodes.
         """
 
         # MUST NOT DO __init__ WHICH CAN MESS WITH PACKET IDs
         forwarded = type(self).__new__(type(self))
-        forwarded.__dict__.update(self.__dict__)
-        forwarded.path = deepcopy(self.path)
-        forwarded.data = deepcopy(self.data)
+        forwarded.data = self.data
+        forwarded.source_id = self.source_id
+        forwarded.last_hop = self.last_hop
+        forwarded.first_emission_time = self.first_emission_time
 
         return forwarded
 
+    def snapshot(self) -> 'Packet':
+        """ Copy of the packet as it is now, for later reading (see Loggable._log) : a forward, the data and path being shared and immutable. """
+        return self.forward(self.last_hop.node_id)
+
     def add_to_path(self, node_id: int):
-        self.path.append(node_id)
+        self.last_hop = PathHop(node_id, self.last_hop)
+
+    @property
+    def path(self) -> List[int]:
+        """ Node ids the packet went through, source first. Built on demand, in O(length) : use get_path_length for the length only. """
+        return self.last_hop.to_list()
+
+    def get_path_length(self) -> int:
+        """ Number of nodes in the path, source included. O(1). """
+        return self.last_hop.length
 
     def get_data(self):
-        return self.data  # Not a deep copy, watch out.
+        return self.data  # Not a deep copy, watch out : shared with every copy of the packet.
 
     def get_source_id(self):
         return self.source_id
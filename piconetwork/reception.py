@@ -0,0 +1,63 @@
+from typing import Any, Callable, Dict, List
+
+"""
+OUERTANI Mohamed Hachem <omhx21@gmail.com>
+
+Reception engine of a channel : which receptions succeed, and which collide.
+
+Receiving a packet takes some time. A receiver hearing a second packet while it is receiving a first one loses both, and stays busy
+until the end of the second one : a reception only succeeds if nothing else is heard from its start until its end.
+The engine keeps, per receiver, the end of its busy interval and the packet being received (None once collided).
+A single event per busy interval ends it : a collision only pushes busy_until further, and the end event, when it fires too early,
+schedules itself again at busy_until. No event is ever cancelled.
+"""
+
+class ReceptionEngine:
+    def __init__(self):
+        # Per receiver id, while it is busy : [busy_until, packet being received or None if collided, callback on success].
+        self.receptions_in_progress: Dict[int, List[Any]] = {}
+        self.receptions = 0 # Successful receptions.
+        self.collisions = 0 # Packets lost to collisions : both packets of a collision count.
+        self.collisions_per_node: Dict[int, int] = {}
+
+    def start_reception(self, simulator, receiver_id: int, packet, duration: float, on_received: Callable) -> bool:
+        """
+        A packet starts being heard by receiver_id, for duration.
+        If nothing else is heard by then, on_received(simulator, packet) is called at its end.
+        :returns: False if it collided with a reception in progress.
+        """
+        busy_until = simulator.get_current_time() + duration
+        reception = self.receptions_in_progress.get(receiver_id)
+        if reception is None:
+            self.receptions_in_progress[receiver_id] = [busy_until, packet, on_received]
+            simulator.schedule_event_at(busy_until, self.end_reception, receiver_id)
+            return True
+
+        lost = 2 if reception[1] is not None else 1 # The packet being received is lost as well, if not already.
+        self.collisions += lost
+        self.collisions_per_node[receiver_id] = self.collisions_per_node.get(receiver_id, 0) + lost
+        reception[1] = None
+        if busy_until > reception[0]:
+            reception[0] = busy_until
+        return False
+
+    def end_reception(self, simulator, receiver_id: int):
+        reception = self.receptions_in_progress[receiver_id]
+        if simulator.get_current_time() < reception[0]: # A collision extended the busy interval.
+            simulator.schedule_event_at(reception[0], self.end_reception, receiver_id)
+            return
+        del self.receptions_in_progress[receiver_id]
+        if reception[1] is not None:
+            self.receptions += 1
+            reception[2](simulator, reception[1])
+
+    def is_busy(self, receiver_id: int) -> bool:
+        """ Whether receiver_id is hearing something. """
+        return receiver_id in self.receptions_in_progress
+
+    def get_statistics(self) -> dict:
+        return {
+            'receptions': self.receptions,
+            'collisions': self.collisions,
+            'receivers_busy': len(self.receptions_in_progress),
+        }
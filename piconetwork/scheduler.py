@@ -0,0 +1,349 @@
+import heapq
+from bisect import insort
+from typing import List, Optional, Tuple
+
+"""
+OUERTANI Mohamed Hachem <omhx21@gmail.com>
+
+Event queues used by the Simulator.
+
+Cancelling an event does not remove it from the queue : it is only flagged as non-effective.
+The queue keeps count of these "tombstones" so they can be purged in one go, instead of paying for them
+on every push and pop during long simulations where most timers end up cancelled.
+
+Two backends are available :
+- HeapEventQueue : binary heap, O(log N) per operation. The default, and the fastest for the simulations of this package,
+    whose queues hold hundreds to thousands of events : heapq is implemented in C, the calendar queue in Python.
+- CalendarEventQueue : calendar queue (R. Brown, 1988), O(1) amortized per operation when event times
+    are spread evenly enough. It only pays off for queues of about a million pending events (hold model of
+    scripts/benchmarks/bench_event_queues.py) : not a performance option for the networks simulated here.
+
+Entries are (time, seq, event) tuples, so the queues only ever compare floats and integers.
+seq is a monotonic counter : events of equal time are executed in the order they were scheduled,
+which makes runs reproducible event for event, whatever the backend.
+"""
+
+class EventQueue:
+    """
+    Interface of the event queues pluggable in the Simulator.
+    Takes care of the sequence numbers and of the tombstones accounting; backends store the entries.
+    """
+
+    def __init__(self, compaction_ratio: float = 0.5, compaction_minimum: int = 256):
+        """
+        :compaction_ratio: The queue is compacted once dead events make up more than this fraction of it.
+        :compaction_minimum: Number of dead events under which no compaction is ever done (not worth it).
+        """
+        assert 0.0 < compaction_ratio <= 1.0
+        self._size = 0 # Number of entries held, dead ones included.
+        self._dead = 0
+        self._next_seq = 0
+        self.compaction_ratio = compaction_ratio
+        self.compaction_minimum = compaction_minimum
+
+        # Statistics, useful to see how much garbage long simulations produce.
+        self.compactions = 0
+        self.dead_events_purged = 0
+        self.peak_size = 0
+
+    def push(self, event: 'Event'):
+        """ Adds event to the queue. The event keeps a handle to the queue to report its own cancellation. """
+        event._queue = self
+        event.seq = seq = self._next_seq
+        self._next_seq = seq + 1
+        self._insert((event.time, seq, event))
+        self._size += 1
+        if self._size > self.peak_size:
+            self.peak_size = self._size
+
+    def requeue(self, event: 'Event'):
+        """ Puts back an event that was popped but not executed. It keeps its sequence number, hence its place among events of equal time. """
+        event._queue = self
+        self._insert((event.time, event.seq, event))
+        self._size += 1
+
+    def pop(self) -> Optional['Event']:
+        """ Removes and returns the earliest live event, discarding tombstones on the way. None if no live event is left. """
+        while self._size:
+            event = self._remove_first()[2]
+            self._size -= 1
+            event._queue = None
+            if event.effective:
+                return event
+            self._dead -= 1
+            self.dead_events_purged += 1
+        return None
+
+    def peek_time(self) -> Optional[float]:
+        """ Returns the time of the earliest live event without removing it. None if no live event is left. """
+        while self._size:
+            entry = self._first()
+            if entry[2].effective:
+                return entry[0]
+            self._remove_first()[2]._queue = None
+            self._size -= 1
+            self._dead -= 1
+            self.dead_events_purged += 1
+        return None
+
+    def notify_cancelled(self, event: 'Event'):
+        """ Called by an event of this queue when it gets cancelled. """
+        self._dead += 1
+        if self._dead >= self.compaction_minimum and self._dead > self.compaction_ratio * self._size:
+            self.compact()
+
+    def compact(self):
+        """ Rebuilds the queue with the live events only. """
+        live_entries = []
+        for entry in self._entries():
+            if entry[2].effective:
+                live_entries.append(entry)
+            else:
+                entry[2]._queue = None
+        self.dead_events_purged += self._size - len(live_entries)
+        self._rebuild(live_entries)
+        self._size = len(live_entries)
+        self._dead = 0
+        self.compactions += 1
+
+    def get_live_count(self) -> int:
+        """ Number of events that will still be executed. """
+        return self._size - self._dead
+
+    def get_dead_count(self) -> int:
+        """ Number of cancelled events still held in memory. """
+        return self._dead
+
+    def get_statistics(self) -> dict:
+        return {
+            'live': self.get_live_count(),
+            'dead': self.get_dead_count(),
+            'peak_size': self.peak_size,
+            'compactions': self.compactions,
+            'dead_events_purged': self.dead_events_purged,
+        }
+
+    def __len__(self):
+        return self._size - self._dead
+
+    def __bool__(self):
+        return self._size > self._dead
+
+    # To be defined by the backends. None of them is called on an empty queue, except _rebuild.
+    def _insert(self, entry: Tuple[float, int, 'Event']):
+        raise NotImplementedError("Insertion not implemented")
+
+    def _first(self) -> Tuple[float, int, 'Event']:
+        raise NotImplementedError("Access to the first entry not implemented")
+
+    def _remove_first(self) -> Tuple[float, int, 'Event']:
+        raise NotImplementedError("Removal of the first entry not implemented")
+
+    def _entries(self) -> List[Tuple[float, int, 'Event']]:
+        """ All entries held, in any order. """
+        raise NotImplementedError("Listing of the entries not implemented")
+
+    def _rebuild(self, entries: List[Tuple[float, int, 'Event']]):
+        """ Replaces the content of the queue by the given entries (in any order). """
+        raise NotImplementedError("Rebuilding not implemented")
+
+class HeapEventQueue(EventQueue):
+    """ Binary heap of events. """
+
+    def __init__(self, compaction_ratio: float = 0.5, compaction_minimum: int = 256):
+        super().__init__(compaction_ratio, compaction_minimum)
+        self._heap: List[Tuple[float, int, 'Event']] = []
+
+    def push(self, event: 'Event'):
+        # Inlined version of the parent's method : this is the default queue, and the hottest path of the simulator.
+        event._queue = self
+        event.seq = seq = self._next_seq
+        self._next_seq = seq + 1
+        heapq.heappush(self._heap, (event.time, seq, event))
+        self._size += 1
+        if self._size > self.peak_size:
+            self.peak_size = self._size
+
+    def pop(self) -> Optional['Event']:
+        heap = self._heap
+        while heap:
+            event = heapq.heappop(heap)[2]
+            self._size -= 1
+            event._queue = None
+            if event.effective:
+                return event
+            self._dead -= 1
+            self.dead_events_purged += 1
+        return None
+
+    def _insert(self, entry):
+        heapq.heappush(self._heap, entry)
+
+    def _first(self):
+        return self._heap[0]
+
+    def _remove_first(self):
+        return heapq.heappop(self._heap)
+
+    def _entries(self):
+        return self._heap
+
+    def _rebuild(self, entries):
+        heapq.heapify(entries)
+        self._heap = entries
+
+class CalendarEventQueue(EventQueue):
+    """
+    Calendar queue : time is cut into "days" of bucket_width, and a "year" holds as many days as there are buckets.
+    An event goes in the bucket of its day modulo the year, each bucket being kept sorted.
+    Dequeuing walks the days from the current one, only looking at the head of each bucket.
+
+    The number of buckets doubles (resp. halves) when the queue holds more than twice (resp. less than half)
+    as many entries, the bucket width being re-estimated from the spacing of the earliest events at every resize.
+    Resizing drops the tombstones, as would a compaction.
+    """
+
+    MINIMUM_BUCKET_COUNT = 16
+    WIDTH_SAMPLE_SIZE = 32 # Number of earliest events used to estimate the bucket width.
+
+    def __init__(self, bucket_width: float = 1.0, bucket_count: int = 16, compaction_ratio: float = 0.5, compaction_minimum: int = 256):
+        """
+        :bucket_width: Initial duration covered by a bucket. Re-estimated at every resize.
+        :bucket_count: Initial number of buckets.
+        """
+        super().__init__(compaction_ratio, compaction_minimum)
+        assert bucket_width > 0.0 and bucket_count > 0
+        self.resizes = 0
+        self._width = bucket_width
+        self._buckets: List[List[Tuple[float, int, 'Event']]] = [[] for _ in range(bucket_count)]
+        self._day = 0 # Absolute index of the day (bucket of the current year) where the search starts.
+
+    def push(self, event: 'Event'):
+        # Inlined version of the parent's method, as for the heap.
+        event._queue = self
+        event.seq = seq = self._next_seq
+        self._next_seq = seq + 1
+        time = event.time
+        day = int(time // self._width)
+        buckets = self._buckets
+        bucket = buckets[day % len(buckets)]
+        if not bucket or bucket[-1][0] <= time:
+            bucket.append((time, seq, event)) # Usual case : latest event of its bucket, seq being the largest so far.
+        else:
+            insort(bucket, (time, seq, event))
+        if day < self._day:
+            self._day = day # Event earlier than where we were looking : start the search from it.
+
+        self._size += 1
+        if self._size > self.peak_size:
+            self.peak_size = self._size
+        if self._size > 2 * len(buckets):
+            self._resize(2 * len(buckets), extra_entries=0)
+
+    def pop(self) -> Optional['Event']:
+        while self._size:
+            buckets = self._buckets
+            bucket = buckets[self._day % len(buckets)]
+            if not bucket or bucket[0][0] // self._width > self._day:
+                bucket = self._locate()
+            event = bucket.pop(0)[2]
+            self._size -= 1
+            event._queue = None
+            if len(buckets) > self.MINIMUM_BUCKET_COUNT and self._size < len(buckets) // 2:
+                self._resize(len(buckets) // 2, extra_entries=0)
+            if event.effective:
+                return event
+            self._dead -= 1
+            self.dead_events_purged += 1
+        return None
+
+    def _insert(self, entry):
+        day = int(entry[0] // self._width)
+        buckets = self._buckets
+        insort(buckets[day % len(buckets)], entry)
+        if day < self._day:
+            self._day = day # Event earlier than where we were looking : start the search from it.
+
+        if self._size + 1 > 2 * len(buckets):
+            self._resize(2 * len(buckets), extra_entries=1)
+
+    def _locate(self) -> List[Tuple[float, int, 'Event']]:
+        """ Returns the bucket holding the earliest entry at its head, moving the current day to it. """
+        buckets = self._buckets
+        bucket_count = len(buckets)
+        width = self._width
+        day = self._day
+        for _ in range(bucket_count):
+            bucket = buckets[day % bucket_count]
+            if bucket and bucket[0][0] // width <= day:
+                self._day = day
+                return bucket
+            day += 1
+
+        # Nothing within a year from the current day : sparse queue, directly look for the smallest head.
+        earliest = min(bucket[0] for bucket in buckets if bucket)
+        self._day = int(earliest[0] // width)
+        return buckets[self._day % bucket_count]
+
+    def _first(self):
+        return self._locate()[0]
+
+    def _remove_first(self):
+        entry = self._locate().pop(0)
+        bucket_count = len(self._buckets)
+        if bucket_count > self.MINIMUM_BUCKET_COUNT and self._size - 1 < bucket_count // 2:
+            self._resize(bucket_count // 2, extra_entries=-1)
+        return entry
+
+    def _entries(self):
+        return [entry for bucket in self._buckets for entry in bucket]
+
+    def _rebuild(self, entries):
+        self._fill(len(self._buckets), entries)
+
+    def _resize(self, bucket_count: int, extra_entries: int):
+        """
+        Re-distributes the live entries over bucket_count buckets, with a freshly estimated width.
+        :extra_entries: Correction to self._size, for the entry being inserted or removed by the caller.
+        """
+        live_entries = []
+        for entry in self._entries():
+            if entry[2].effective:
+                live_entries.append(entry)
+            else:
+                entry[2]._queue = None
+        dropped = self._size + extra_entries - len(live_entries)
+        self._size -= dropped
+        self._dead -= dropped
+        self.dead_events_purged += dropped
+        self.resizes += 1
+        self._fill(bucket_count, live_entries)
+
+    def _fill(self, bucket_count: int, entries: List[Tuple[float, int, 'Event']]):
+        entries.sort()
+        self._width = self._estimate_width(entries)
+        self._buckets = [[] for _ in range(bucket_count)]
+        self._day = int(entries[0][0] // self._width) if entries else 0
+        # Entries are sorted : appending keeps every bucket sorted.
+        width = self._width
+        buckets = self._buckets
+        for entry in entries:
+            buckets[int(entry[0] // width) % bucket_count].append(entry)
+
+    def _estimate_width(self, sorted_entries: List[Tuple[float, int, 'Event']]) -> float:
+        """ Three times the average separation between the earliest events, ignoring the largest gaps (as in Brown's paper). """
+        sample = sorted_entries[:self.WIDTH_SAMPLE_SIZE]
+        if len(sample) < 2:
+            return self._width
+        separations = [b[0] - a[0] for a, b in zip(sample, sample[1:])]
+        average = sum(separations) / len(separations)
+        kept = [separation for separation in separations if separation <= 2 * average]
+        average = sum(kept) / len(kept) if kept else 0.0
+        return average > 0.0 and 3.0 * average or self._width
+
+    def get_statistics(self) -> dict:
+        statistics = super().get_statistics()
+        statistics['buckets'] = len(self._buckets)
+        statistics['bucket_width'] = self._width
+        statistics['resizes'] = self.resizes
+        return statistics
@@ -1,14 +1,17 @@
-import io, sys, os, argparse, random, pickle, networkx as nx
-from time import sleep
+import io, sys, os, argparse, random, pickle, copy, networkx as nx
+from time import sleep, perf_counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from zipfile import ZipFile, ZIP_DEFLATED
 
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Iterable, Iterator
 from dataclasses import dataclass
 
 from matplotlib import pyplot as plt; from matplotlib.figure import Figure; from matplotlib.axes import Axes
 
-from .main import Simulator, Channel, Logger, NODE_LOGGER, GATEWAY_LOGGER, SOURCE_LOGGER, SIMULATOR_LOGGER, CHANNEL_LOGGER, EVENT_LOGGER, Simulator
-from .lpwan_jitter import NodeLP, PacketLP, SourceLP, GatewayLP, NodeLP_Jitter_Configuration
-from .logger import aggregate_logs_and_save
+from .main import Simulator, Channel, SimulationContext, Logger, NODE_LOGGER, GATEWAY_LOGGER, SOURCE_LOGGER, SIMULATOR_LOGGER, CHANNEL_LOGGER, EVENT_LOGGER, Simulator
+from .lpwan_jitter import NodeLP, PacketLP, SourceLP, GatewayLP, NodeLP_Jitter_Configuration, NodeLP_Parameters, FlightRecorderTrigger
+from .logger import aggregate_logs_and_save, LogSink
+from .checkpoint import save_checkpoint, load_checkpoint
 
 from .graphical import plot_nodes_lpwan_better;
 
@@ -68,12 +71,36 @@ class Simulatable_MetadataAugmented_Dumpable_Network_Object:
     gateway_ids: List[int]
     channel: Channel
     pseudorandomization_seed: Optional[int] = None
+    record_trace: bool = False # Whether a structured trace (see trace.py) is recorded, and saved along the logs.
+    stream_logs: bool = False # Whether saved logs are written to their file while simulating (see LogSink), rather than kept in memory until then.
+    flight_recorder_capacity: Optional[int] = None # If set, effective loggers only keep their last messages, dumped on flight_recorder_triggers (see Logger.set_flight_recorder).
+    flight_recorder_triggers: Tuple[FlightRecorderTrigger, ...] = ()
+
+@dataclass
+class ReplicationJob:
+    """
+    One simulation of a sweep, see run_replications.
+    Results are saved as zip_prefix + ".zip", holding zip_prefix + "_logs.gz" and zip_prefix + "_topology_info" (as read by ultimate_analyze),
+    and zip_prefix + "_logs_trace.npz" if the trace is recorded.
+    """
+    network_and_metadata: Simulatable_MetadataAugmented_Dumpable_Network_Object
+    zip_prefix: str
+    save_results: bool = False
+    show_network: bool = False
+
+@dataclass
+class ReplicationResult:
+    job_index: int # Index of the job in the list given to run_replications.
+    zip_prefix: str
+    nodes_mode: str
+    pseudorandomization_seed: Optional[int]
+    wall_time: float # Seconds spent simulating and saving.
 
 def generate_topology(topology_parameters: GenerationParameters) -> Tuple[List[NodeLP|SourceLP|GatewayLP], List[int], List[int], List[int], Channel]:
     """
     Given the topology parameters given, returns [nodes], [sources_indexes], [relay_nodes_indexes], [gateway_indexes], and channel.
     """
-    random.seed(topology_parameters.seed) # Randomize simulation seed.
+    rng = random.Random(topology_parameters.seed) # Local generator : generating a topology leaves the random module untouched.
     for logger in VALID_LOGS: LOGGERS_DICT[logger].set_effective(False); LOGGERS_DICT[logger].set_verbose(False)
 
     all_nodes = []
@@ -81,6 +108,7 @@ def generate_topology(topology_parameters: GenerationParameters) -> Tuple[List[N
     nodes_ids = []
     gateway_ids = []
     channel = Channel()
+    context = SimulationContext() # Every topology numbers its nodes from 1.
 
     # For simplicity extract the relevent variables
     density = topology_parameters.density
@@ -92,25 +120,25 @@ def generate_topology(topology_parameters: GenerationParameters) -> Tuple[List[N
     if topology_parameters.type_of_network == 'random_gauss':
         width = n**0.5 * hearing_distance
         height = n**0.5 * hearing_distance
-        pos = {i: (random.gauss(0, width/density), random.gauss(0, height/density)) for i in range(n)} # Position of nodes
+        pos = {i: (rng.gauss(0, width/density), rng.gauss(0, height/density)) for i in range(n)} # Position of nodes
         G = nx.random_geometric_graph(n, dim=2, radius=hearing_distance, pos=pos)
         largest_cc = G.subgraph(max(nx.connected_components(G), key=len)).copy() # Keep the biggest connected subgraph.
     elif topology_parameters.type_of_network == 'random_linear':
         width = n**(0.5) * hearing_distance * 1.41 / density
         height = n**(0.5) * hearing_distance / 1.41 / density
-        pos = {i: (random.random() * width - width/2, random.random() * height - height/2) for i in range(n)} # Position of nodes
+        pos = {i: (rng.random() * width - width/2, rng.random() * height - height/2) for i in range(n)} # Position of nodes
         G = nx.random_geometric_graph(n, dim=2, radius=hearing_distance, pos=pos)
         largest_cc = G.subgraph(max(nx.connected_components(G), key=len)).copy() # Keep the biggest connected subgraph.
     elif topology_parameters.type_of_network == 'stretched_random_gauss':
         width = n**0.5 * hearing_distance * 4
         height = n**0.5 * hearing_distance * 1/4
-        pos = {i: (random.gauss(0, width/density), random.gauss(0, height/density)) for i in range(n)} # Position of nodes
+        pos = {i: (rng.gauss(0, width/density), rng.gauss(0, height/density)) for i in range(n)} # Position of nodes
         G = nx.random_geometric_graph(n, dim=2, radius=hearing_distance, pos=pos)
         largest_cc = G.subgraph(max(nx.connected_components(G), key=len)).copy() # Keep the biggest connected subgraph.
     elif topology_parameters.type_of_network in ['two_gateways_switch_middle_random_linear', 'two_gateways_random_linear']:
         width = n**(0.5) * hearing_distance * 1.41 / density
         height = n**(0.5) * hearing_distance / 1.41 / density
-        pos = {i: (random.random() * width - width/2, random.random() * height - height/2) for i in range(n)} # Position of nodes
+        pos = {i: (rng.random() * width - width/2, rng.random() * height - height/2) for i in range(n)} # Position of nodes
         G = nx.random_geometric_graph(n, dim=2, radius=hearing_distance, pos=pos)
         largest_cc = G.subgraph(max(nx.connected_components(G), key=len)).copy() # Keep the biggest connected subgraph.
     else:
@@ -154,16 +182,16 @@ def generate_topology(topology_parameters: GenerationParameters) -> Tuple[List[N
         other_nodes = list(largest_cc.nodes); other_nodes.remove(good_triplet[0]); other_nodes.remove(good_triplet[1])
 
         # Now generate!
-        source = SourceLP(pos[good_triplet[0]][0], pos[good_triplet[0]][1], interval=topology_parameters.sources_recurrent_transmission_delays[0])
+        source = SourceLP(pos[good_triplet[0]][0], pos[good_triplet[0]][1], interval=topology_parameters.sources_recurrent_transmission_delays[0], rng=rng, context=context)
         all_nodes.append(source)
         source_ids.append(len(all_nodes)-1)
 
         for node_id in other_nodes:
-            node = NodeLP(pos[node_id][0], pos[node_id][1], mode=topology_parameters.nodes_mode)
+            node = NodeLP(pos[node_id][0], pos[node_id][1], mode=topology_parameters.nodes_mode, rng=rng, context=context)
             all_nodes.append(node)
             nodes_ids.append(len(all_nodes)-1)
 
-        gateway = GatewayLP(pos[good_triplet[1]][0], pos[good_triplet[1]][1])
+        gateway = GatewayLP(pos[good_triplet[1]][0], pos[good_triplet[1]][1], rng=rng, context=context)
         all_nodes.append(gateway)
         gateway_ids.append(len(all_nodes)-1)
     else:
@@ -171,18 +199,18 @@ def generate_topology(topology_parameters: GenerationParameters) -> Tuple[List[N
 
         # Now generate!
         # 2nd is source
-        source = SourceLP(pos[good_triplet[1]][0], pos[good_triplet[1]][1], interval=topology_parameters.sources_recurrent_transmission_delays[0])
+        source = SourceLP(pos[good_triplet[1]][0], pos[good_triplet[1]][1], interval=topology_parameters.sources_recurrent_transmission_delays[0], rng=rng, context=context)
         all_nodes.append(source)
         source_ids.append(len(all_nodes)-1)
 
         for node_id in other_nodes:
-            node = NodeLP(pos[node_id][0], pos[node_id][1], mode=topology_parameters.nodes_mode)
+            node = NodeLP(pos[node_id][0], pos[node_id][1], mode=topology_parameters.nodes_mode, rng=rng, context=context)
             all_nodes.append(node)
             nodes_ids.append(len(all_nodes)-1)
 
         # 1st and 3nd as gateways. This allows better "distribution" basically
-        gateway_1 = GatewayLP(pos[good_triplet[0]][0], pos[good_triplet[0]][1])
-        gateway_2 = GatewayLP(pos[good_triplet[2]][0], pos[good_triplet[2]][1])
+        gateway_1 = GatewayLP(pos[good_triplet[0]][0], pos[good_triplet[0]][1], rng=rng, context=context)
+        gateway_2 = GatewayLP(pos[good_triplet[2]][0], pos[good_triplet[2]][1], rng=rng, context=context)
         all_nodes.append(gateway_1)
         all_nodes.append(gateway_2)
         gateway_ids.append(len(all_nodes)-2)
@@ -196,24 +224,46 @@ def generate_topology(topology_parameters: GenerationParameters) -> Tuple[List[N
     return all_nodes, source_ids, nodes_ids, gateway_ids, channel
 
 
-def set_simulation_parameters(simulation_parameters: SimulationParameters, channel: Channel, simulator: Simulator, all_nodes:List[NodeLP|SourceLP|GatewayLP], source_ids: List[int], nodes_ids: List[int], gateway_ids: List[int]) -> None:
+def set_simulation_parameters(simulation_parameters: SimulationParameters, channel: Channel, simulator: Simulator, all_nodes:List[NodeLP|SourceLP|GatewayLP], source_ids: List[int], nodes_ids: List[int], gateway_ids: List[int],
+    flight_recorder_triggers: Iterable[FlightRecorderTrigger] = (), flight_recorder_loggers: Iterable[Logger] = ()) -> None:
     """
     Sets all the nodes and channel parameters according to the appropriate simulation parameters.
     This is typically called before every simulation.
+    Every node, and the channel, get their own random stream from the simulator : the simulation only depends on the simulator's seed.
+    Parameters are given to the nodes (no class attribute is modified), and packet ids restart from 1 :
+    simulations of different networks can be run side by side, in any order. The packets nodes remember, and the receptions
+    in progress, are forgotten : successive simulations of the same network are independent.
+    :flight_recorder_triggers: Anomalies on which the nodes dump the flight recorders of flight_recorder_loggers (see FlightRecorderTrigger).
     """
     channel.set_delay_per_distance_unit(simulation_parameters.channel_delay_per_unit)
-    NodeLP_Jitter_Configuration.JITTER_INTERVALS = simulation_parameters.jitter_intervals
-    NodeLP_Jitter_Configuration.JITTER_MIN_VALUE = simulation_parameters.jitter_min_value
-    NodeLP_Jitter_Configuration.JITTER_MAX_VALUE = simulation_parameters.jitter_max_value
-    NodeLP_Jitter_Configuration.ADAPTATION_FACTOR = simulation_parameters.adaptation_factor
-    NodeLP.NODE_RECEPTION_OF_PACKET_DURATION = simulation_parameters.node_reception_of_packet_duration # 0.6 milliseconds by calculating 255 octets / 50 kbps # used to be jitter interval / 6
-
+    parameters = NodeLP_Parameters(
+        jitter_intervals = simulation_parameters.jitter_intervals,
+        jitter_min_value = simulation_parameters.jitter_min_value,
+        jitter_max_value = simulation_parameters.jitter_max_value,
+        adaptation_factor = simulation_parameters.adaptation_factor,
+        node_reception_of_packet_duration = simulation_parameters.node_reception_of_packet_duration, # 0.6 milliseconds by calculating 255 octets / 50 kbps # used to be jitter interval / 6
+        flight_recorder_triggers = frozenset(flight_recorder_triggers),
+        flight_recorder_loggers = tuple(flight_recorder_loggers)
+    )
+    for node in all_nodes: node.set_parameters(parameters)
+    for context in {id(node.context): node.context for node in all_nodes}.values(): context.reset_packet_ids()
+
+    channel.set_rng(simulator.get_rng_stream("channel"))
+    channel.reset_receptions()
     for node in all_nodes: node.reset_mode_to(simulation_parameters.nodes_mode);node.set_logger_simulator(simulator)         # Assign simulator for every logger we want to keep track of time for
+    for node in all_nodes: node.set_rng(simulator.get_rng_stream(f"node-{node.get_id()}"))
+
 
+def _switch_gateways_schedulable(simulator: Simulator, gateway_to_disable: GatewayLP, gateway_to_enable: GatewayLP):
+    gateway_to_disable.set_enabled(False); gateway_to_enable.set_enabled(True)
+
+def _plot_network_schedulable(simulator: Simulator, all_nodes: List[NodeLP|SourceLP|GatewayLP], channel: Channel):
+    plot_nodes_lpwan_better(all_nodes, channel)
 
 def run_simulation(network_and_metadata:Simulatable_MetadataAugmented_Dumpable_Network_Object,
     save_logs_file_name: str, save_network_and_metadata_file_name: str,
-    save_results: bool = False, show_network = False) -> None:
+    save_results: bool = False, show_network = False,
+    checkpoint_file_name: Optional[str] = None, checkpoint_interval: Optional[float] = None) -> None:
     """
     Runs a simulation.
     First : Set effective loggers and verbose loggers as given in the lists
@@ -223,6 +273,10 @@ def run_simulation(network_and_metadata:Simulatable_MetadataAugmented_Dumpable_N
     Notes :
         - Enabling nodes and disabling them is not set here.
         - This is generic. For more complex scenarios, must be edited accordingly.
+        - If checkpoint_file_name and checkpoint_interval are given, the whole simulation is saved there every checkpoint_interval
+            of simulated time. An interrupted simulation is then continued with resume_simulation.
+        - Scheduled callbacks are module-level functions rather than lambdas, so that the simulator can be checkpointed.
+        - The simulation is seeded with network_and_metadata.pseudorandomization_seed. If None, a seed is drawn and written there.
     """
     # Zeroeth : Extract necessary information
     all_nodes = network_and_metadata.nodes
@@ -240,46 +294,158 @@ def run_simulation(network_and_metadata:Simulatable_MetadataAugmented_Dumpable_N
     for logger in VALID_LOGS: LOGGERS_DICT[logger].set_effective(False); LOGGERS_DICT[logger].set_verbose(False)
     for logger in loggers_effective: LOGGERS_DICT[logger].set_effective(True)
     for logger in loggers_verbose: LOGGERS_DICT[logger].set_verbose(True)
+    for logger in VALID_LOGS: LOGGERS_DICT[logger].set_flight_recorder(None)
+    if network_and_metadata.flight_recorder_capacity is not None:
+        for logger in loggers_effective: LOGGERS_DICT[logger].set_flight_recorder(network_and_metadata.flight_recorder_capacity)
+    if save_results and network_and_metadata.stream_logs:
+        _make_directory_of(save_logs_file_name)
+        sink = LogSink(save_logs_file_name + ".gz")
+        for logger in loggers_effective: LOGGERS_DICT[logger].set_sink(sink)
 
     # Second - Setup everything
-    simulator = Simulator(simulation_parameters.simulation_total_duration, simulation_parameters.simulation_slowness)
-    set_simulation_parameters(simulation_parameters, channel, simulator, all_nodes, source_ids, nodes_ids, gateway_ids)
+    simulator = Simulator(simulation_parameters.simulation_total_duration, simulation_parameters.simulation_slowness, seed=seed)
+    network_and_metadata.pseudorandomization_seed = simulator.seed # Drawn by the simulator if none was given : kept to reproduce the run.
+    simulator.trace.set_enabled(network_and_metadata.record_trace)
+    flight_recorders = network_and_metadata.flight_recorder_capacity is not None
+    set_simulation_parameters(simulation_parameters, channel, simulator, all_nodes, source_ids, nodes_ids, gateway_ids,
+        flight_recorder_triggers = network_and_metadata.flight_recorder_triggers if flight_recorders else (),
+        flight_recorder_loggers = [LOGGERS_DICT[logger] for logger in loggers_effective] if flight_recorders else ())
 
     # Third - Simulate!
     if show_network:
         plot_nodes_lpwan_better(all_nodes, channel)
 
-    # To allow evolution of sensitivity at one point, useful for simulating performance
-    for (time_stamp, reliability) in simulation_parameters.sensitivity_of_all_links:
-        simulator.schedule_event(time_stamp+1e-3, lambda sim: (channel.set_reliability_all(reliability)) )
+    # To allow evolution of sensitivity at one point, useful for simulating performance. Applied by the channel as it transmits, see Channel.set_reliability_schedule.
+    channel.set_reliability_schedule([(time_stamp+1e-3, reliability) for (time_stamp, reliability) in simulation_parameters.sensitivity_of_all_links])
 
     if generation_parameters.type_of_network == 'two_gateways_switch_middle_random_linear':
         all_nodes[gateway_ids[0]].set_enabled(True); all_nodes[gateway_ids[1]].set_enabled(False)
-        simulator.schedule_event(simulation_parameters.simulation_total_duration/2.0, lambda sim: (all_nodes[gateway_ids[0]].set_enabled(False), all_nodes[gateway_ids[1]].set_enabled(True)) )
-        simulator.schedule_event(simulation_parameters.simulation_total_duration/2.0 + 1, lambda sim: plot_nodes_lpwan_better(all_nodes, channel) )
+        simulator.schedule_event(simulation_parameters.simulation_total_duration/2.0, _switch_gateways_schedulable, all_nodes[gateway_ids[0]], all_nodes[gateway_ids[1]])
+        simulator.schedule_event(simulation_parameters.simulation_total_duration/2.0 + 1, _plot_network_schedulable, all_nodes, channel)
 
     for source in source_ids: source_node = all_nodes[source];assert isinstance(source_node, SourceLP);source_node.start_sending(simulator)
-    random.seed() # Randomize simulation seed.
-    simulator.run()
+    _run_with_checkpoints(simulator, network_and_metadata, checkpoint_file_name, checkpoint_interval)
 
     if show_network:
         plot_nodes_lpwan_better(all_nodes, channel, title=f"Node topology with {simulation_parameters.nodes_mode} mode")
 
     # Fourth - Save Everything!
     if save_results:
-        all_loggers : List[Logger] = list(LOGGERS_DICT.values())
+        _save_simulation_results(simulator, network_and_metadata, save_logs_file_name, save_network_and_metadata_file_name)
+
+    return
+
+def resume_simulation(checkpoint_file_name: str,
+    save_logs_file_name: str, save_network_and_metadata_file_name: str,
+    save_results: bool = False, show_network = False, checkpoint_interval: Optional[float] = None) -> Simulatable_MetadataAugmented_Dumpable_Network_Object:
+    """
+    Continues a simulation checkpointed by run_simulation, up to its end, then saves its results the same way run_simulation would.
+    The results are identical to those of the uninterrupted simulation.
+    Returns the network and metadata of the simulation.
+    """
+    checkpoint = load_checkpoint(checkpoint_file_name)
+    simulator: Simulator = checkpoint.simulator
+    network_and_metadata: Simulatable_MetadataAugmented_Dumpable_Network_Object = checkpoint.payload
+
+    _run_with_checkpoints(simulator, network_and_metadata, checkpoint_interval is not None and checkpoint_file_name or None, checkpoint_interval)
+
+    if show_network:
+        plot_nodes_lpwan_better(network_and_metadata.nodes, network_and_metadata.channel, title=f"Node topology with {network_and_metadata.simulation_parameters.nodes_mode} mode")
+
+    if save_results:
+        _save_simulation_results(simulator, network_and_metadata, save_logs_file_name, save_network_and_metadata_file_name)
+
+    return network_and_metadata
+
+def _run_with_checkpoints(simulator: Simulator, network_and_metadata: Simulatable_MetadataAugmented_Dumpable_Network_Object,
+    checkpoint_file_name: Optional[str], checkpoint_interval: Optional[float]) -> None:
+    """ Runs the simulator to its end, checkpointing every checkpoint_interval if a checkpoint file is given. """
+    if checkpoint_file_name is None or checkpoint_interval is None:
+        simulator.run()
+        return
+
+    for _ in simulator.run_by_chunks(checkpoint_interval):
+        save_checkpoint(checkpoint_file_name, simulator, network_and_metadata)
+
+def _save_simulation_results(simulator: Simulator, network_and_metadata: Simulatable_MetadataAugmented_Dumpable_Network_Object,
+    save_logs_file_name: str, save_network_and_metadata_file_name: str) -> None:
+    all_loggers : List[Logger] = list(LOGGERS_DICT.values())
 
-        os.makedirs(os.path.dirname(save_logs_file_name), exist_ok=True) # Create folder
+    _make_directory_of(save_logs_file_name)
 
-        # First we save the logs
+    # First we save the logs : unless they were streamed to their file already, which is then complete once their sinks are closed.
+    sinks = {id(logger.sink): logger.sink for logger in all_loggers if logger.sink is not None}
+    for sink in sinks.values(): sink.close()
+    for logger in all_loggers: logger.set_sink(None)
+    if not sinks:
         aggregate_logs_and_save(all_loggers, save_logs_file_name)
+    if network_and_metadata.record_trace:
+        simulator.trace.save(get_trace_file_name(save_logs_file_name))
 
-        # Then to avoid saving logs twice in the pickle dump, we remove them after having saved them.
-        # NOTE : THIS REMOVES THE SIMULATOR FROM LOGGABLE, THUS NODES MUST BE PROPERLY RESET FOR FUTURE LOGS
-        for node in all_nodes: node._reset_loggable_part()
+    # Then to avoid saving logs twice in the pickle dump, we remove them after having saved them.
+    # NOTE : THIS REMOVES THE SIMULATOR FROM LOGGABLE, THUS NODES MUST BE PROPERLY RESET FOR FUTURE LOGS
+    for node in network_and_metadata.nodes: node._reset_loggable_part()
 
-        # Save the pickle dump ^_^
-        with io.open(save_network_and_metadata_file_name, 'wb') as save_network_and_metadata_file:
-            pickle.dump(obj = network_and_metadata, file=save_network_and_metadata_file)
+    # Save the pickle dump ^_^
+    with io.open(save_network_and_metadata_file_name, 'wb') as save_network_and_metadata_file:
+        pickle.dump(obj = network_and_metadata, file=save_network_and_metadata_file)
 
-    return
+def _make_directory_of(file_name: str):
+    directory = os.path.dirname(file_name)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+def get_trace_file_name(save_logs_file_name: str) -> str:
+    """ File the trace of a simulation is saved in, next to its logs. """
+    return save_logs_file_name + "_trace.npz"
+
+def get_replication_seed(base_seed: int, nodes_mode: str, replicate: int) -> int:
+    """ Seed of one replicate of a sweep : only depends on its arguments, and differs for every (mode, replicate) pair. """
+    return random.Random(f"{base_seed}:{nodes_mode}:{replicate}").getrandbits(64)
+
+def run_replication(job_index: int, job: ReplicationJob) -> ReplicationResult:
+    """
+    Runs one job of run_replications, then zips its results.
+    Loggers are emptied beforehand : a worker process runs many jobs, whose logs must not mix.
+    """
+    start = perf_counter()
+    for logger in LOGGERS_DICT.values(): logger.reset_logs()
+
+    file_logs_name = job.zip_prefix + "_logs"
+    file_topology_info_name = job.zip_prefix + "_topology_info"
+    run_simulation(job.network_and_metadata, file_logs_name, file_topology_info_name,
+        save_results = job.save_results, show_network = job.show_network)
+
+    if job.save_results:
+        with ZipFile(job.zip_prefix + ".zip", "w", compression=ZIP_DEFLATED, compresslevel=7) as zipped_archive:
+            zipped_archive.write(file_logs_name+".gz")
+            zipped_archive.write(file_topology_info_name)
+            if job.network_and_metadata.record_trace:
+                zipped_archive.write(get_trace_file_name(file_logs_name))
+
+        os.remove(file_logs_name+".gz")
+        os.remove(file_topology_info_name)
+        if job.network_and_metadata.record_trace:
+            os.remove(get_trace_file_name(file_logs_name))
+
+    return ReplicationResult(job_index, job.zip_prefix, job.network_and_metadata.simulation_parameters.nodes_mode,
+        job.network_and_metadata.pseudorandomization_seed, perf_counter() - start)
+
+def run_replications(jobs: List[ReplicationJob], max_workers: Optional[int] = 1) -> Iterator[ReplicationResult]:
+    """
+    Runs independent simulations, yielding their results as soon as they complete (hence not necessarily in order).
+    :max_workers: Number of processes simulating in parallel. None for as many as there are cores.
+        With 1, jobs are run one after the other in this process.
+    Every job simulates its own copy of the network, starting from the state it is in in the job :
+    results only depend on the jobs (and their seeds), never on the number of workers nor on the order of completion.
+    Set network_and_metadata.pseudorandomization_seed of every job for reproducible sweeps (see get_replication_seed).
+    """
+    if max_workers == 1 or any(job.show_network for job in jobs): # Figures can't be shown from worker processes.
+        for job_index, job in enumerate(jobs):
+            yield run_replication(job_index, copy.deepcopy(job))
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_replication, job_index, job) for job_index, job in enumerate(jobs)]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,46 @@
+from math import floor
+from typing import Dict, Iterator, List, Tuple
+
+"""
+OUERTANI Mohamed Hachem <omhx21@gmail.com>
+
+Spatial index used to find the nodes within hearing distance of each other without comparing every pair of nodes.
+"""
+
+class UniformGrid:
+    """
+    Uniform grid of square cells of side cell_size, each holding the indexes of the points it contains.
+    Every point within cell_size of a given point lies in the 3x3 block of cells around it : with cell_size set to the
+    hearing radius, a query only looks at a handful of cells, whatever the number of points.
+    """
+
+    def __init__(self, cell_size: float):
+        """
+        :cell_size: Side of the cells. Typically the largest distance that will be queried.
+        """
+        self.cell_size = cell_size > 0.0 and cell_size or 1.0 # Any positive size holds coincident points together.
+        # Cells are made a hair larger than asked, so that rounding can never put two points exactly cell_size apart two cells apart.
+        self._inverse_cell_size = 1.0 / (self.cell_size * (1.0 + 1e-9))
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+
+    def get_cell(self, x: float, y: float) -> Tuple[int, int]:
+        return (floor(x * self._inverse_cell_size), floor(y * self._inverse_cell_size))
+
+    def insert(self, index: int, x: float, y: float):
+        self.cells.setdefault(self.get_cell(x, y), []).append(index)
+
+    def remove(self, index: int, x: float, y: float):
+        cell = self.get_cell(x, y)
+        self.cells[cell].remove(index)
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def get_candidates(self, x: float, y: float) -> Iterator[int]:
+        """ Indexes of the points of the 3x3 cells around (x, y), in no particular order : a superset of the points within cell_size. """
+        cell_x, cell_y = self.get_cell(x, y)
+        cells = self.cells
+        for i in (cell_x - 1, cell_x, cell_x + 1):
+            for j in (cell_y - 1, cell_y, cell_y + 1):
+                cell = cells.get((i, j))
+                if cell is not None:
+                    yield from cell
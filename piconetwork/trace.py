@@ -0,0 +1,77 @@
+from array import array
+from enum import IntEnum
+from typing import Dict
+
+import numpy as np
+
+"""
+OUERTANI Mohamed Hachem <omhx21@gmail.com>
+
+Structured trace of a simulation : typed records appended to columns, saved as a compressed NumPy archive (.npz).
+It is the counterpart of the text logs (see logger.py) meant for analysis : nothing is formatted while simulating,
+nothing is parsed with regular expressions when analysing (see LogDisector_Single_Source.process_trace).
+
+Every record has all the columns below, those not relevant to its kind holding their default :
+- kind : TraceKind of the record.
+- time : simulated time.
+- node_id : node the record is about.
+- packet_id : packet concerned, -1 if none.
+- hops : hops of the packet from its source to the node, as counted by the logs of gateways (path length minus one), -1 if not recorded.
+- jitter : minimum jitter of the node for the packet, nan if not recorded.
+- suppression : value of the NodeLP_Suppression_Mode of the node for the packet, -1 if not recorded.
+"""
+
+class TraceKind(IntEnum):
+    SOURCE_SENT = 0 # A source emitted a new packet.
+    SOURCE_ACK_RECEIVED = 1 # A source received the acknowledgement of one of its packets.
+    NODE_RECEIVED = 2 # A node started receiving a packet.
+    NODE_COLLIDED = 3 # ... which collided with another reception.
+    NODE_RETRANSMITTED = 4 # A node retransmitted a packet.
+    NODE_DROPPED = 5 # A node dropped a packet it was to retransmit, on suppression.
+    NODE_JITTER_UPDATED = 6 # The jitter of a node for a packet changed : see the jitter column.
+    NODE_SUPPRESSION_SET = 7 # The suppression mode of a node for a packet changed : see the suppression column.
+    GATEWAY_CAPTURED = 8 # A gateway received a packet for the first time. Hops are recorded.
+    NODE_PROCESSED = 9 # A node processed a packet it fully received, a window being free for it (logged as "state when received").
+
+# Name of each column, and the typecode of its array.
+TRACE_COLUMNS = {'kind': 'b', 'time': 'd', 'node_id': 'q', 'packet_id': 'q', 'hops': 'i', 'jitter': 'd', 'suppression': 'b'}
+
+class TraceRecorder:
+    """
+    Appends records to one array per column : 34 bytes per record, against a hundred or more for a line of text logs.
+    Disabled by default : recording sites check enabled first, so that a disabled recorder costs an attribute lookup.
+    Every Simulator has its own (Simulator.trace) : simulations of the same process never mix their records.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        """ Drops every record. """
+        self.kind = array('b'); self.time = array('d'); self.node_id = array('q'); self.packet_id = array('q')
+        self.hops = array('i'); self.jitter = array('d'); self.suppression = array('b')
+
+    def set_enabled(self, enabled: bool):
+        self.enabled = enabled
+
+    def record(self, kind: TraceKind, time: float, node_id: int, packet_id: int = -1, hops: int = -1, jitter: float = float('nan'), suppression: int = -1):
+        self.kind.append(kind); self.time.append(time); self.node_id.append(node_id); self.packet_id.append(packet_id)
+        self.hops.append(hops); self.jitter.append(jitter); self.suppression.append(suppression)
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """ Copy of the columns, as NumPy arrays. """
+        return {name: np.array(getattr(self, name)) for name in TRACE_COLUMNS}
+
+    def save(self, path: str):
+        """ Saves the records in path (a .npz archive, see load_trace). """
+        with open(path, 'wb') as file:
+            np.savez_compressed(file, **self.to_arrays())
+
+def load_trace(path: str) -> Dict[str, np.ndarray]:
+    """ Columns of a trace saved by TraceRecorder.save, by name (see TRACE_COLUMNS). """
+    with np.load(path) as archive:
+        return {name: archive[name] for name in archive.files}
@@ -0,0 +1,72 @@
+import argparse, gc, random, time, tracemalloc
+
+from piconetwork.main import Channel, Node, Simulator, SimulationContext, CHANNEL_LOGGER
+from piconetwork.csr import ChannelCSR
+from piconetwork.simulutils import SimulationParameters, GenerationParameters, generate_topology, set_simulation_parameters
+
+"""
+Channel against ChannelCSR :
+- Memory taken by the links of a metric mesh, for growing numbers of nodes.
+- Events per second of a simulation over the same topology with either channel. Senders of ChannelCSR.VECTORIZED_DRAW_MIN_LINKS links
+  or more draw their losses from another random stream : the numbers of executed events are then close, not equal.
+ChannelCSR is meant to save memory : expect throughputs on par, not better.
+"""
+
+def bench_memory(sizes, degree, seed):
+    hearing_radius = 30.0
+    print("Memory of the links :")
+    for n in sizes:
+        side = (n * 3.14159 * hearing_radius**2 / degree) ** 0.5
+        rng = random.Random(seed)
+        context = SimulationContext()
+        nodes = [Node(rng.random() * side, rng.random() * side, context=context) for _ in range(n)]
+        gc.collect()
+        tracemalloc.start()
+        channel = Channel()
+        channel.create_metric_mesh(hearing_radius, *nodes)
+        links = sum(len(channel.get_neighbour_ids(node.get_id())) for node in nodes)
+        dict_memory = tracemalloc.get_traced_memory()[0]
+        csr_channel = ChannelCSR.from_channel(channel)
+        del channel; gc.collect()
+        csr_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"  {n:>6} nodes, {links:>8} links : Channel {dict_memory/2**20:7.2f} MiB, ChannelCSR {csr_memory/2**20:7.2f} MiB ({dict_memory/csr_memory:.1f}x less)")
+        del csr_channel, nodes
+
+def bench_simulation(args):
+    generation_parameters = GenerationParameters(n_to_generate=args.nodes, density=args.density, seed=args.seed, type_of_network='random_linear', nodes_mode=args.mode)
+    simulation_parameters = SimulationParameters(nodes_mode=args.mode,
+        simulation_total_duration=generation_parameters.sources_recurrent_transmission_delays[0] * args.recurrences)
+    print(f"Simulation : {args.nodes} nodes generated, mode {args.mode}, {args.recurrences} emissions, links of reliability {args.reliability}")
+    for name in ['Channel', 'ChannelCSR']:
+        # Same topology, fresh nodes : sources and gateways keep some state from one simulation to the next.
+        all_nodes, source_ids, nodes_ids, gateway_ids, channel = generate_topology(generation_parameters)
+        if name == 'ChannelCSR':
+            channel = ChannelCSR.from_channel(channel)
+        channel.set_reliability_all(args.reliability)
+        simulator = Simulator(simulation_parameters.simulation_total_duration, 0.0, seed=args.seed)
+        set_simulation_parameters(simulation_parameters, channel, simulator, all_nodes, source_ids, nodes_ids, gateway_ids)
+        for source in source_ids: all_nodes[source].start_sending(simulator)
+        start = time.perf_counter()
+        simulator.run()
+        elapsed = time.perf_counter() - start
+        print(f"  {name:10} : {simulator.executed_events} events in {elapsed:.3f}s, {simulator.executed_events/elapsed:,.0f} events/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and speed of ChannelCSR compared to Channel.")
+    parser.add_argument("--sizes", default=[1000, 10000, 50000], nargs='+', type=int, help="Numbers of nodes of the memory benchmark. Default: 1000 10000 50000")
+    parser.add_argument("--degree", default=10.0, type=float, help="Average number of neighbours of the memory benchmark. Default: 10")
+    parser.add_argument("--nodes", default=1000, type=int, help="Nodes generated for the simulation benchmark. Default: 1000")
+    parser.add_argument("--density", default=2.0, type=float, help="Density of the generated topology. Default: 2")
+    parser.add_argument("--mode", default="FLOODING", help="Mode of the relay nodes. Default: FLOODING")
+    parser.add_argument("--reliability", default=0.8, type=float, help="Reliability of every link in the simulation benchmark. Default: 0.8")
+    parser.add_argument("--recurrences", default=3, type=int, help="Number of source emissions simulated. Default: 3")
+    parser.add_argument("--seed", default=1, type=int, help="Seed of the topology and of the simulation. Default: 1")
+    args = parser.parse_args()
+
+    CHANNEL_LOGGER.set_effective(False); CHANNEL_LOGGER.set_verbose(False)
+    bench_memory(args.sizes, args.degree, args.seed)
+    bench_simulation(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse, random, time
+
+from piconetwork.main import Simulator
+from piconetwork.scheduler import HeapEventQueue, CalendarEventQueue
+from piconetwork.simulutils import SimulationParameters, GenerationParameters, generate_topology, set_simulation_parameters
+
+"""
+Compares the event queue backends of the Simulator :
+- On simulations over a dense, high traffic topology (several sources' worth of recurrences, FLOODING by default).
+- On the classic "hold" model : a queue of fixed size where every executed event schedules another one.
+Both backends execute the exact same sequence of events, which is checked here as well.
+The heap is faster on the simulations, whose queues stay small. The calendar queue only wins on the hold model with a million pending events.
+"""
+
+BACKENDS = {'heap': HeapEventQueue, 'calendar': CalendarEventQueue}
+
+def bench_topology(args):
+    generation_parameters = GenerationParameters(n_to_generate=args.nodes, density=args.density, seed=args.seed, type_of_network='random_linear', nodes_mode=args.mode)
+    # A short recurrence keeps many packets in flight at the same time.
+    recurrence = generation_parameters.sources_recurrent_transmission_delays[0] / args.traffic
+    simulation_parameters = SimulationParameters(nodes_mode=args.mode, simulation_total_duration=recurrence * args.recurrences)
+
+    executed = {}
+    for name, backend in BACKENDS.items():
+        # Same topology, fresh nodes for every backend.
+        all_nodes, source_ids, nodes_ids, gateway_ids, channel = generate_topology(generation_parameters)
+        for source in source_ids: all_nodes[source].interval = recurrence
+        if not executed:
+            print(f"Topology : {len(all_nodes)} nodes, {sum(len(channel.get_neighbour_ids(node.get_id())) for node in all_nodes)} links, mode {args.mode}, one emission every {recurrence:.1f}")
+        simulator = Simulator(simulation_parameters.simulation_total_duration, 0.0, event_queue=backend(), seed=args.seed)
+        set_simulation_parameters(simulation_parameters, channel, simulator, all_nodes, source_ids, nodes_ids, gateway_ids)
+        for source in source_ids: all_nodes[source].start_sending(simulator)
+        start = time.perf_counter()
+        simulator.run()
+        elapsed = time.perf_counter() - start
+        executed[name] = simulator.executed_events
+        print(f"  {name:8} : {simulator.executed_events} events in {elapsed:.3f}s, {simulator.executed_events/elapsed:,.0f} events/s, peak queue size {simulator.event_queue.peak_size}")
+    assert len(set(executed.values())) == 1, "Backends did not execute the same events"
+
+def bench_hold(sizes, operations, seed):
+    print(f"Hold model, {operations} operations :")
+    for size in sizes:
+        line = f"  size {size:>8} :"
+        executed = {}
+        for name, backend in BACKENDS.items():
+            rng = random.Random(seed)
+            queue = backend()
+            simulator = Simulator(0.0, 0.0, event_queue=queue)
+            remaining = [operations]
+            times = []
+            def hold(simulator):
+                times.append(simulator.current_time)
+                remaining[0] -= 1
+                if remaining[0] > 0:
+                    simulator.schedule_event(rng.random(), hold)
+            for _ in range(size): simulator.schedule_event(rng.random(), hold)
+            start = time.perf_counter()
+            simulator.run()
+            line += f" {name} {time.perf_counter() - start:.3f}s"
+            executed[name] = times
+        print(line)
+        assert all(times == executed['heap'] for times in executed.values()), "Backends did not execute the same events"
+
+def main():
+    parser = argparse.ArgumentParser(description="Heap versus calendar queue in the Simulator.")
+    parser.add_argument("--nodes", default=500, type=int, help="Nodes generated by generate_topology. Default: 500")
+    parser.add_argument("--density", default=4.0, type=float, help="Density of the topology. Default: 4.0")
+    parser.add_argument("--mode", default="FLOODING", type=str, help="Mode of the nodes. Default: FLOODING")
+    parser.add_argument("--traffic", default=20.0, type=float, help="How many times more frequent the emissions are compared to default. Default: 20")
+    parser.add_argument("--recurrences", default=40, type=int, help="Number of source emissions simulated. Default: 40")
+    parser.add_argument("--hold_operations", default=200000, type=int, help="Events executed per hold benchmark. Default: 200000")
+    parser.add_argument("--seed", default=1, type=int, help="Seed of both the topology and the simulation. Default: 1")
+    args = parser.parse_args()
+
+    from piconetwork.main import SIMULATOR_LOGGER
+    SIMULATOR_LOGGER.set_effective(False); SIMULATOR_LOGGER.set_verbose(False)
+
+    bench_topology(args)
+    bench_hold((100, 10000, 100000, 1000000), args.hold_operations, args.seed)
+
+if __name__ == "__main__":
+    main()
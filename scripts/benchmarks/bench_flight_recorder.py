@@ -0,0 +1,63 @@
+import argparse, json, resource, subprocess, sys, time
+
+from piconetwork.main import Simulator
+from piconetwork.lpwan_jitter import FlightRecorderTrigger
+from piconetwork.simulutils import SimulationParameters, GenerationParameters, generate_topology, set_simulation_parameters, LOGGERS_DICT
+
+"""
+Peak RSS and duration of a simulation logging everything, against the same simulation keeping its logs in flight recorders
+(Logger.set_flight_recorder) dumped on anomalies (FlightRecorderTrigger). Links lose reliability halfway, so that packets get lost.
+Every variant runs in its own process, so that peak RSS is its own.
+"""
+
+def run_variant(args) -> dict:
+    generation_parameters = GenerationParameters(n_to_generate=args.nodes, seed=args.seed, type_of_network='random_linear', nodes_mode=args.mode)
+    all_nodes, source_ids, nodes_ids, gateway_ids, channel = generate_topology(generation_parameters)
+    recurrence = generation_parameters.sources_recurrent_transmission_delays[0]
+    simulation_parameters = SimulationParameters(nodes_mode=args.mode, simulation_total_duration=recurrence * args.recurrences,
+        sensitivity_of_all_links=[(recurrence * args.recurrences / 2, args.reliability)])
+    loggers = [LOGGERS_DICT[logger] for logger in args.logs]
+    for logger in loggers:
+        logger.set_effective(True)
+        logger.set_flight_recorder(args.capacity if args.variant == 'recorder' else None)
+
+    simulator = Simulator(simulation_parameters.simulation_total_duration, 0.0, seed=args.seed)
+    set_simulation_parameters(simulation_parameters, channel, simulator, all_nodes, source_ids, nodes_ids, gateway_ids,
+        flight_recorder_triggers=[FlightRecorderTrigger[name.upper()] for name in args.triggers] if args.variant == 'recorder' else (), flight_recorder_loggers=loggers)
+    channel.set_reliability_schedule(simulation_parameters.sensitivity_of_all_links)
+    for source in source_ids: all_nodes[source].start_sending(simulator)
+    start = time.perf_counter()
+    simulator.run()
+    elapsed = time.perf_counter() - start
+
+    return {'events': simulator.executed_events, 'elapsed': elapsed, 'lines': sum(len(logger.logs) for logger in loggers),
+        'dumps': sum(logger.flight_recorder_dumps for logger in loggers), 'peak_rss_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS of a simulation logging everything, or keeping flight recorders dumped on anomalies.")
+    parser.add_argument("--nodes", default=300, type=int, help="Nodes generated by generate_topology. Default: 300")
+    parser.add_argument("--mode", default="CONSERVATIVE", help="Mode of the nodes. Default: CONSERVATIVE")
+    parser.add_argument("--recurrences", default=90, type=int, help="Number of source emissions simulated. Default: 90")
+    parser.add_argument("--reliability", default=0.3, type=float, help="Reliability of all links from halfway through the simulation. Default: 0.3")
+    parser.add_argument("--logs", default=['node', 'gateway', 'source'], nargs='*', help="Loggers enabled during the simulation, as in ultimate_simulate.py. Default: node gateway source")
+    parser.add_argument("--capacity", default=1000, type=int, help="Messages kept by every flight recorder. Default: 1000")
+    parser.add_argument("--triggers", default=['packet_lost'], nargs='*', choices=[trigger.name.lower() for trigger in FlightRecorderTrigger],
+        help="Anomalies dumping the flight recorders. Default: packet_lost")
+    parser.add_argument("--seed", default=1, type=int, help="Seed of the topology and of the simulation. Default: 1")
+    parser.add_argument("--variant", default=None, choices=['all', 'recorder'], help="Runs a single variant and prints its results as JSON (used internally)")
+    args = parser.parse_args()
+
+    if args.variant is not None:
+        print(json.dumps(run_variant(args)))
+        return
+
+    print(f"{args.nodes} nodes, {args.recurrences} recurrences, mode {args.mode}, logs {args.logs}, recorders of {args.capacity} messages dumped on {args.triggers}")
+    for variant in ['all', 'recorder']:
+        command = [sys.executable, __file__, '--variant', variant, '--nodes', str(args.nodes), '--mode', args.mode, '--recurrences', str(args.recurrences),
+            '--reliability', str(args.reliability), '--capacity', str(args.capacity), '--seed', str(args.seed), '--logs', *args.logs, '--triggers', *args.triggers]
+        result = json.loads(subprocess.run(command, check=True, capture_output=True, text=True).stdout.splitlines()[-1])
+        print(f"  {variant:8} : {result['events']} events in {result['elapsed']:.2f}s, {result['lines']} lines kept "
+            f"({result['dumps']} dumps), peak RSS {result['peak_rss_mib']:.1f} MiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse, gzip, os, re, tempfile, time
+from heapq import merge
+from operator import itemgetter
+
+from piconetwork.main import Simulator
+from piconetwork.logger import aggregate_logs_and_save
+from piconetwork.simulutils import SimulationParameters, GenerationParameters, generate_topology, set_simulation_parameters, LOGGERS_DICT
+
+"""
+Cost of aggregate_logs_and_save, against its former implementation : every line gathered in one list, its time read back with a
+regular expression, and the whole list sorted. Ordering alone (no compression) is timed as well.
+"""
+
+def order_former(loggers) -> list:
+    logs = []
+    for logger in loggers:
+        logs.extend(logger.get_logs())
+    def get_key_for_sort(log_message):
+        b = re.findall(r"\|(.+?)\|", log_message)
+        return float(b[0]) if len(b) > 0 else 0.0
+    return sorted(logs, key=get_key_for_sort)
+
+def aggregate_logs_and_save_former(loggers, path):
+    file = gzip.open(path+".gz", 'wt')
+    for log in order_former(loggers):
+        file.write(log+'\n')
+    file.close()
+
+def order_merged(loggers) -> int:
+    return sum(1 for _ in merge(*[logger.iter_timed_logs() for logger in loggers], key=itemgetter(0)))
+
+def timed(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of aggregating and saving logs, merged or sorted.")
+    parser.add_argument("--nodes", default=300, type=int, help="Nodes generated by generate_topology. Default: 300")
+    parser.add_argument("--mode", default="REGULAR", help="Mode of the nodes. Default: REGULAR")
+    parser.add_argument("--recurrences", default=60, type=int, help="Number of source emissions simulated. Default: 60")
+    parser.add_argument("--logs", default=['node', 'gateway', 'source'], nargs='*', help="Loggers enabled during the simulation, as in ultimate_simulate.py. Default: node gateway source")
+    parser.add_argument("--seed", default=1, type=int, help="Seed of the topology and of the simulation. Default: 1")
+    args = parser.parse_args()
+
+    generation_parameters = GenerationParameters(n_to_generate=args.nodes, seed=args.seed, type_of_network='random_linear', nodes_mode=args.mode)
+    all_nodes, source_ids, nodes_ids, gateway_ids, channel = generate_topology(generation_parameters)
+    simulation_parameters = SimulationParameters(nodes_mode=args.mode,
+        simulation_total_duration=generation_parameters.sources_recurrent_transmission_delays[0] * args.recurrences)
+    loggers = [LOGGERS_DICT[logger] for logger in args.logs]
+    for logger in loggers: logger.set_effective(True)
+    simulator = Simulator(simulation_parameters.simulation_total_duration, 0.0, seed=args.seed)
+    set_simulation_parameters(simulation_parameters, channel, simulator, all_nodes, source_ids, nodes_ids, gateway_ids)
+    for source in source_ids: all_nodes[source].start_sending(simulator)
+    simulator.run()
+
+    print(f"{args.nodes} nodes, {args.recurrences} recurrences, mode {args.mode}, logs {args.logs} : {sum(len(logger.logs) for logger in loggers)} lines")
+    print(f"  ordering only : sorted {timed(order_former, loggers):.2f}s, merged {timed(order_merged, loggers):.2f}s")
+    with tempfile.TemporaryDirectory() as directory:
+        former = timed(aggregate_logs_and_save_former, loggers, os.path.join(directory, 'former'))
+        merged = timed(aggregate_logs_and_save, loggers, os.path.join(directory, 'merged'))
+    print(f"  saved : sorted {former:.2f}s, merged {merged:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse, json, os, resource, subprocess, sys, tempfile, time
+
+from piconetwork.main import Simulator
+from piconetwork.logger import LogSink
+from piconetwork.simulutils import SimulationParameters, GenerationParameters, generate_topology, set_simulation_parameters, aggregate_logs_and_save, LOGGERS_DICT
+
+"""
+Peak RSS and duration of a simulation whose logs are saved :
+- 'memory' : logs kept by the loggers until the end of the simulation, then sorted and saved (aggregate_logs_and_save).
+- 'sink' : logs written to a LogSink as the simulation goes (Logger.set_sink), as Simulatable.stream_logs does.
+Every variant runs in its own process, so that peak RSS is its own.
+"""
+
+def run_variant(args) -> dict:
+    generation_parameters = GenerationParameters(n_to_generate=args.nodes, seed=args.seed, type_of_network='random_linear', nodes_mode=args.mode)
+    all_nodes, source_ids, nodes_ids, gateway_ids, channel = generate_topology(generation_parameters)
+    simulation_parameters = SimulationParameters(nodes_mode=args.mode,
+        simulation_total_duration=generation_parameters.sources_recurrent_transmission_delays[0] * args.recurrences)
+    loggers = [LOGGERS_DICT[logger] for logger in args.logs]
+    for logger in loggers: logger.set_effective(True)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'logs')
+        sink = LogSink(path + '.gz') if args.variant == 'sink' else None
+        for logger in loggers: logger.set_sink(sink)
+
+        simulator = Simulator(simulation_parameters.simulation_total_duration, 0.0, seed=args.seed)
+        set_simulation_parameters(simulation_parameters, channel, simulator, all_nodes, source_ids, nodes_ids, gateway_ids)
+        for source in source_ids: all_nodes[source].start_sending(simulator)
+        start = time.perf_counter()
+        simulator.run()
+        elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if sink is not None:
+            sink.close()
+        else:
+            aggregate_logs_and_save(loggers, path)
+        saving = time.perf_counter() - start
+        size = os.path.getsize(path + '.gz')
+
+    return {'events': simulator.executed_events, 'elapsed': elapsed, 'saving': saving, 'size_mib': size / 2**20,
+        'peak_rss_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS of a simulation saving its logs, kept in memory or streamed to a LogSink.")
+    parser.add_argument("--nodes", default=300, type=int, help="Nodes generated by generate_topology. Default: 300")
+    parser.add_argument("--mode", default="REGULAR", help="Mode of the nodes. Default: REGULAR")
+    parser.add_argument("--recurrences", default=90, type=int, help="Number of source emissions simulated. Default: 90")
+    parser.add_argument("--logs", default=['node', 'gateway', 'source'], nargs='*', help="Loggers enabled during the simulation, as in ultimate_simulate.py. Default: node gateway source")
+    parser.add_argument("--seed", default=1, type=int, help="Seed of the topology and of the simulation. Default: 1")
+    parser.add_argument("--variant", default=None, choices=['memory', 'sink'], help="Runs a single variant and prints its results as JSON (used internally)")
+    args = parser.parse_args()
+
+    if args.variant is not None:
+        print(json.dumps(run_variant(args)))
+        return
+
+    print(f"{args.nodes} nodes, {args.recurrences} recurrences, mode {args.mode}, logs {args.logs}")
+    for variant in ['memory', 'sink']:
+        command = [sys.executable, __file__, '--variant', variant, '--nodes', str(args.nodes), '--mode', args.mode,
+            '--recurrences', str(args.recurrences), '--seed', str(args.seed), '--logs', *args.logs]
+        result = json.loads(subprocess.run(command, check=True, capture_output=True, text=True).stdout.splitlines()[-1])
+        print(f"  {variant:6} : {result['events']} events in {result['elapsed']:.2f}s, saved in {result['saving']:.2f}s "
+            f"({result['size_mib']:.1f} MiB), peak RSS {result['peak_rss_mib']:.1f} MiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import argparse, os, tempfile, time
+
+from piconetwork.main import Simulator
+from piconetwork.simulutils import SimulationParameters, GenerationParameters, generate_topology, set_simulation_parameters, LOGGERS_DICT, VALID_LOGS
+
+"""
+Cost of logging during a simulation, for the same topology and seed :
+- 'disabled' : no logger enabled. Loggable._log returns before formatting anything.
+- 'eager' : loggers enabled, messages formatted as they are logged (the default).
+- 'deferred' : loggers enabled, messages formatted once read, after the simulation (Logger.set_deferred(True)). The time taken reading them is given apart.
+- 'trace' : no logger enabled, the structured trace (trace.py) recorded instead. Saving it is given apart.
+"""
+
+def run(args, variant: str) -> tuple:
+    generation_parameters = GenerationParameters(n_to_generate=args.nodes, seed=args.seed, type_of_network='random_linear', nodes_mode=args.mode)
+    all_nodes, source_ids, nodes_ids, gateway_ids, channel = generate_topology(generation_parameters)
+    simulation_parameters = SimulationParameters(nodes_mode=args.mode,
+        simulation_total_duration=generation_parameters.sources_recurrent_transmission_delays[0] * args.recurrences)
+    for logger in VALID_LOGS:
+        LOGGERS_DICT[logger].set_effective(False); LOGGERS_DICT[logger].set_verbose(False); LOGGERS_DICT[logger].reset_logs()
+    if variant in ['eager', 'deferred']:
+        for logger in args.logs:
+            LOGGERS_DICT[logger].set_effective(True); LOGGERS_DICT[logger].set_deferred(variant == 'deferred')
+
+    simulator = Simulator(simulation_parameters.simulation_total_duration, 0.0, seed=args.seed)
+    simulator.trace.set_enabled(variant == 'trace')
+    set_simulation_parameters(simulation_parameters, channel, simulator, all_nodes, source_ids, nodes_ids, gateway_ids)
+    for source in source_ids: all_nodes[source].start_sending(simulator)
+    start = time.perf_counter()
+    simulator.run()
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    messages = sum(len(LOGGERS_DICT[logger].logs) for logger in VALID_LOGS)
+    if variant == 'trace':
+        with tempfile.TemporaryDirectory() as directory:
+            simulator.trace.save(os.path.join(directory, 'trace.npz')); messages = len(simulator.trace)
+    return simulator.executed_events, elapsed, time.perf_counter() - start, messages
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of disabled, eager and deferred logging, and of recording a trace instead.")
+    parser.add_argument("--nodes", default=300, type=int, help="Nodes generated by generate_topology. Default: 300")
+    parser.add_argument("--mode", default="REGULAR", help="Mode of the nodes. Default: REGULAR")
+    parser.add_argument("--recurrences", default=200, type=int, help="Number of source emissions simulated. Default: 200")
+    parser.add_argument("--logs", default=['node', 'gateway', 'source'], nargs='*', help="Loggers enabled, as in ultimate_simulate.py. Default: node gateway source")
+    parser.add_argument("--seed", default=1, type=int, help="Seed of the topology and of the simulation. Default: 1")
+    args = parser.parse_args()
+
+    print(f"{args.nodes} nodes, {args.recurrences} recurrences, mode {args.mode}, logs {args.logs}")
+    for variant in ['disabled', 'eager', 'deferred', 'trace']:
+        events, elapsed, reading, messages = run(args, variant)
+        print(f"  {variant:8} : {events} events in {elapsed:.2f}s ({events/elapsed:,.0f} events/s), {messages} messages (or records) read (or saved) in {reading:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse, random, time
+
+from piconetwork.main import Channel, Node, SimulationContext, CHANNEL_LOGGER
+
+"""
+Time taken by Channel.create_metric_mesh on uniformly scattered nodes, the average degree being kept constant.
+Up to --check_up_to nodes, the mesh is compared to the one built by comparing every pair of nodes (the former implementation) :
+same links, in the same order, with the same delays and reliabilities.
+"""
+
+def create_metric_mesh_all_pairs(channel: Channel, distance_threshold: float, *args: Node, reliability: float = 1.0):
+    """ Former implementation, O(n^2 . degree). """
+    for node in args:
+        channel.assign_node(node)
+
+    for node in args:
+        for other_node in args:
+            if node.get_id() != other_node.get_id() and \
+                    not channel.check_link(node.get_id(), other_node.get_id()) and \
+                    node.distance_to(other_node) <= distance_threshold:
+                channel.create_bidirectional_link(node.get_id(), other_node.get_id(), node.distance_to(other_node), reliability)
+
+def make_nodes(n: int, degree: float, hearing_radius: float, seed: int):
+    # Area such that a node has on average `degree` neighbours : n * pi * r^2 / area = degree.
+    side = (n * 3.14159 * hearing_radius**2 / degree) ** 0.5
+    rng = random.Random(seed)
+    context = SimulationContext()
+    return [Node(rng.random() * side, rng.random() * side, context=context) for _ in range(n)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Grid-based versus all-pairs Channel.create_metric_mesh.")
+    parser.add_argument("--sizes", default=[500, 1000, 2000, 5000, 10000, 20000, 50000], nargs='+', type=int, help="Numbers of nodes. Default: 500 to 50000")
+    parser.add_argument("--degree", default=10.0, type=float, help="Average number of neighbours of a node. Default: 10")
+    parser.add_argument("--check_up_to", default=2000, type=int, help="Largest size also built and compared with the all-pairs implementation. Default: 2000")
+    parser.add_argument("--seed", default=1, type=int, help="Seed of the positions. Default: 1")
+    args = parser.parse_args()
+
+    CHANNEL_LOGGER.set_effective(False); CHANNEL_LOGGER.set_verbose(False)
+    hearing_radius = 30.0
+    for n in args.sizes:
+        nodes = make_nodes(n, args.degree, hearing_radius, args.seed)
+        channel = Channel()
+        start = time.perf_counter()
+        channel.create_metric_mesh(hearing_radius, *nodes)
+        elapsed = time.perf_counter() - start
+        links = sum(len(adjacencies) for adjacencies in channel.adjacencies_per_node.values())
+        line = f"  {n:>6} nodes, {links:>7} links : grid {elapsed:.3f}s"
+
+        if n <= args.check_up_to:
+            reference = Channel()
+            start = time.perf_counter()
+            create_metric_mesh_all_pairs(reference, hearing_radius, *nodes)
+            line += f", all pairs {time.perf_counter() - start:.3f}s"
+            as_lists = lambda channel: {node_id: list(adjacencies.values()) for node_id, adjacencies in channel.adjacencies_per_node.items()} # Order matters.
+            assert as_lists(reference) == as_lists(channel), "Meshes differ"
+            line += " (identical)"
+        print(line)
+
+if __name__ == "__main__":
+    main()
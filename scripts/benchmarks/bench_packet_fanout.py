@@ -0,0 +1,61 @@
+import argparse, time
+from copy import deepcopy
+from typing import List
+
+from piconetwork.lpwan_jitter import PacketLP
+from piconetwork.main import SimulationContext
+
+"""
+Cost of Packet.forward followed by add_to_path, done once per receiver of every broadcast :
+- 'former' : path (a list) and data deep-copied for every receiver (the first implementation, reproduced here).
+- 'list' : data shared by every copy of the packet, path list copied shallowly.
+- 'linked' : data shared, path a linked list of immutable hops shared as well (the current implementation).
+Measured for packets having travelled a growing number of hops.
+"""
+
+class ListPathPacket:
+    """ Stand-in for the packets whose path was a list, and whose fields were in their __dict__, copied as Packet.forward copied them. """
+    def __init__(self, packet: PacketLP):
+        self.data = packet.data
+        self.source_id = packet.source_id
+        self.first_emission_time = packet.first_emission_time
+        self.path = packet.path
+
+def forward_former(packet: ListPathPacket, node_id: int):
+    forwarded = ListPathPacket.__new__(ListPathPacket)
+    forwarded.__dict__.update(packet.__dict__)
+    forwarded.path = deepcopy(packet.path)
+    forwarded.data = deepcopy(packet.data)
+    forwarded.path.append(node_id)
+
+def forward_list(packet: ListPathPacket, node_id: int):
+    forwarded = ListPathPacket.__new__(ListPathPacket)
+    forwarded.__dict__.update(packet.__dict__)
+    forwarded.path = packet.path.copy()
+    forwarded.path.append(node_id)
+
+def forward_linked(packet: PacketLP, node_id: int):
+    packet.forward(1).add_to_path(node_id)
+
+def main():
+    parser = argparse.ArgumentParser(description="Deep-copying versus sharing forward of packets, list versus linked paths.")
+    parser.add_argument("--hops", default=[1, 10, 50, 200], nargs='+', type=int, help="Length of the path of the forwarded packet. Default: 1 10 50 200")
+    parser.add_argument("--forwards", default=200000, type=int, help="Number of forwards measured. Default: 200000")
+    args = parser.parse_args()
+
+    context = SimulationContext()
+    for hops in args.hops:
+        packet = PacketLP(1, packet_id=context.new_packet_id())
+        for node_id in range(2, hops + 1):
+            packet.add_to_path(node_id)
+        list_packet = ListPathPacket(packet)
+        line = f"  {hops:>3} hops :"
+        for name, forward, forwarded_packet in [('former', forward_former, list_packet), ('list', forward_list, list_packet), ('linked', forward_linked, packet)]:
+            start = time.perf_counter()
+            for _ in range(args.forwards):
+                forward(forwarded_packet, 0)
+            line += f" {name} {(time.perf_counter() - start) / args.forwards * 1e6:.2f} us,"
+        print(line.rstrip(','))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import argparse, gc, json, resource, subprocess, sys, time, tracemalloc
+
+from piconetwork import lpwan_jitter
+from piconetwork.lpwan_jitter import PacketLP
+from piconetwork.main import Simulator, SimulationContext
+from piconetwork.simulutils import SimulationParameters, GenerationParameters, generate_topology, set_simulation_parameters, LOGGERS_DICT
+
+"""
+Peak RSS and garbage collector pauses of a long simulation, packets being created for every receiver of every broadcast :
+- 'former' : packets keeping their fields in a __dict__, their path a list copied by every forward (the former layout, reproduced here).
+- 'slotted' : slotted packets, their path a linked list of shared hops (PathHop, the current implementation).
+Every variant runs in its own process, so that peak RSS is its own. Both simulate exactly the same events.
+Packets living only until their reception, the memory taken by a packet forwarded after 10 hops is given apart.
+"""
+
+class FormerPacketLP(PacketLP):
+    """ Stand-in for the packets of the former layout : not slotted, hence with a __dict__, holding the path as a list. """
+    path = None # Shadows Packet.path : the list is in the __dict__ of every packet.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.path = [self.source_id]
+
+    def forward(self, forwarder_id: int) -> 'FormerPacketLP':
+        forwarded = super().forward(forwarder_id)
+        forwarded.path = self.path.copy()
+        return forwarded
+
+    def add_to_path(self, node_id: int):
+        self.path.append(node_id)
+
+    def get_path_length(self) -> int:
+        return len(self.path)
+
+def get_forwarded_packet_size(packet_class, hops: int = 10, forwards: int = 10000) -> float:
+    """ Bytes allocated per forward (and add_to_path) of a packet of packet_class that went through hops nodes, the copies being kept. """
+    packet = packet_class(1, packet_id=SimulationContext().new_packet_id())
+    for node_id in range(2, hops + 1):
+        packet.add_to_path(node_id)
+    gc.collect()
+    tracemalloc.start()
+    forwarded = []
+    for _ in range(forwards):
+        copy = packet.forward(hops); copy.add_to_path(0)
+        forwarded.append(copy)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / forwards
+
+def run_variant(args) -> dict:
+    if args.variant == 'former':
+        lpwan_jitter.PacketLP = FormerPacketLP # Sources and gateways create their packets from it.
+    generation_parameters = GenerationParameters(n_to_generate=args.nodes, seed=args.seed, type_of_network='random_linear', nodes_mode=args.mode)
+    all_nodes, source_ids, nodes_ids, gateway_ids, channel = generate_topology(generation_parameters)
+    simulation_parameters = SimulationParameters(nodes_mode=args.mode,
+        simulation_total_duration=generation_parameters.sources_recurrent_transmission_delays[0] * args.recurrences)
+    for logger in args.logs: LOGGERS_DICT[logger].set_effective(True)
+
+    simulator = Simulator(simulation_parameters.simulation_total_duration, 0.0, seed=args.seed)
+    set_simulation_parameters(simulation_parameters, channel, simulator, all_nodes, source_ids, nodes_ids, gateway_ids)
+    for source in source_ids: all_nodes[source].start_sending(simulator)
+
+    pauses = []
+    def time_collections(phase, info):
+        if phase == 'start':
+            pauses.append(-time.perf_counter())
+        else:
+            pauses[-1] += time.perf_counter()
+    gc.collect()
+    gc.callbacks.append(time_collections)
+    start = time.perf_counter()
+    simulator.run()
+    elapsed = time.perf_counter() - start
+    gc.callbacks.remove(time_collections)
+
+    return {'events': simulator.executed_events, 'elapsed': elapsed, 'peak_rss_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'collections': len(pauses), 'gc_total_ms': sum(pauses) * 1e3, 'gc_max_ms': max(pauses, default=0.0) * 1e3}
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS and GC pauses of a long simulation, with the former and the current packets.")
+    parser.add_argument("--nodes", default=300, type=int, help="Nodes generated by generate_topology. Default: 300")
+    parser.add_argument("--mode", default="REGULAR", help="Mode of the nodes. Default: REGULAR")
+    parser.add_argument("--recurrences", default=90, type=int, help="Number of source emissions simulated. Default: 90")
+    parser.add_argument("--logs", default=[], nargs='*', help="Loggers enabled during the simulation, as in ultimate_simulate.py. Default: none")
+    parser.add_argument("--seed", default=1, type=int, help="Seed of the topology and of the simulation. Default: 1")
+    parser.add_argument("--variant", default=None, choices=['former', 'slotted'], help="Runs a single variant and prints its results as JSON (used internally)")
+    args = parser.parse_args()
+
+    if args.variant is not None:
+        print(json.dumps(run_variant(args)))
+        return
+
+    print(f"Packet forwarded after 10 hops : former {get_forwarded_packet_size(FormerPacketLP):.0f} bytes, slotted {get_forwarded_packet_size(PacketLP):.0f} bytes")
+    print(f"{args.nodes} nodes, {args.recurrences} recurrences, mode {args.mode}, logs {args.logs or 'none'}")
+    events = set()
+    for variant in ['former', 'slotted']:
+        command = [sys.executable, __file__, '--variant', variant, '--nodes', str(args.nodes), '--mode', args.mode,
+            '--recurrences', str(args.recurrences), '--seed', str(args.seed), '--logs', *args.logs]
+        result = json.loads(subprocess.run(command, check=True, capture_output=True, text=True).stdout.splitlines()[-1])
+        events.add(result['events'])
+        print(f"  {variant:7} : {result['events']} events in {result['elapsed']:.2f}s, peak RSS {result['peak_rss_mib']:.1f} MiB, "
+            f"{result['collections']} collections, {result['gc_total_ms']:.1f} ms in total, longest {result['gc_max_ms']:.2f} ms")
+    assert len(events) == 1, "Both variants must simulate the same events"
+
+if __name__ == "__main__":
+    main()
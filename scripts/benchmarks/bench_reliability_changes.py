@@ -0,0 +1,55 @@
+import argparse, random, time
+
+from piconetwork.main import Channel, Node, SimulationContext, CHANNEL_LOGGER
+from piconetwork.csr import ChannelCSR
+
+"""
+Cost of changing the reliability of all links, for growing meshes :
+- 'former' : every link record rewritten (the former Channel.set_reliability_all, reproduced here).
+- 'channel', 'csr' : Channel.set_reliability_all and ChannelCSR.set_reliability_all, applied when transmitting instead.
+The cost of a broadcast (select_receivers) after such a change is given for the latter two, so that what changes cost is not moved there.
+"""
+
+def set_reliability_all_former(channel: Channel, reliability: float):
+    for links in channel.adjacencies_per_node.values():
+        for (node_id, distance, _) in links.values():
+            links[node_id] = (node_id, distance, reliability)
+
+def time_per_call(function, calls: int) -> float:
+    start = time.perf_counter()
+    for call in range(calls):
+        function(call)
+    return (time.perf_counter() - start) / calls
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of a change of the reliability of all links, against the size of the mesh.")
+    parser.add_argument("--nodes", default=[1000, 10000, 50000], nargs='+', type=int, help="Number of nodes of the meshes. Default: 1000 10000 50000")
+    parser.add_argument("--degree", default=20.0, type=float, help="Average number of neighbours. Default: 20")
+    parser.add_argument("--changes", default=20, type=int, help="Number of changes measured. Default: 20")
+    parser.add_argument("--seed", default=1, type=int, help="Seed of the positions. Default: 1")
+    args = parser.parse_args()
+
+    CHANNEL_LOGGER.set_effective(False); CHANNEL_LOGGER.set_verbose(False)
+    hearing_radius = 30.0
+    reliabilities = [0.9, 0.6]
+    for n_nodes in args.nodes:
+        side = (n_nodes * 3.14159 * hearing_radius**2 / args.degree) ** 0.5
+        rng = random.Random(args.seed)
+        context = SimulationContext()
+        nodes = [Node(rng.random() * side, rng.random() * side, context=context) for _ in range(n_nodes)]
+        channel = Channel()
+        channel.create_metric_mesh(hearing_radius, *nodes)
+        node_ids = [node.get_id() for node in nodes]
+        links = sum(len(channel.get_neighbour_ids(node_id)) for node_id in node_ids)
+        csr_channel = ChannelCSR.from_channel(channel)
+        channel.set_rng(random.Random(1)); csr_channel.set_rng(random.Random(1))
+
+        line = f"  {n_nodes:>6} nodes, {links:>8} links : former {time_per_call(lambda call: set_reliability_all_former(channel, reliabilities[call % 2]), args.changes)*1e6:10.1f} us"
+        for name, tested_channel in [('channel', channel), ('csr', csr_channel)]:
+            per_change = time_per_call(lambda call: tested_channel.set_reliability_all(reliabilities[call % 2]), args.changes)
+            per_broadcast = time_per_call(lambda call: tested_channel.select_receivers(node_ids[call % n_nodes]), 10000)
+            line += f", {name} {per_change*1e6:.2f} us ({per_broadcast*1e6:.2f} us per broadcast)"
+        print(line)
+
+if __name__ == "__main__":
+    main()
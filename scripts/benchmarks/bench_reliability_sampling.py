@@ -0,0 +1,72 @@
+import argparse, random, time
+
+from typing import List
+
+from piconetwork.main import Channel, Node, SimulationContext, CHANNEL_LOGGER
+from piconetwork.csr import ChannelCSR
+
+"""
+Cost of drawing which links deliver a broadcast (Channel.select_receivers), over a dense metric mesh :
+- 'former' : one rng.random() call per link, whatever its reliability (the former implementation, reproduced here).
+- 'channel' : Channel, one rng.random() call per lossy link, none for links of reliability 1.
+- 'csr' : ChannelCSR, the losses of all the links drawn in a single vectorized call per broadcast, for senders of
+  ChannelCSR.VECTORIZED_DRAW_MIN_LINKS links or more. Below, drawn link by link as 'channel' does, reading the links out of the arrays.
+Drawing from a pre-generated block of NumPy draws was tried as well : in CPython, it is no faster than calling rng.random() per link.
+The fraction of delivered transmissions is given as well : it should be close to the reliability in every case.
+"""
+
+def set_reliability_all_former(channel: Channel, reliability: float):
+    """ Reliability written in every link record, which select_receivers_former reads. """
+    for links in channel.adjacencies_per_node.values():
+        for (node_id, distance, _) in links.values():
+            links[node_id] = (node_id, distance, reliability)
+
+def select_receivers_former(channel: Channel, sender_id: int):
+    draw = channel.get_rng().random
+    return [(node_id, distance) for (node_id, distance, reliability) in channel.adjacencies_per_node[sender_id].values() if draw() < reliability]
+
+def bench(channel: Channel, node_ids: List[int], broadcasts_per_node: int, select) -> tuple:
+    channel.set_rng(random.Random(1))
+    delivered = 0; links = sum(len(channel.get_neighbour_ids(node_id)) for node_id in node_ids) * broadcasts_per_node
+    start = time.perf_counter()
+    for _ in range(broadcasts_per_node):
+        for node_id in node_ids:
+            delivered += len(select(node_id))
+    elapsed = time.perf_counter() - start
+    return elapsed / (broadcasts_per_node * len(node_ids)), delivered / links
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of drawing the losses of the links of a broadcast.")
+    parser.add_argument("--nodes", default=2000, type=int, help="Number of nodes. Default: 2000")
+    parser.add_argument("--degree", default=40.0, type=float, help="Average number of neighbours (high density). Default: 40")
+    parser.add_argument("--reliabilities", default=[1.0, 0.8, 0.3], nargs='+', type=float, help="Reliabilities of all links. Default: 1.0 0.8 0.3")
+    parser.add_argument("--broadcasts", default=20, type=int, help="Broadcasts per node. Default: 20")
+    parser.add_argument("--seed", default=1, type=int, help="Seed of the positions. Default: 1")
+    args = parser.parse_args()
+
+    CHANNEL_LOGGER.set_effective(False); CHANNEL_LOGGER.set_verbose(False)
+    hearing_radius = 30.0
+    side = (args.nodes * 3.14159 * hearing_radius**2 / args.degree) ** 0.5
+    rng = random.Random(args.seed)
+    context = SimulationContext()
+    nodes = [Node(rng.random() * side, rng.random() * side, context=context) for _ in range(args.nodes)]
+    channel = Channel()
+    channel.create_metric_mesh(hearing_radius, *nodes)
+    node_ids = [node.get_id() for node in nodes]
+    print(f"{args.nodes} nodes, {sum(len(channel.get_neighbour_ids(node_id)) for node_id in node_ids)/args.nodes:.1f} neighbours on average")
+    csr_channel = ChannelCSR.from_channel(channel)
+
+    for reliability in args.reliabilities:
+        set_reliability_all_former(channel, reliability); channel.set_reliability_all(reliability); csr_channel.set_reliability_all(reliability)
+        print(f"  Reliability {reliability} :")
+        variants = {
+            'former': (channel, lambda sender_id: select_receivers_former(channel, sender_id)),
+            'channel': (channel, channel.select_receivers),
+            'csr': (csr_channel, csr_channel.select_receivers),
+        }
+        for name, (tested_channel, select) in variants.items():
+            per_broadcast, fraction = bench(tested_channel, node_ids, args.broadcasts, select)
+            print(f"    {name:9} : {per_broadcast*1e6:6.2f} us per broadcast, {fraction:.4f} delivered")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import argparse, os, time, tempfile
+
+from piconetwork.simulutils import SimulationParameters, GenerationParameters, Simulatable_MetadataAugmented_Dumpable_Network_Object, \
+    ReplicationJob, generate_topology, run_replications, get_replication_seed
+
+"""
+Wall-clock time of a modes x replicates sweep run by run_replications, with one worker then with several.
+Jobs are independent and CPU bound : the speed-up should be close to the number of workers, up to the number of cores.
+"""
+
+def make_jobs(args, directory):
+    generation_parameters = GenerationParameters(n_to_generate=args.nodes, seed=args.seed, type_of_network='random_linear')
+    all_nodes, source_ids, nodes_ids, gateway_ids, channel = generate_topology(generation_parameters)
+    jobs = []
+    for replicate in range(args.replicates):
+        for mode in args.modes:
+            simulation_parameters = SimulationParameters(nodes_mode=mode,
+                simulation_total_duration=generation_parameters.sources_recurrent_transmission_delays[0] * args.recurrences)
+            network_and_metadata = Simulatable_MetadataAugmented_Dumpable_Network_Object(all_nodes, [], [], simulation_parameters, generation_parameters,
+                source_ids, nodes_ids, gateway_ids, channel, pseudorandomization_seed=get_replication_seed(args.seed, mode, replicate))
+            jobs.append(ReplicationJob(network_and_metadata, os.path.join(directory, f"bench_{mode}_{replicate}")))
+    return jobs
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling of run_replications with the number of worker processes.")
+    parser.add_argument("--nodes", default=300, type=int, help="Nodes generated by generate_topology. Default: 300")
+    parser.add_argument("--modes", default=["REGULAR", "CONSERVATIVE", "AGGRESSIVE", "FLOODING"], nargs='+', help="Modes of the sweep. Default: 4 modes")
+    parser.add_argument("--replicates", default=30, type=int, help="Replicates per mode. Default: 30")
+    parser.add_argument("--recurrences", default=5, type=int, help="Number of source emissions simulated per replicate. Default: 5")
+    parser.add_argument("--jobs", default=os.cpu_count(), type=int, help="Number of workers compared to a single one. Default: number of cores")
+    parser.add_argument("--seed", default=1, type=int, help="Seed of the topology and of the sweep. Default: 1")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        jobs = make_jobs(args, directory)
+        print(f"{len(jobs)} jobs ({len(args.modes)} modes x {args.replicates} replicates), {os.cpu_count()} cores")
+        elapsed = {}
+        for workers in sorted({1, args.jobs}):
+            start = time.perf_counter()
+            for _ in run_replications(jobs, workers): pass
+            elapsed[workers] = time.perf_counter() - start
+            print(f"  {workers:>3} worker(s) : {elapsed[workers]:.2f}s")
+        print(f"Speed-up : x{elapsed[1]/elapsed[args.jobs]:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import argparse, time
+
+from piconetwork.main import Simulator
+from piconetwork.simulutils import SimulationParameters, GenerationParameters, generate_topology, set_simulation_parameters
+
+"""
+Microbenchmark of the Simulator's run loop : events executed per second with and without the fast path.
+The slow path is the instrumented loop (per event logging checks, and time.sleep even for a null slowness).
+"""
+
+def run_once(fast_path: bool, generation_parameters: GenerationParameters, simulation_parameters: SimulationParameters, seed: int):
+    # Same topology, fresh nodes for every variant : both simulate exactly the same events.
+    all_nodes, source_ids, nodes_ids, gateway_ids, channel = generate_topology(generation_parameters)
+    simulator = Simulator(simulation_parameters.simulation_total_duration, 0.0, fast_path=fast_path, seed=seed)
+    set_simulation_parameters(simulation_parameters, channel, simulator, all_nodes, source_ids, nodes_ids, gateway_ids)
+    for source in source_ids: all_nodes[source].start_sending(simulator)
+
+    start = time.perf_counter()
+    simulator.run()
+    elapsed = time.perf_counter() - start
+    return simulator.executed_events, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Events per second of Simulator.run, with and without the fast path.")
+    parser.add_argument("--nodes", default=500, type=int, help="Nodes generated by generate_topology. Default: 500")
+    parser.add_argument("--mode", default="REGULAR", type=str, help="Mode of the nodes. Default: REGULAR")
+    parser.add_argument("--recurrences", default=5, type=int, help="Number of source emissions simulated. Default: 5")
+    parser.add_argument("--seed", default=1, type=int, help="Seed of both the topology and the simulation. Default: 1")
+    args = parser.parse_args()
+
+    generation_parameters = GenerationParameters(n_to_generate=args.nodes, seed=args.seed, type_of_network='random_linear', nodes_mode=args.mode)
+    simulation_parameters = SimulationParameters(nodes_mode=args.mode,
+        simulation_total_duration=generation_parameters.sources_recurrent_transmission_delays[0] * args.recurrences)
+
+    print(f"Topology of {args.nodes} nodes generated, {args.recurrences} recurrences, mode {args.mode}")
+    results = {}
+    executed = {}
+    for fast_path in (False, True):
+        events, elapsed = run_once(fast_path, generation_parameters, simulation_parameters, args.seed)
+        results[fast_path] = events / elapsed
+        executed[fast_path] = events
+        print(f"fast_path={fast_path!s:5} : {events} events in {elapsed:.3f}s, {events/elapsed:,.0f} events/s")
+
+    assert executed[True] == executed[False], "Both paths did not execute the same events"
+    print(f"Speed-up : x{results[True]/results[False]:.2f}")
+
+if __name__ == "__main__":
+    main()
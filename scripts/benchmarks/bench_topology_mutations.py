@@ -0,0 +1,75 @@
+import argparse, random, time
+
+from piconetwork.main import Channel, Node, SimulationContext, CHANNEL_LOGGER
+from piconetwork.csr import ChannelCSR
+
+"""
+Cost of modifying the topology of growing meshes, as mobility and churn experiments do :
+- 'move' : a node removed (Channel.remove_node) and added back elsewhere (Channel.add_node_at).
+- 'toggle' : a node disabled then enabled again (Channel.set_node_enabled).
+- 'rebuild' : the whole mesh built again (create_metric_mesh), which moving a node used to take.
+The first modification builds the index of the links towards each node, once : its cost is given apart.
+The same mesh is then converted to a ChannelCSR : toggling keeps it frozen, while moving thaws it, and the next broadcast freezes it again.
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of incremental topology modifications against rebuilding the mesh.")
+    parser.add_argument("--nodes", default=[1000, 10000, 50000], nargs='+', type=int, help="Number of nodes of the meshes. Default: 1000 10000 50000")
+    parser.add_argument("--degree", default=20.0, type=float, help="Average number of neighbours. Default: 20")
+    parser.add_argument("--modifications", default=2000, type=int, help="Number of modifications of each kind measured. Default: 2000")
+    parser.add_argument("--csr_moves", default=10, type=int, help="Number of moves of a ChannelCSR measured, each followed by a broadcast. Default: 10")
+    parser.add_argument("--seed", default=1, type=int, help="Seed of the positions and of the modifications. Default: 1")
+    args = parser.parse_args()
+
+    CHANNEL_LOGGER.set_effective(False); CHANNEL_LOGGER.set_verbose(False)
+    hearing_radius = 30.0
+    for n_nodes in args.nodes:
+        side = (n_nodes * 3.14159 * hearing_radius**2 / args.degree) ** 0.5
+        rng = random.Random(args.seed)
+        context = SimulationContext()
+        nodes = [Node(rng.random() * side, rng.random() * side, context=context) for _ in range(n_nodes)]
+        channel = Channel()
+        start = time.perf_counter()
+        channel.create_metric_mesh(hearing_radius, *nodes)
+        rebuild = time.perf_counter() - start
+
+        start = time.perf_counter()
+        channel._get_senders_index()
+        index = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.modifications):
+            node = channel.remove_node(rng.choice(nodes).get_id())
+            channel.add_node_at(node, rng.random() * side, rng.random() * side)
+        move = (time.perf_counter() - start) / args.modifications
+
+        start = time.perf_counter()
+        for _ in range(args.modifications):
+            node_id = rng.choice(nodes).get_id()
+            channel.set_node_enabled(node_id, False); channel.set_node_enabled(node_id, True)
+        toggle = (time.perf_counter() - start) / args.modifications
+
+        print(f"  {n_nodes:>6} nodes : move {move*1e6:.1f} us, toggle {toggle*1e6:.1f} us, rebuild {rebuild*1e3:.1f} ms, index built in {index*1e3:.1f} ms")
+
+        channel = ChannelCSR.from_channel(channel)
+        start = time.perf_counter()
+        channel.set_node_enabled(nodes[0].get_id(), False); channel.set_node_enabled(nodes[0].get_id(), True)
+        index = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.modifications):
+            node_id = rng.choice(nodes).get_id()
+            channel.set_node_enabled(node_id, False); channel.set_node_enabled(node_id, True)
+        toggle = (time.perf_counter() - start) / args.modifications
+
+        start = time.perf_counter()
+        for _ in range(args.csr_moves):
+            node = channel.remove_node(rng.choice(nodes).get_id())
+            channel.add_node_at(node, rng.random() * side, rng.random() * side)
+            channel.select_receivers(node.get_id())
+        move = (time.perf_counter() - start) / args.csr_moves
+        assert channel.frozen
+        print(f"  {'':>6} ChannelCSR : move and broadcast {move*1e3:.1f} ms, toggle {toggle*1e6:.1f} us (frozen), index built in {index*1e3:.1f} ms")
+
+if __name__ == "__main__":
+    main()
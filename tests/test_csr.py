@@ -0,0 +1,75 @@
+import random
+
+from piconetwork.main import Channel, Node, SimulationContext
+from piconetwork.csr import ChannelCSR
+
+def make_line(n: int = 5):
+    """ n nodes 10 apart on a line, each linked to the previous and next ones. """
+    context = SimulationContext()
+    nodes = [Node(10.0 * i, 0.0, context=context) for i in range(n)]
+    channel = Channel()
+    channel.create_metric_mesh(15.0, *nodes)
+    return channel, [node.get_id() for node in nodes]
+
+def get_links(channel: Channel, node_ids):
+    return [(sender_id, receiver_id) for sender_id in node_ids for receiver_id in channel.get_neighbour_ids(sender_id)]
+
+def get_delivery_rates(channel: Channel, node_ids, broadcasts: int = 4000):
+    channel.set_rng(random.Random(1))
+    delivered = {link: 0 for link in get_links(channel, node_ids)}
+    for _ in range(broadcasts):
+        for sender_id in node_ids:
+            for (receiver_id, _) in channel.select_receivers(sender_id):
+                delivered[(sender_id, receiver_id)] += 1
+    return {link: count / broadcasts for link, count in delivered.items()}
+
+def test_from_channel_keeps_reliabilities():
+    channel, node_ids = make_line()
+    channel.set_reliability_all(0.3)
+    channel.set_reliability_unidirectional(node_ids[1], node_ids[2], 0.9)
+    channel.set_reliability_multiplier(0.5)
+    links = get_links(channel, node_ids)
+    reliabilities = {link: channel.get_reliability(*link) for link in links}
+
+    csr_channel = ChannelCSR.from_channel(channel)
+    assert csr_channel.frozen
+    assert {link: csr_channel.get_reliability(*link) for link in get_links(csr_channel, node_ids)} == reliabilities
+    rates = get_delivery_rates(csr_channel, node_ids)
+    assert all(abs(rates[link] - reliabilities[link]) < 0.05 for link in links)
+
+def test_from_channel_while_a_node_is_disabled():
+    channel, node_ids = make_line()
+    links = get_links(channel, node_ids)
+    disabled_id = node_ids[2]
+    channel.set_node_enabled(disabled_id, False)
+
+    csr_channel = ChannelCSR.from_channel(channel)
+    assert csr_channel.frozen and csr_channel.disabled_node_ids == {disabled_id}
+    assert get_links(csr_channel, node_ids) == get_links(channel, node_ids)
+    assert all(disabled_id not in [receiver_id for (receiver_id, _) in csr_channel.select_receivers(sender_id)] for sender_id in node_ids)
+    assert csr_channel.get_time_delay(node_ids[1], disabled_id) == channel.get_time_delay(node_ids[1], disabled_id)
+
+    csr_channel.set_node_enabled(disabled_id, True)
+    assert sorted(get_links(csr_channel, node_ids)) == sorted(links)
+    assert sorted(receiver_id for (receiver_id, _) in csr_channel.select_receivers(node_ids[1])) == [node_ids[0], disabled_id]
+
+def test_modifications_keep_the_channel_frozen():
+    channel, node_ids = make_line()
+    csr_channel = ChannelCSR.from_channel(channel)
+    csr_channel.set_node_enabled(node_ids[2], False)
+    assert csr_channel.frozen
+    channel.set_node_enabled(node_ids[2], False)
+    assert get_links(csr_channel, node_ids) == get_links(channel, node_ids)
+
+    removed = csr_channel.remove_node(node_ids[4])
+    assert not csr_channel.frozen
+    assert csr_channel.select_receivers(node_ids[4]) == []
+    assert csr_channel.frozen
+    assert csr_channel.get_time_delay(node_ids[4], node_ids[3]) == channel.get_time_delay(node_ids[4], node_ids[3])
+
+    csr_channel.set_node_enabled(node_ids[2], True)
+    csr_channel.add_node_at(removed, 40.0, 0.0)
+    csr_channel.select_receivers(node_ids[0])
+    assert csr_channel.frozen
+    channel.set_node_enabled(node_ids[2], True)
+    assert sorted(get_links(csr_channel, node_ids)) == sorted(get_links(channel, node_ids))
@@ -94,7 +94,9 @@ def main() -> None:
 
             zip.extractall()
 
-            (log_file_name, metadata_file_name) = (files_names[0], files_names[1])
+            # Logs, topology info, and the trace if recorded (see simulutils.run_replication).
+            trace_file_name = next((name for name in files_names if name.endswith("_trace.npz")), None)
+            (log_file_name, metadata_file_name) = [name for name in files_names if name != trace_file_name][:2]
             (common_prefix, lfilename) = re.findall(r"(.*)/?(.+)", log_file_name)[0]
             (_, mfilename) = re.findall(r"(.*)/?(.+)", metadata_file_name)[0]
 
@@ -102,7 +104,7 @@ def main() -> None:
                 (log_file_name, metadata_file_name) = (metadata_file_name, log_file_name)
 
             # Read the file objects
-            obj = LogDisector_Single_Source(log_file_name, metadata_file_name)
+            obj = LogDisector_Single_Source(log_file_name, metadata_file_name, trace_file_name)
             objects_logdisectors.append(obj)
 
             if not obj.simname in simulation_names.keys():
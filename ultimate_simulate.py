@@ -1,15 +1,17 @@
-import io, sys, os
+import io, sys, os, random
 import argparse
+from dataclasses import replace
 from typing import List, Tuple, Optional
 
 from piconetwork.simulutils import SimulationParameters, GenerationParameters, \
     Simulatable_MetadataAugmented_Dumpable_Network_Object, generate_topology, run_simulation, \
+    ReplicationJob, run_replications, get_replication_seed, \
     VALID_TOPOLOGIES, VALID_MODES, VALID_LOGS
 
 from piconetwork.main import Simulator, Channel, Logger, \
     NODE_LOGGER, GATEWAY_LOGGER, SOURCE_LOGGER, SIMULATOR_LOGGER, CHANNEL_LOGGER, EVENT_LOGGER
+from piconetwork.lpwan_jitter import FlightRecorderTrigger
 
-from zipfile import ZipFile, ZIP_LZMA, ZIP_BZIP2, ZIP_DEFLATED
 
 """
 Steps :
@@ -54,6 +56,11 @@ def init_argparse() -> argparse.ArgumentParser:
         help="Number of simulations to be done over the same topology. Default: 1"
     )
 
+    parser.add_argument(
+        "-j", "--jobs", default=1, type=int,
+        help="Number of simulations run in parallel, each in its own process. 0 for as many as there are cores. Default: 1"
+    )
+
     parser.add_argument(
         "-m", "--modes", default=["REGULAR"], nargs='+',
         help="Modes to be evaluated amont FLOODING, SLOWFLOODING, FASTFLOODING, REGULAR, CONSERVATIVE, AGGRESSIVE, BOLD. Default: REGULAR.",
@@ -80,7 +87,7 @@ def init_argparse() -> argparse.ArgumentParser:
 
     parser.add_argument(
         "--seed", default=GenerationParameters.seed, type=int,
-        help="Seed for generating the topology. If not set : random run.",
+        help="Seed for generating the topology, from which the seed of every simulation is derived as well. If not set : random run.",
         required=False
     )
 
@@ -160,6 +167,27 @@ def init_argparse() -> argparse.ArgumentParser:
         help="Whether or not to save logs.",
     )
 
+    parser.add_argument(
+        "--stream_logs", action='store_true',
+        help="Whether saved logs are written to their file during the simulations, rather than kept in memory until their end. Bounds memory use.",
+    )
+
+    parser.add_argument(
+        "--flight_recorder", type=int, default=None,
+        help="If set, saved loggers only keep their last FLIGHT_RECORDER messages, dumped to the logs on the anomalies given by --flight_recorder_triggers.",
+    )
+
+    parser.add_argument(
+        "--flight_recorder_triggers", default=[trigger.name.lower() for trigger in FlightRecorderTrigger], nargs='*',
+        choices=[trigger.name.lower() for trigger in FlightRecorderTrigger],
+        help="Anomalies dumping the flight recorders. Default : all of them.",
+    )
+
+    parser.add_argument(
+        "--trace", action='store_true',
+        help="Whether to also record and save a structured trace of the simulations, read by ultimate_analyze instead of the logs (much faster).",
+    )
+
     parser.add_argument(
         "--show_network", action='store_true',
         help="Whether or not to show the topology of the network before and after each simulation.",
@@ -195,6 +223,7 @@ def main() -> None:
     filenames_prefix : str = args.name_prefix[0]
     directory_prefix : str = args.dir[0]
     count : int = args.count # Number of times a single mode will be resimulated.
+    jobs : Optional[int] = args.jobs or None # None : as many as there are cores.
     modes : List[str] = args.modes # E.g ['REGULAR']
     density : float = args.density[0]
     nodes_generated : int = args.nodes_generated
@@ -214,6 +243,10 @@ def main() -> None:
     showlogs : List[str] = args.logsshow
     show_network : bool = args.show_network
     do_save_logs_or_not_option : bool = args.save
+    record_trace : bool = args.trace
+    stream_logs : bool = args.stream_logs
+    flight_recorder_capacity : Optional[int] = args.flight_recorder
+    flight_recorder_triggers : Tuple[FlightRecorderTrigger, ...] = tuple(FlightRecorderTrigger[name.upper()] for name in args.flight_recorder_triggers)
     recurrence_count : Optional[float] = None
     gradually_decrease_reliability_over_count: bool = args.gradually_decrease_reliability_over_count
     if args.recurrence_count:
@@ -223,6 +256,7 @@ def main() -> None:
     # TODO : assert path where we want to save files is accessible/usable.
     assert density > 0.0, "Density must be a strictly positive float"
     assert count > 0, "Count must be at least 1"
+    assert args.jobs >= 0, "Number of jobs cannot be negative"
     assert jitter_min < jitter_max, "Jitter interval is invalid."
     assert jitter_min >= 0.0, "Minimum jitter cannot be negative"
     assert jitter_intervals > 0, "jitter_intervals must be a strictly positive integer"
@@ -285,42 +319,43 @@ def main() -> None:
 
     print("Saving files offset per mode : ", counter_offset_per_mode)
 
+    # Seeds of the simulations : derived from the topology's seed, so that a seeded sweep is reproducible, whatever the number of jobs.
+    base_seed = seed if seed is not None else random.SystemRandom().getrandbits(64)
+    print("Base seed of the simulations : ", base_seed)
+
+    replication_jobs : List[ReplicationJob] = []
     for counter in range(count):
         for i in range(len(modes)):
 
-            simulation_parameters.nodes_mode = modes[i]
-
+            sensitivity_of_all_links = simulation_parameters.sensitivity_of_all_links
             if gradually_decrease_reliability_over_count:
-                simulation_parameters.sensitivity_of_all_links = ((0.0, 1.0), (simulation_parameters.simulation_total_duration/2.0, 0.85 + (1-0.85)* (1/count * (count-counter))** 1) )
-                print("Reliabilities : ", simulation_parameters.sensitivity_of_all_links)
+                sensitivity_of_all_links = ((0.0, 1.0), (simulation_parameters.simulation_total_duration/2.0, 0.85 + (1-0.85)* (1/count * (count-counter))** 1) )
+                print("Reliabilities : ", sensitivity_of_all_links)
 
-            # Generate full meta_data object
+            # Generate full meta_data object. Every job gets its own parameters, as they are simulated independently.
+            replicate = counter + counter_offset_per_mode[modes[i]]
             simulation_full_parameters_and_metadata = Simulatable_MetadataAugmented_Dumpable_Network_Object(
                 nodes=nodes_all, loggers_effective=savelogs, loggers_verbose=showlogs,
-                simulation_parameters=simulation_parameters,generation_parameters=generation_parameters,
-                source_ids=source_ids, gateway_ids=gateway_ids, nodes_ids=node_ids, channel=channel
+                simulation_parameters=replace(simulation_parameters, nodes_mode=modes[i], sensitivity_of_all_links=sensitivity_of_all_links),
+                generation_parameters=generation_parameters,
+                source_ids=source_ids, gateway_ids=gateway_ids, nodes_ids=node_ids, channel=channel,
+                pseudorandomization_seed=get_replication_seed(base_seed, modes[i], replicate),
+                record_trace=record_trace, stream_logs=stream_logs,
+                flight_recorder_capacity=flight_recorder_capacity, flight_recorder_triggers=flight_recorder_triggers
             )
 
             # Name of associated files :
-            search_prefix = directory_prefix + '/' + filenames_prefix + "_" + modes[i] + "_"
-            zip_prefix = directory_prefix + '/' + filenames_prefix + "_" + modes[i] + "_" + str(counter + counter_offset_per_mode[modes[i]])
-            file_logs_name = zip_prefix + "_logs"
-            file_topology_info_name = zip_prefix + "_topology_info"
+            zip_prefix = directory_prefix + '/' + filenames_prefix + "_" + modes[i] + "_" + str(replicate)
 
             # Check if files of the same name exist already
             # TODO
 
-            # Run simulation!
-            run_simulation(simulation_full_parameters_and_metadata, file_logs_name, file_topology_info_name,
-                save_results = do_save_logs_or_not_option, show_network = show_network)
-
-            if do_save_logs_or_not_option:
-                with ZipFile(zip_prefix + ".zip", "w", compression=ZIP_DEFLATED, compresslevel=7) as zipped_archive:
-                    zipped_archive.write(file_logs_name+".gz")
-                    zipped_archive.write(file_topology_info_name)
+            replication_jobs.append(ReplicationJob(simulation_full_parameters_and_metadata, zip_prefix,
+                save_results = do_save_logs_or_not_option, show_network = show_network))
 
-                os.remove(file_logs_name+".gz")
-                os.remove(file_topology_info_name)
+    # Run simulations! Results come back as they complete.
+    for done, result in enumerate(run_replications(replication_jobs, jobs), 1):
+        print(f"[{done}/{len(replication_jobs)}] {result.zip_prefix} ({result.nodes_mode}, seed {result.pseudorandomization_seed}) done in {result.wall_time:.1f}s")
 
 if __name__ == "__main__":
     main()